@@ -3,56 +3,264 @@ Main Flask Application
 Integrates all components: validation, rules, ML, explainability, audit
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory
 from flask_cors import CORS
-import joblib
-import pandas as pd
-import numpy as np
-import time
-import uuid
 from datetime import datetime
 import os
+import signal
+import sys
+import threading
 
-# Import our modules
+# Import our modules (none of them import sklearn or pandas at load time)
 from data_validator import LoanDataValidator
 from risk_rules import RiskRuleEngine
-from explainer import LoanExplainer
 from audit_logger import AuditLogger
+from model_store import ModelStore
+from result_cache import ResultCache
+from micro_batcher import MicroBatcher
+from metrics import MetricsRegistry, StageTimer
+from profiler import RequestProfiler
+from pipeline import (
+    BatchScorer,
+    DETAIL_LEVELS,
+    application_id_for,
+    prepare_feature_dict,
+    make_final_decision,
+    rule_record,
+    select_detail,
+    validation_record
+)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend
 
-# Load ML model and components
-print("Loading ML model...")
-try:
-    model = joblib.load('models/loan_model.pkl')
-    label_encoder = joblib.load('models/label_encoder.pkl')
-    feature_importance = pd.read_csv('models/feature_importance.csv')
-    
-    # Initialize components
-    explainer = LoanExplainer(feature_importance)
-    ml_available = True
-    print("✅ ML model loaded successfully!")
-except Exception as e:
-    print(f"⚠️  ML model not found: {e}")
-    print("⚠️  System will run in rule-based mode only")
-    explainer = None
-    ml_available = False
+# ML model and explainer. MODEL_FORMAT=pickle skips the compiled bundle.
+models = ModelStore(
+    os.path.join(BASE_DIR, 'models'),
+    model_format=os.environ.get('MODEL_FORMAT', 'compiled')
+)
 
-audit_logger = AuditLogger('logs/audit.db')
+# AUDIT_WRITE_MODE=async moves audit inserts to a background group-commit writer
+audit_logger = AuditLogger(
+    os.environ.get('AUDIT_DB_PATH', os.path.join(BASE_DIR, 'logs', 'audit.db')),
+    async_writes=os.environ.get('AUDIT_WRITE_MODE', 'sync') == 'async'
+)
 
-print("✅ Application initialized successfully!")
+# Responses for repeated identical applications; RESULT_CACHE_SIZE=0 disables it
+result_cache = ResultCache(
+    max_size=int(os.environ.get('RESULT_CACHE_SIZE', 10000)),
+    ttl_seconds=float(os.environ.get('RESULT_CACHE_TTL', 300))
+)
 
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
+def forest_probabilities(X):
+    """Approval probability per row"""
+    return models.forest.predict_proba(X)[:, 1]
+
+
+def forest_contributions(X):
+    """(approval probability, contribution row) per row"""
+    proba, _, contributions = models.forest.contributions(X)
+    return list(zip(proba[:, 1], contributions))
+
+
+# MICRO_BATCH=on coalesces concurrent single-row ML calls into one forest call,
+# waiting up to MICRO_BATCH_WAIT_MS for up to MICRO_BATCH_MAX_ROWS rows
+if os.environ.get('MICRO_BATCH', 'off') == 'on':
+    micro_batch_options = {
+        'max_batch': int(os.environ.get('MICRO_BATCH_MAX_ROWS', 64)),
+        'max_wait_ms': float(os.environ.get('MICRO_BATCH_WAIT_MS', 0))
+    }
+    probability_batcher = MicroBatcher(forest_probabilities, name='probability-batcher', **micro_batch_options)
+    contribution_batcher = MicroBatcher(forest_contributions, name='contribution-batcher', **micro_batch_options)
+else:
+    probability_batcher = contribution_batcher = None
+
+# Prometheus-style metrics, served at /metrics
+metrics = MetricsRegistry()
+stage_seconds = metrics.histogram(
+    'loan_stage_duration_seconds', 'Time spent in each stage of an assessment', ['stage'])
+request_seconds = metrics.histogram(
+    'http_request_duration_seconds', 'Request latency by endpoint', ['endpoint'])
+requests_total = metrics.counter(
+    'http_requests', 'Requests by endpoint and status code', ['endpoint', 'status'])
+decisions_total = metrics.counter(
+    'loan_decisions', 'Assessments answered, by final decision (cache hits included)', ['decision'])
+metrics.gauge('model_ready', 'Whether the model is loaded and warmed up', lambda: models.ready)
+metrics.gauge('result_cache_entries', 'Responses held in the result cache', lambda: len(result_cache))
+metrics.callback_counter('result_cache_hits', 'Result cache hits', lambda: result_cache.hits)
+metrics.callback_counter('result_cache_misses', 'Result cache misses', lambda: result_cache.misses)
+metrics.callback_counter('result_cache_evictions', 'Result cache LRU evictions', lambda: result_cache.evictions)
+metrics.gauge('audit_pending_writes', 'Audit rows queued but not yet committed', lambda: audit_logger.pending_writes)
+metrics.callback_counter('audit_write_errors', 'Failed audit writer commits', lambda: audit_logger.write_errors)
+metrics.callback_counter('audit_spilled_rows', 'Audit rows written to the spill file', lambda: audit_logger.spilled_rows)
+metrics.callback_counter('audit_dropped_rows', 'Audit rows the database rejected or that could not be spilled', lambda: audit_logger.dropped_rows)
+metrics.gauge('micro_batch_pending_rows', 'Rows waiting for a micro-batch (absent when disabled)',
+              lambda: probability_batcher.pending() + contribution_batcher.pending() if probability_batcher else None)
+
+# Opt-in profiling of assessments, served at /admin/profile. PROFILE_SAMPLE_RATE
+# profiles that fraction of requests; a request sending PROFILE_TOKEN in
+# X-Profile is always profiled. /admin/profile requires the token (404 without one).
+profiler = RequestProfiler(
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+    token=os.environ.get('PROFILE_TOKEN')
+)
+PROFILED_ENDPOINTS = {'assess_loan', 'assess_loans'}
+metrics.callback_counter('profiled_requests', 'Requests profiled', lambda: profiler.total_requests)
+
+VALID_DECISIONS = ['APPROVED', 'REJECTED', 'MANUAL_REVIEW']
+VALID_RISK_LEVELS = ['HIGH', 'MEDIUM', 'LOW']
+
+# Upper bound on applications accepted by /api/assess-loans in one call
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 10000))
+
+# Seconds a request waits for a background model load before answering 503
+MODEL_READY_TIMEOUT = float(os.environ.get('MODEL_READY_TIMEOUT', 30))
+
+
+def load_models():
+    """Load and warm up the model, then key the result cache on its version"""
+    models.load()
+    result_cache.set_version(f"model-{models.version}/rules-{RiskRuleEngine.RULES_VERSION}")
+
+
+# MODEL_LOAD=background starts serving immediately; /health reports 503 until ready
+if os.environ.get('MODEL_LOAD', 'eager') == 'background':
+    threading.Thread(target=load_models, name='model-loader', daemon=True).start()
+else:
+    load_models()
+    print("✅ Application initialized successfully!")
+
+
+def respond(result):
+    """Flask response for a (body, status) pair from the shared handlers below"""
+    body, status = result
+    return jsonify(body), status
+
+
+def request_metadata():
+    """Client details stored with every audit record"""
+    return {
+        'user_agent': request.headers.get('User-Agent'),
+        'ip_address': request.remote_addr
+    }
+
+
+def model_not_ready():
+    """503 body used while a background model load is in progress"""
+    return {
+        'success': False,
+        'error': 'Model is still loading, retry shortly'
+    }, 503
+
+
+def detail_level(query_value, header_value):
+    """Response detail from ?detail= or else the X-Response-Detail header (default full)"""
+    return (query_value or header_value or 'full').strip().lower()
+
+
+def requested_detail():
+    """Response detail level of the current Flask request"""
+    return detail_level(request.args.get('detail'), request.headers.get('X-Response-Detail'))
+
+
+def invalid_detail(detail):
+    """400 body for an unknown detail level"""
+    return {
+        'success': False,
+        'error': f"Unknown detail level '{detail}' (expected one of: {', '.join(DETAIL_LEVELS)})"
+    }, 400
+
+
+def score_row(row, batcher, predict):
+    """predict() result for one feature row, through the micro-batcher when enabled"""
+    if batcher is not None:
+        return batcher(row)
+    return predict(row)[0]
+
+
+def health():
+    """Health body, 503 until the model is loaded and warmed up"""
+    status = models.status()
+    return {
+        'status': 'healthy' if status['ready'] else 'starting',
         'timestamp': datetime.utcnow().isoformat(),
         'version': '1.0.0',
-        'ml_available': ml_available
-    })
+        **status
+    }, 200 if status['ready'] else 503
+
+
+@app.before_request
+def start_request_timer():
+    """Per-request stage timer; also the start of processing_time_ms"""
+    g.timer = StageTimer(stage_seconds)
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Count and time the request; report its stages in Server-Timing"""
+    timer = g.get('timer')
+    if timer is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_seconds.labels(endpoint).observe(timer.elapsed())
+        requests_total.labels(endpoint, str(response.status_code)).inc()
+        if timer.laps:
+            response.headers['Server-Timing'] = timer.server_timing()
+    return response
+
+
+@app.before_request
+def start_profiling():
+    """Trace this request's thread when it is picked for profiling"""
+    if profiler.enabled and request.endpoint in PROFILED_ENDPOINTS \
+            and profiler.wanted(request.headers.get('X-Profile')):
+        g.profile_tracer = profiler.start()
+
+
+@app.teardown_request
+def stop_profiling(exc):
+    """Add a profiled request's stacks to the profile"""
+    tracer = g.pop('profile_tracer', None)
+    if tracer is not None:
+        profiler.stop(tracer)
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Metrics in the Prometheus text exposition format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+def profile_report(token, reset=False):
+    """Collapsed stacks of the profiled requests as (text, 200), or an error (body, status)"""
+    if profiler.token is None:
+        return {
+            'success': False,
+            'error': 'Profile access is disabled (set PROFILE_TOKEN)'
+        }, 404
+    if not profiler.authorized(token):
+        return {'success': False, 'error': 'X-Profile token required'}, 403
+    return profiler.collapsed(reset=reset)[0], 200
+
+
+@app.route('/admin/profile', methods=['GET'])
+def get_profile():
+    """
+    Profiled requests' stacks in collapsed format (flamegraph.pl, speedscope)
+    ?reset=1 clears the profile after reading it
+    """
+    body, status = profile_report(request.headers.get('X-Profile'), request.args.get('reset') in ('1', 'true'))
+    if status != 200:
+        return respond((body, status))
+    return Response(body, mimetype='text/plain')
+
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint (503 until the model is loaded and warmed up)"""
+    return respond(health())
 
 
 @app.route('/')
@@ -71,102 +279,156 @@ def serve_static(path):
         return send_from_directory('../frontend', 'index.html')
 
 
-@app.route('/api/assess-loan', methods=['POST'])
-def assess_loan():
+def reuse_cached_decision(cached, data, metadata, timer):
     """
-    Main endpoint for loan risk assessment
-    Integrates: Validation → Rules → ML → Explainability → Audit
+    Response for a cache hit
+    With a client-supplied application_id the request is a retry, and gets the
+    stored response back as is. Otherwise only the decision is reused: the
+    applicant gets their own application_id, timestamp and audit record.
+    """
+    response = cached['response']
+    if not data.get('application_id'):
+        application_id = application_id_for(data)
+        processing_time = int(timer.elapsed() * 1000)
+        audit_logger.log_decision(dict(
+            cached['audit'],
+            application_id=application_id,
+            applicant_data=data,
+            processing_time_ms=processing_time,
+            metadata=metadata
+        ))
+        timer.lap('audit')
+        response = dict(response, application_id=application_id, processing_time_ms=processing_time)
+        if 'timestamp' in response:
+            response['timestamp'] = datetime.utcnow().isoformat()
+    
+    decisions_total.labels(response['decision']).inc()
+    return dict(response, cached=True)
+
+
+def assess_application(data, detail, metadata, timer=None):
+    """
+    Validation → Rules → ML → Explainability → Audit for one application
+    Returns (response body, HTTP status); shared by the Flask and ASGI servers
+    metadata: {'user_agent', 'ip_address'} stored with the audit record
+    timer: the request's StageTimer; every stage is lapped into loan_stage_duration_seconds
     """
-    start_time = time.time()
+    timer = timer or StageTimer(stage_seconds)
     
     try:
-        # Get request data
-        data = request.json
-        application_id = data.get('application_id', f"APP-{uuid.uuid4().hex[:8].upper()}")
+        # Retries and duplicates of an already assessed application
+        cache_key = result_cache.key_for(data, detail)
+        cached = result_cache.get(cache_key)
+        timer.lap('cache')
+        if cached is not None:
+            return reuse_cached_decision(cached, data, metadata, timer), 200
+        
+        application_id = application_id_for(data)
         
-        # STEP 1: Data Validation
-        is_valid, errors, warnings = LoanDataValidator.validate(data)
+        # STEP 1: Data Validation (codes; text is rendered only for the response)
+        application, error_codes, warning_codes, dti_ratio = LoanDataValidator.check(data)
+        timer.lap('validate')
         
-        if not is_valid:
+        if application is None:
             # Log failed validation
             audit_logger.log_decision({
                 'application_id': application_id,
                 'applicant_data': data,
-                'validation_result': {
-                    'is_valid': False,
-                    'errors': errors,
-                    'warnings': warnings
-                },
+                'validation_result': validation_record(error_codes, warning_codes),
                 'final_decision': 'REJECTED',
                 'final_risk_level': 'HIGH',
                 'decision_reason': 'Failed data validation',
-                'processing_time_ms': int((time.time() - start_time) * 1000),
-                'metadata': {
-                    'user_agent': request.headers.get('User-Agent'),
-                    'ip_address': request.remote_addr
-                }
+                'processing_time_ms': int(timer.elapsed() * 1000),
+                'metadata': metadata
             })
+            timer.lap('audit')
+            decisions_total.labels('REJECTED').inc()
             
-            return jsonify({
+            errors, warnings = LoanDataValidator.messages(error_codes, warning_codes, dti_ratio)
+            return {
                 'success': False,
                 'application_id': application_id,
                 'decision': 'REJECTED',
                 'reason': 'Data validation failed',
                 'errors': errors,
                 'warnings': warnings
-            }), 400
+            }, 400
         
         # STEP 2: Rule-Based Risk Assessment
-        rule_result = RiskRuleEngine.evaluate(data)
+        rule_result = RiskRuleEngine.evaluate(application, include_flags=False)
+        
+        # Flag and warning text, for the detail levels that return it
+        if detail != 'decision':
+            flags = RiskRuleEngine.flags_for(application, rule_result['flag_mask'])
+            warnings = LoanDataValidator.messages([], warning_codes, dti_ratio)[1]
+        else:
+            flags = warnings = None
+        timer.lap('rules')
         
         # If rules suggest rejection, stop here
         if rule_result['recommendation'] == 'REJECT':
-            processing_time = int((time.time() - start_time) * 1000)
+            processing_time = int(timer.elapsed() * 1000)
             
-            audit_logger.log_decision({
+            audit_record = {
                 'application_id': application_id,
                 'applicant_data': data,
-                'validation_result': {
-                    'is_valid': True,
-                    'errors': [],
-                    'warnings': warnings
-                },
-                'rule_result': rule_result,
+                'validation_result': validation_record([], warning_codes),
+                'rule_result': rule_record(rule_result),
                 'final_decision': 'REJECTED',
                 'final_risk_level': rule_result['risk_level'],
                 'decision_reason': f"Rule-based rejection: {rule_result['risk_score']} risk score",
                 'processing_time_ms': processing_time
-            })
+            }
+            audit_logger.log_decision(audit_record)
+            timer.lap('audit')
+            decisions_total.labels('REJECTED').inc()
             
-            return jsonify({
+            response = select_detail({
                 'success': True,
                 'application_id': application_id,
                 'decision': 'REJECTED',
                 'risk_level': rule_result['risk_level'],
                 'risk_score': rule_result['risk_score'],
                 'reason': 'High risk based on business rules',
-                'flags': rule_result['flags'],
+                'flags': flags,
                 'warnings': warnings,
                 'processing_time_ms': processing_time
-            })
+            }, detail)
+            result_cache.put(cache_key, {'response': response, 'audit': audit_record})
+            
+            return response, 200
         
         # STEP 3: ML Model Prediction (if available)
-        if ml_available:
-            ml_features = prepare_features_for_ml(data)
-            ml_probability = model.predict_proba(ml_features)[0][1]
+        if models.ml_available:
+            ml_features = models.features.row(application)
+            if detail == 'full':
+                ml_probability, contributions = score_row(ml_features, contribution_batcher, forest_contributions)
+            else:
+                ml_probability = score_row(ml_features, probability_batcher, forest_probabilities)
             ml_prediction = 'APPROVE' if ml_probability >= 0.5 else 'REJECT'
             
             ml_result = {
                 'probability': float(ml_probability),
                 'prediction': ml_prediction
             }
+            timer.lap('ml')
             
-            # STEP 4: Generate Explanation
-            explanation = explainer.explain_prediction(
-                prepare_feature_dict(data),
-                ml_probability,
-                model
-            )
+            # STEP 4: Generate Explanation (only what the detail level returns)
+            if detail == 'full':
+                explanation = models.explainer.explain_prediction(
+                    prepare_feature_dict(application),
+                    ml_probability,
+                    models.forest,
+                    dict(zip(models.features.feature_names, contributions.tolist()))
+                )
+            elif detail == 'summary':
+                explanation = {
+                    'overall_assessment': models.explainer.overall_assessment(ml_probability),
+                    'ml_confidence': f"{ml_probability:.1%}"
+                }
+            else:
+                explanation = None
+            timer.lap('explain')
         else:
             # No ML available - use rule-based only
             ml_result = {'probability': None, 'prediction': None}
@@ -181,34 +443,31 @@ def assess_loan():
         final_decision, final_risk_level, decision_reason = make_final_decision(
             rule_result,
             ml_result,
-            warnings
+            warning_codes
         )
+        timer.lap('decide')
         
         # STEP 6: Log to Audit Trail
-        processing_time = int((time.time() - start_time) * 1000)
+        processing_time = int(timer.elapsed() * 1000)
         
-        audit_logger.log_decision({
+        audit_record = {
             'application_id': application_id,
             'applicant_data': data,
-            'validation_result': {
-                'is_valid': True,
-                'errors': [],
-                'warnings': warnings
-            },
-            'rule_result': rule_result,
+            'validation_result': validation_record([], warning_codes),
+            'rule_result': rule_record(rule_result),
             'ml_result': ml_result,
             'final_decision': final_decision,
             'final_risk_level': final_risk_level,
             'decision_reason': decision_reason,
             'processing_time_ms': processing_time,
-            'metadata': {
-                'user_agent': request.headers.get('User-Agent'),
-                'ip_address': request.remote_addr
-            }
-        })
+            'metadata': metadata
+        }
+        audit_logger.log_decision(audit_record)
+        timer.lap('audit')
+        decisions_total.labels(final_decision).inc()
         
         # STEP 7: Return Response
-        return jsonify({
+        response = select_detail({
             'success': True,
             'application_id': application_id,
             'decision': final_decision,
@@ -217,115 +476,110 @@ def assess_loan():
             'reason': decision_reason,
             'ml_confidence': f"{ml_result['probability']:.1%}" if ml_result['probability'] else 'N/A',
             'explanation': explanation,
-            'rule_flags': rule_result['flags'],
+            'rule_flags': flags,
             'warnings': warnings,
             'processing_time_ms': processing_time,
             'timestamp': datetime.utcnow().isoformat()
-        })
+        }, detail)
+        result_cache.put(cache_key, {'response': response, 'audit': audit_record})
+        
+        return response, 200
     
     except Exception as e:
-        return jsonify({
+        return {
             'success': False,
             'error': str(e)
-        }), 500
-
-
-def prepare_features_for_ml(data):
-    """Prepare features for ML model"""
-    # Calculate derived features
-    total_income = float(data.get('applicant_income', 0)) + float(data.get('coapplicant_income', 0))
-    loan_amount = float(data.get('loan_amount', 0))
-    loan_term = float(data.get('loan_amount_term', 360))
-    
-    features = {
-        'ApplicantIncome': float(data.get('applicant_income', 0)),
-        'CoapplicantIncome': float(data.get('coapplicant_income', 0)),
-        'LoanAmount': loan_amount,
-        'Loan_Amount_Term': loan_term,
-        'Credit_History': int(data.get('credit_history', 0)),
-        'Self_Employed': int(data.get('self_employed', 0)),
-        'Dependents': int(data.get('dependents', 0)),
-        'Total_Income': total_income,
-        'Loan_to_Income': loan_amount / total_income if total_income > 0 else 0,
-        'Monthly_Payment': (loan_amount * 1000) / loan_term if loan_term > 0 else 0
-    }
-    
-    # DTI Ratio
-    monthly_income = total_income / 12 if total_income > 0 else 0
-    features['DTI_Ratio'] = (features['Monthly_Payment'] / monthly_income * 100) if monthly_income > 0 else 0
-    
-    # Encode property area
-    property_area_map = {'Urban': 2, 'Semiurban': 1, 'Rural': 0}
-    features['Property_Area'] = property_area_map.get(data.get('property_area', 'Urban'), 2)
-    
-    # Create DataFrame
-    feature_order = [
-        'ApplicantIncome', 'CoapplicantIncome', 'LoanAmount',
-        'Loan_Amount_Term', 'Credit_History', 'Self_Employed',
-        'Dependents', 'Total_Income', 'Loan_to_Income', 'DTI_Ratio',
-        'Property_Area'
-    ]
-    
-    return pd.DataFrame([features])[feature_order]
+        }, 500
 
 
-def prepare_feature_dict(data):
-    """Prepare feature dictionary for explainer"""
-    total_income = float(data.get('applicant_income', 0)) + float(data.get('coapplicant_income', 0))
-    loan_amount = float(data.get('loan_amount', 0))
+@app.route('/api/assess-loan', methods=['POST'])
+def assess_loan():
+    """
+    Main endpoint for loan risk assessment
+    Integrates: Validation → Rules → ML → Explainability → Audit
+    ?detail= (or X-Response-Detail) picks the response: decision, summary or full
+    """
+    detail = requested_detail()
+    if detail not in DETAIL_LEVELS:
+        return respond(invalid_detail(detail))
     
-    return {
-        'Credit_History': int(data.get('credit_history', 0)),
-        'Total_Income': total_income,
-        'Loan_to_Income': loan_amount / total_income if total_income > 0 else 0,
-        'DTI_Ratio': calculate_dti(data),
-        'LoanAmount': loan_amount
-    }
-
-
-def calculate_dti(data):
-    """Calculate DTI ratio"""
-    total_income = float(data.get('applicant_income', 0)) + float(data.get('coapplicant_income', 0))
-    loan_amount = float(data.get('loan_amount', 0))
-    loan_term = float(data.get('loan_amount_term', 360))
+    if not models.wait_until_ready(MODEL_READY_TIMEOUT):
+        return respond(model_not_ready())
     
-    monthly_payment = (loan_amount * 1000) / loan_term
-    monthly_income = total_income / 12
+    try:
+        data = request.json
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+    g.timer.lap('parse')
     
-    return (monthly_payment / monthly_income * 100) if monthly_income > 0 else 0
+    response = respond(assess_application(data, detail, request_metadata(), g.timer))
+    g.timer.lap('serialize')
+    return response
 
 
-def make_final_decision(rule_result, ml_result, warnings):
+@app.route('/api/assess-loans', methods=['POST'])
+def assess_loans():
     """
-    Make final decision combining rules and ML
-    Priority: Rules > ML (rules can override ML)
+    Batch endpoint for loan risk assessment
+    Accepts {"applications": [...]} (or a bare list) and returns one result
+    per application, in input order, with per-item errors
+    ?detail= (or X-Response-Detail) applies to every result
     """
-    rule_recommendation = rule_result['recommendation']
-    ml_prediction = ml_result.get('prediction')
-    ml_probability = ml_result.get('probability')
-    
-    # High confidence scenarios
-    if rule_recommendation == 'REJECT':
-        return 'REJECTED', 'HIGH', 'Rule-based rejection due to critical risk factors'
+    detail = requested_detail()
+    if detail not in DETAIL_LEVELS:
+        return respond(invalid_detail(detail))
     
-    if rule_recommendation == 'MANUAL_REVIEW':
-        return 'MANUAL_REVIEW', rule_result['risk_level'], 'Medium/High risk requires human review'
+    if not models.wait_until_ready(MODEL_READY_TIMEOUT):
+        return respond(model_not_ready())
     
-    # Proceed to ML (if available)
-    if rule_recommendation == 'PROCEED_TO_ML':
-        if ml_prediction and ml_probability:
-            if ml_prediction == 'APPROVE' and ml_probability >= 0.7:
-                return 'APPROVED', 'LOW', f'Strong approval indicators (ML confidence: {ml_probability:.1%})'
-            elif ml_prediction == 'APPROVE' and ml_probability >= 0.5:
-                return 'MANUAL_REVIEW', 'MEDIUM', f'Moderate approval indicators (ML confidence: {ml_probability:.1%})'
-            else:
-                return 'REJECTED', 'MEDIUM', f'Insufficient approval indicators (ML confidence: {ml_probability:.1%})'
-        else:
-            # No ML available - approve low risk cases
-            return 'APPROVED', 'LOW', 'Low risk based on business rules'
+    try:
+        payload = request.json
+        applications = payload.get('applications') if isinstance(payload, dict) else payload
+        
+        if not isinstance(applications, list):
+            return jsonify({
+                'success': False,
+                'error': 'Expected a list of applications'
+            }), 400
+        
+        if len(applications) > MAX_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'error': f'Batch too large: {len(applications)} applications (max {MAX_BATCH_SIZE})'
+            }), 413
+        
+        batch_scorer = BatchScorer(
+            models.forest if models.ml_available else None,
+            models.explainer,
+            models.features
+        )
+        results, audit_records = batch_scorer.score(applications, detail)
+        g.timer.lap('batch_score')
+        
+        # Log every assessed application in a single transaction
+        metadata = request_metadata()
+        for record in audit_records:
+            record['metadata'] = metadata
+            decisions_total.labels(record['final_decision']).inc()
+        audit_logger.log_decisions(audit_records)
+        g.timer.lap('audit')
+        
+        return jsonify({
+            'success': True,
+            'count': len(results),
+            'results': results,
+            'processing_time_ms': int(g.timer.elapsed() * 1000),
+            'timestamp': datetime.utcnow().isoformat()
+        })
     
-    # Default
-    return 'MANUAL_REVIEW', 'MEDIUM', 'Unable to make automated decision'
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
 
 
 @app.route('/api/statistics', methods=['GET'])
@@ -335,24 +589,84 @@ def get_statistics():
     return jsonify(stats)
 
 
-@app.route('/api/recent-decisions', methods=['GET'])
-def get_recent_decisions():
-    """Get recent decisions"""
-    limit = request.args.get('limit', 100, type=int)
-    decisions = audit_logger.get_recent_decisions(limit)
+@app.route('/api/statistics/timeseries', methods=['GET'])
+def get_statistics_timeseries():
+    """Get audit statistics per minute, hour or day"""
+    bucket = request.args.get('bucket', 'hour')
+    
+    try:
+        series = audit_logger.get_timeseries(
+            bucket,
+            start=request.args.get('from'),
+            end=request.args.get('to'),
+            limit=request.args.get('limit', 1000, type=int)
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     
     return jsonify({
+        'bucket': bucket,
+        'count': len(series),
+        'series': series
+    })
+
+
+@app.route('/api/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Get result cache hit/miss/eviction counters"""
+    return jsonify(result_cache.stats())
+
+
+def recent_decisions(limit=100, cursor=None, decision=None, risk_level=None):
+    """One page of recent decisions as (body, status)"""
+    if decision is not None and decision not in VALID_DECISIONS:
+        return {'success': False, 'error': f'decision must be one of: {VALID_DECISIONS}'}, 400
+    if risk_level is not None and risk_level not in VALID_RISK_LEVELS:
+        return {'success': False, 'error': f'risk_level must be one of: {VALID_RISK_LEVELS}'}, 400
+    
+    try:
+        page = audit_logger.get_decisions_page(
+            limit,
+            cursor=cursor,
+            decision=decision,
+            risk_level=risk_level
+        )
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}, 400
+    
+    decisions = page['decisions']
+    
+    return {
         'count': len(decisions),
+        'next_cursor': page['next_cursor'],
         'decisions': [
             {
-                'application_id': d[0],
-                'timestamp': d[1],
-                'decision': d[2],
-                'risk_level': d[3]
+                'application_id': d[1],
+                'timestamp': d[2],
+                'decision': d[3],
+                'risk_level': d[4]
             }
             for d in decisions
         ]
-    })
+    }, 200
+
+
+@app.route('/api/recent-decisions', methods=['GET'])
+def get_recent_decisions():
+    """
+    Get recent decisions, newest first
+    Pass next_cursor back as ?cursor= to fetch the following page;
+    ?decision= and ?risk_level= filter the results
+    """
+    return respond(recent_decisions(
+        request.args.get('limit', 100, type=int),
+        cursor=request.args.get('cursor'),
+        decision=request.args.get('decision'),
+        risk_level=request.args.get('risk_level')
+    ))
 
 
 if __name__ == '__main__':
@@ -372,4 +686,7 @@ if __name__ == '__main__':
     print(f"Starting server on port {port}")
     print("="*50 + "\n")
     
+    # Exit normally on SIGTERM so atexit handlers flush queued audit writes
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
     app.run(debug=debug_mode, host='0.0.0.0', port=port)
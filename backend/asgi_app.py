@@ -0,0 +1,277 @@
+"""
+ASGI Application
+Async serving mode for the assessment API: the same contracts as app.py, with
+scoring and database calls run in a thread pool so the event loop only moves bytes
+
+Run: uvicorn asgi_app:app --port 5000
+     python asgi_app.py
+"""
+
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import uvicorn
+
+# Shares the models, result cache, micro-batchers and audit logger with the Flask app
+import app as service
+from metrics import StageTimer
+from pipeline import DETAIL_LEVELS
+
+# Threads for CPU-bound scoring and SQLite calls
+executor = ThreadPoolExecutor(
+    int(os.environ.get('ASGI_WORKER_THREADS', 8)),
+    thread_name_prefix='asgi-worker'
+)
+
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = int(os.environ.get('MAX_BODY_BYTES', 1024 * 1024))
+
+# Seconds an idle keep-alive connection is held open
+KEEP_ALIVE_TIMEOUT = int(os.environ.get('KEEP_ALIVE_TIMEOUT', 5))
+
+# Pending connections the listening socket queues
+LISTEN_BACKLOG = int(os.environ.get('LISTEN_BACKLOG', 1024))
+
+
+class Request:
+    """The parts of an ASGI HTTP scope the handlers use"""
+
+    def __init__(self, scope, body, timer):
+        self.timer = timer
+        self.method = scope['method']
+        self.path = scope['path']
+        self.query = {
+            name: values[0]
+            for name, values in parse_qs(scope.get('query_string', b'').decode('latin-1')).items()
+        }
+        self.headers = {
+            name.decode('latin-1').lower(): value.decode('latin-1')
+            for name, value in scope.get('headers', [])
+        }
+        self.client = scope.get('client')
+        self.body = body
+
+    def int_arg(self, name, default):
+        """Query parameter as an int, default when missing or malformed (like Flask's type=int)"""
+        try:
+            return int(self.query[name])
+        except (KeyError, ValueError):
+            return default
+
+    def metadata(self):
+        """Client details stored with every audit record"""
+        return {
+            'user_agent': self.headers.get('user-agent'),
+            'ip_address': self.client[0] if self.client else None
+        }
+
+
+async def run_in_executor(fn, *args):
+    """fn(*args) on the worker pool, without blocking the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+async def health_check(request):
+    """Health check (503 until the model is loaded and warmed up)"""
+    return service.health()
+
+
+async def assess_loan(request):
+    """
+    Loan risk assessment, as POST /api/assess-loan on the Flask app
+    ?detail= (or X-Response-Detail) picks the response: decision, summary or full
+    """
+    detail = service.detail_level(request.query.get('detail'), request.headers.get('x-response-detail'))
+    if detail not in DETAIL_LEVELS:
+        return service.invalid_detail(detail)
+
+    if not service.models.ready:
+        if not await run_in_executor(service.models.wait_until_ready, service.MODEL_READY_TIMEOUT):
+            return service.model_not_ready()
+
+    try:
+        data = json.loads(request.body)
+    except ValueError as e:
+        return {
+            'success': False,
+            'error': f'Invalid JSON body: {e}'
+        }, 400
+    request.timer.lap('parse')
+
+    profile = service.profiler.wanted(request.headers.get('x-profile'))
+    return await run_in_executor(assess_in_worker, data, detail, request.metadata(), request.timer, profile)
+
+
+def assess_in_worker(data, detail, metadata, timer, profile=False):
+    """
+    assess_application on a worker thread, lapping the wait for a free worker as 'queue'
+    profile: trace the call into the profile (the event loop's share is not profiled)
+    """
+    timer.lap('queue')
+    if profile:
+        return service.profiler.run(service.assess_application, data, detail, metadata, timer)
+    return service.assess_application(data, detail, metadata, timer)
+
+
+async def get_metrics(request):
+    """Metrics in the Prometheus text exposition format"""
+    return service.metrics.render(), 200
+
+
+async def get_profile(request):
+    """Profiled requests' stacks in collapsed format (?reset=1 clears them after reading)"""
+    return service.profile_report(request.headers.get('x-profile'), request.query.get('reset') in ('1', 'true'))
+
+
+async def get_statistics(request):
+    """Audit statistics"""
+    return await run_in_executor(service.audit_logger.get_statistics), 200
+
+
+async def get_recent_decisions(request):
+    """Recent decisions, newest first, paged with ?cursor= and filtered by ?decision= / ?risk_level="""
+    return await run_in_executor(
+        service.recent_decisions,
+        request.int_arg('limit', 100),
+        request.query.get('cursor'),
+        request.query.get('decision'),
+        request.query.get('risk_level')
+    )
+
+
+# Content type of handlers that answer with text instead of JSON
+TEXT_CONTENT_TYPES = {
+    '/metrics': b'text/plain; version=0.0.4; charset=utf-8'
+}
+
+ROUTES = {
+    ('GET', '/health'): health_check,
+    ('GET', '/metrics'): get_metrics,
+    ('GET', '/admin/profile'): get_profile,
+    ('POST', '/api/assess-loan'): assess_loan,
+    ('GET', '/api/statistics'): get_statistics,
+    ('GET', '/api/recent-decisions'): get_recent_decisions
+}
+
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    timer = StageTimer(service.stage_seconds)
+    endpoint = 'unmatched'
+    body = await read_body(receive)
+
+    if body is None:
+        result = {'success': False, 'error': f'Request body over {MAX_BODY_BYTES} bytes'}, 413
+    elif scope['method'] == 'OPTIONS':
+        await send_response(send, 204, b'', [
+            (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+            (b'access-control-allow-headers', b'Content-Type, X-Response-Detail, X-Profile')
+        ])
+        return
+    else:
+        handler = ROUTES.get((scope['method'], scope['path']))
+        if handler is None:
+            known_path = any(path == scope['path'] for _, path in ROUTES)
+            result = ({'success': False, 'error': 'Method not allowed'}, 405) if known_path \
+                else ({'success': False, 'error': 'Not found'}, 404)
+        else:
+            endpoint = scope['path']
+            result = await handler(Request(scope, body, timer))
+
+    response_body, status = result
+    if isinstance(response_body, str):
+        payload = response_body.encode()
+        headers = [(b'content-type', TEXT_CONTENT_TYPES.get(endpoint, b'text/plain; charset=utf-8'))]
+    else:
+        # Same encoding as Flask's jsonify outside debug mode
+        payload = json.dumps(response_body, sort_keys=True, separators=(',', ':')).encode() + b'\n'
+        headers = [(b'content-type', b'application/json')]
+
+    if timer.laps:
+        timer.lap('serialize')
+        headers.append((b'server-timing', timer.server_timing().encode()))
+    service.request_seconds.labels(endpoint).observe(timer.elapsed())
+    service.requests_total.labels(endpoint, str(status)).inc()
+    await send_response(send, status, payload, headers)
+
+
+async def read_body(receive):
+    """Whole request body, or None once it passes MAX_BODY_BYTES"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] != 'http.request':
+            break
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def send_response(send, status, payload, headers):
+    """Send one complete response (CORS open like flask_cors' defaults)"""
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers + [
+            (b'content-length', str(len(payload)).encode()),
+            (b'access-control-allow-origin', b'*')
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def lifespan(receive, send):
+    """Startup is done at import; shutdown drains the worker pool and audit queue"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+def shutdown():
+    """Finish in-flight work and flush queued audit writes"""
+    executor.shutdown(wait=True)
+    service.audit_logger.close()
+
+
+def main():
+    host = os.environ.get('HOST', '0.0.0.0')
+    port = int(os.environ.get('PORT', 5000))
+
+    print("\n" + "="*50)
+    print("🏦 Loan Approval Risk Analysis API (ASGI)")
+    print("="*50)
+    print(f"Starting server on port {port}")
+    print("="*50 + "\n")
+
+    uvicorn.run(
+        app,
+        host=host,
+        port=port,
+        log_level='warning',
+        timeout_keep_alive=KEEP_ALIVE_TIMEOUT,
+        backlog=LISTEN_BACKLOG
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -5,61 +5,386 @@ Stores all loan decisions for compliance and auditing
 
 import sqlite3
 import json
-from datetime import datetime
+import base64
+import queue
+import threading
+import time
+import atexit
+import glob
+from contextlib import contextmanager
+from datetime import datetime, timezone
 import os
 
+from pipeline import audit_messages
+
+
+def _process_alive(pid):
+    """Whether a process with this pid is running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
 class AuditLogger:
     
-    def __init__(self, db_path='logs/audit.db'):
-        """Initialize audit logger with database path"""
+    INSERT_SQL = '''
+        INSERT INTO audit_log (
+            application_id, timestamp, applicant_data,
+            validation_status, validation_errors, validation_warnings,
+            rule_risk_level, rule_risk_score, rule_flags,
+            ml_probability, ml_prediction,
+            final_decision, final_risk_level, decision_reason,
+            processing_time_ms, user_agent, ip_address,
+            validation_error_bits, validation_warning_bits, rule_flag_mask
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    
+    # Integer code columns (data_validator ERROR_BITS / WARNING_BITS and
+    # risk_rules FLAG_* masks); added to databases created before them
+    CODE_COLUMNS = ['validation_error_bits', 'validation_warning_bits', 'rule_flag_mask']
+    
+    # Prepared statements kept per pooled connection (sqlite3 default: 128)
+    STATEMENT_CACHE_SIZE = 256
+    
+    # Attempts made by the background writer before spilling a batch to disk
+    WRITE_RETRIES = 3
+    
+    # Rows the writer could not commit, one JSON row per line next to the
+    # database; replayed on the next successful write or start-up
+    SPILL_SUFFIX = '.spill.jsonl'
+    
+    # Rollup granularity -> (ISO timestamp prefix length, suffix) giving the
+    # bucket key, e.g. hour '2026-01-05T10' + ':00'
+    ROLLUP_BUCKETS = {
+        'minute': (16, ''),
+        'hour': (13, ':00'),
+        'day': (10, ''),
+    }
+    
+    # Most rows get_decisions_page returns in one call
+    MAX_PAGE_SIZE = 1000
+    
+    # Most buckets get_timeseries returns in one call
+    MAX_TIMESERIES_BUCKETS = 5000
+    
+    # Queue marker that tells the writer thread to drain and exit
+    _STOP = object()
+    
+    def __init__(self, db_path='logs/audit.db', pool_size=4, synchronous='NORMAL', busy_timeout=30.0,
+                 async_writes=False, batch_size=200, flush_interval_ms=50, max_queue_size=10000,
+                 enqueue_timeout=None):
+        """
+        Initialize audit logger with database path
+        
+        pool_size: connections kept open and shared by all threads
+        synchronous: SQLite synchronous level; NORMAL is durable against
+                     crashes in WAL mode and only fsyncs at checkpoints
+        busy_timeout: seconds a writer waits for the database lock
+        
+        With async_writes, log_decision only queues the row. A background
+        thread commits queued rows in transactions of up to batch_size rows
+        or every flush_interval_ms. When max_queue_size rows are waiting,
+        callers block for up to enqueue_timeout seconds (None = until space
+        frees up) and then write synchronously. close() drains the queue.
+        """
         self.db_path = db_path
+        self.pool_size = pool_size
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        
+        self._pool = queue.LifoQueue()
+        self._pool_lock = threading.Lock()
+        self._open_connections = 0
+        self._pool_pid = os.getpid()
+        
         self._initialize_database()
+        
+        self.async_writes = async_writes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.enqueue_timeout = enqueue_timeout
+        self._closed = False
+        self._writer = None
+        
+        # Writer failures, exported as metrics: failed attempts, rows spilled
+        # to the spill file, and rows lost because the spill write failed too
+        self.spill_path = db_path + self.SPILL_SUFFIX
+        self.write_errors = 0
+        self.spilled_rows = 0
+        self.dropped_rows = 0
+        self._spill_pending = False
+        
+        # Callers inside _enqueue; close() waits for them before the stop marker
+        self._enqueue_state = threading.Condition()
+        self._enqueuing = 0
+        
+        self._recover_spill()
+        
+        if async_writes:
+            self._queue = queue.Queue(maxsize=max_queue_size)
+            self._writer = threading.Thread(target=self._write_loop, name='audit-writer', daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+    
+    def _connect(self):
+        """Open a tuned connection for the pool"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+            cached_statements=self.STATEMENT_CACHE_SIZE
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        return conn
+    
+    @contextmanager
+    def _connection(self):
+        """Borrow a pooled connection, opening one if the pool is not full"""
+        # Connections must not cross a fork; start a fresh pool in the child
+        if os.getpid() != self._pool_pid:
+            with self._pool_lock:
+                if os.getpid() != self._pool_pid:
+                    self._pool = queue.LifoQueue()
+                    self._open_connections = 0
+                    self._pool_pid = os.getpid()
+        
+        pool = self._pool
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                can_open = self._open_connections < self.pool_size
+                if can_open:
+                    self._open_connections += 1
+            conn = self._connect() if can_open else pool.get()
+        
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            pool.put(conn)
+    
+    def close(self):
+        """Flush queued writes, stop the background writer and close idle connections"""
+        if self._writer is not None:
+            with self._enqueue_state:
+                if self._closed:
+                    return
+                # New rows are written synchronously from here on, so nothing
+                # can land behind the stop marker
+                self._closed = True
+                self._enqueue_state.wait_for(lambda: self._enqueuing == 0)
+            self._queue.put(self._STOP)
+            self._writer.join()
+        
+        with self._pool_lock:
+            while True:
+                try:
+                    conn = self._pool.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+                self._open_connections -= 1
     
     def _initialize_database(self):
         """Create audit table if it doesn't exist"""
         # Ensure directory exists
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            
+            # One transaction, so concurrent writers cannot slip in between
+            # creating the summary trigger and backfilling existing rows
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS audit_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    application_id TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    applicant_data TEXT NOT NULL,
+                    validation_status TEXT,
+                    validation_errors TEXT,
+                    validation_warnings TEXT,
+                    rule_risk_level TEXT,
+                    rule_risk_score INTEGER,
+                    rule_flags TEXT,
+                    ml_probability REAL,
+                    ml_prediction TEXT,
+                    final_decision TEXT NOT NULL,
+                    final_risk_level TEXT NOT NULL,
+                    decision_reason TEXT,
+                    processing_time_ms INTEGER,
+                    user_agent TEXT,
+                    ip_address TEXT,
+                    validation_error_bits INTEGER,
+                    validation_warning_bits INTEGER,
+                    rule_flag_mask INTEGER
+                )
+            ''')
+            
+            existing = {row[1] for row in cursor.execute('PRAGMA table_info(audit_log)')}
+            for column in self.CODE_COLUMNS:
+                if column not in existing:
+                    cursor.execute(f'ALTER TABLE audit_log ADD COLUMN {column} INTEGER')
+            
+            # Create index on application_id for fast lookups
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_application_id 
+                ON audit_log(application_id)
+            ''')
+            
+            # Covering indexes for recent-decision pages, newest first:
+            # (timestamp, id) is the keyset, the rest are the returned columns.
+            # The unfiltered one supersedes the old single-column idx_timestamp.
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_recent 
+                ON audit_log(timestamp, id, application_id, final_decision, final_risk_level)
+            ''')
+            cursor.execute('DROP INDEX IF EXISTS idx_timestamp')
+            
+            # Same keyset behind an equality filter on decision or risk level
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_recent_by_decision 
+                ON audit_log(final_decision, timestamp, id, application_id, final_risk_level)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_recent_by_risk 
+                ON audit_log(final_risk_level, timestamp, id, application_id, final_decision)
+            ''')
+            
+            self._initialize_summary(cursor)
+            self._initialize_rollups(cursor)
+            
+            conn.commit()
+    
+    def _initialize_summary(self, cursor):
+        """
+        Create the running statistics table and the trigger that maintains it
+        Counters are updated inside the same transaction as every insert, so
+        get_statistics reads a handful of rows however large audit_log gets
+        """
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'audit_summary'"
+        ).fetchone()
         
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS audit_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                application_id TEXT NOT NULL,
-                timestamp TEXT NOT NULL,
-                applicant_data TEXT NOT NULL,
-                validation_status TEXT,
-                validation_errors TEXT,
-                validation_warnings TEXT,
-                rule_risk_level TEXT,
-                rule_risk_score INTEGER,
-                rule_flags TEXT,
-                ml_probability REAL,
-                ml_prediction TEXT,
+            CREATE TABLE IF NOT EXISTS audit_summary (
                 final_decision TEXT NOT NULL,
                 final_risk_level TEXT NOT NULL,
-                decision_reason TEXT,
-                processing_time_ms INTEGER,
-                user_agent TEXT,
-                ip_address TEXT
-            )
+                decision_count INTEGER NOT NULL DEFAULT 0,
+                processing_time_total INTEGER NOT NULL DEFAULT 0,
+                processing_time_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (final_decision, final_risk_level)
+            ) WITHOUT ROWID
         ''')
         
-        # Create index on application_id for fast lookups
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_application_id 
-            ON audit_log(application_id)
+            CREATE TRIGGER IF NOT EXISTS trg_audit_summary
+            AFTER INSERT ON audit_log
+            BEGIN
+                INSERT OR IGNORE INTO audit_summary (final_decision, final_risk_level)
+                VALUES (NEW.final_decision, NEW.final_risk_level);
+                
+                UPDATE audit_summary SET
+                    decision_count = decision_count + 1,
+                    processing_time_total = processing_time_total + COALESCE(NEW.processing_time_ms, 0),
+                    processing_time_count = processing_time_count + (NEW.processing_time_ms IS NOT NULL)
+                WHERE final_decision = NEW.final_decision
+                  AND final_risk_level = NEW.final_risk_level;
+            END
         ''')
         
-        # Create index on timestamp for time-based queries
+        # Databases created before the summary table existed: count what is there
+        if not exists:
+            cursor.execute('''
+                INSERT INTO audit_summary (
+                    final_decision, final_risk_level,
+                    decision_count, processing_time_total, processing_time_count
+                )
+                SELECT final_decision, final_risk_level,
+                       COUNT(*), COALESCE(SUM(processing_time_ms), 0), COUNT(processing_time_ms)
+                FROM audit_log
+                GROUP BY final_decision, final_risk_level
+            ''')
+    
+    def _initialize_rollups(self, cursor):
+        """
+        Create per-minute/hour/day rollups of audit_log, maintained by trigger
+        Buckets are keyed by a prefix of the ISO timestamp (see ROLLUP_BUCKETS)
+        """
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'audit_rollup'"
+        ).fetchone()
+        
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_timestamp 
-            ON audit_log(timestamp)
+            CREATE TABLE IF NOT EXISTS audit_rollup (
+                bucket_size TEXT NOT NULL,
+                bucket_start TEXT NOT NULL,
+                total INTEGER NOT NULL DEFAULT 0,
+                approved INTEGER NOT NULL DEFAULT 0,
+                rejected INTEGER NOT NULL DEFAULT 0,
+                manual_review INTEGER NOT NULL DEFAULT 0,
+                high_risk INTEGER NOT NULL DEFAULT 0,
+                medium_risk INTEGER NOT NULL DEFAULT 0,
+                low_risk INTEGER NOT NULL DEFAULT 0,
+                processing_time_total INTEGER NOT NULL DEFAULT 0,
+                processing_time_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket_size, bucket_start)
+            ) WITHOUT ROWID
         ''')
         
-        conn.commit()
-        conn.close()
+        for bucket_size, (prefix_length, suffix) in self.ROLLUP_BUCKETS.items():
+            key = f"substr(NEW.timestamp, 1, {prefix_length}) || '{suffix}'"
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_audit_rollup_{bucket_size}
+                AFTER INSERT ON audit_log
+                BEGIN
+                    INSERT OR IGNORE INTO audit_rollup (bucket_size, bucket_start)
+                    VALUES ('{bucket_size}', {key});
+                    
+                    UPDATE audit_rollup SET
+                        total = total + 1,
+                        approved = approved + (NEW.final_decision = 'APPROVED'),
+                        rejected = rejected + (NEW.final_decision = 'REJECTED'),
+                        manual_review = manual_review + (NEW.final_decision = 'MANUAL_REVIEW'),
+                        high_risk = high_risk + (NEW.final_risk_level = 'HIGH'),
+                        medium_risk = medium_risk + (NEW.final_risk_level = 'MEDIUM'),
+                        low_risk = low_risk + (NEW.final_risk_level = 'LOW'),
+                        processing_time_total = processing_time_total + COALESCE(NEW.processing_time_ms, 0),
+                        processing_time_count = processing_time_count + (NEW.processing_time_ms IS NOT NULL)
+                    WHERE bucket_size = '{bucket_size}' AND bucket_start = {key};
+                END
+            ''')
+            
+            # Databases created before the rollups existed: bucket what is there
+            if not exists:
+                backfill_key = f"substr(timestamp, 1, {prefix_length}) || '{suffix}'"
+                cursor.execute(f'''
+                    INSERT INTO audit_rollup
+                    SELECT '{bucket_size}', {backfill_key},
+                           COUNT(*),
+                           SUM(final_decision = 'APPROVED'),
+                           SUM(final_decision = 'REJECTED'),
+                           SUM(final_decision = 'MANUAL_REVIEW'),
+                           SUM(final_risk_level = 'HIGH'),
+                           SUM(final_risk_level = 'MEDIUM'),
+                           SUM(final_risk_level = 'LOW'),
+                           COALESCE(SUM(processing_time_ms), 0),
+                           COUNT(processing_time_ms)
+                    FROM audit_log
+                    GROUP BY {backfill_key}
+                ''')
     
     def log_decision(self, decision_data):
         """
@@ -68,41 +393,229 @@ class AuditLogger:
         decision_data should contain:
         - application_id
         - applicant_data
-        - validation_result
-        - rule_result
+        - validation_result (is_valid, error_bits, warning_bits)
+        - rule_result (risk_level, risk_score, flag_mask)
         - ml_result
         - final_decision
         - processing_time_ms
         - metadata (optional)
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        row = self._decision_row(decision_data)
+        
+        # Async mode returns before the row is committed, so there is no id yet
+        if self._writer is not None and self._enqueue(row):
+            return None
+        
+        with self._connection() as conn:
+            cursor = conn.execute(self.INSERT_SQL, row)
+            conn.commit()
+            return cursor.lastrowid
+    
+    def log_decisions(self, decisions):
+        """
+        Log many loan decisions in a single transaction
+        Each item has the same shape as log_decision's decision_data
+        """
+        if not decisions:
+            return 0
+        
+        rows = [self._decision_row(d) for d in decisions]
+        
+        if self._writer is not None:
+            rows = [row for row in rows if not self._enqueue(row)]
+        
+        if rows:
+            self._insert_rows(rows)
+        
+        return len(decisions)
+    
+    @property
+    def pending_writes(self):
+        """Rows queued but not yet committed (always 0 in synchronous mode)"""
+        return self._queue.unfinished_tasks if self._writer is not None else 0
+    
+    def flush(self):
+        """Block until every queued row has been committed"""
+        if self._writer is not None:
+            self._queue.join()
+    
+    def _enqueue(self, row):
+        """Queue a row for the writer; False means the caller must write it itself"""
+        with self._enqueue_state:
+            if self._closed:
+                return False
+            self._enqueuing += 1
+        try:
+            self._queue.put(row, timeout=self.enqueue_timeout)
+            return True
+        except queue.Full:
+            return False
+        finally:
+            with self._enqueue_state:
+                self._enqueuing -= 1
+                if self._enqueuing == 0:
+                    self._enqueue_state.notify_all()
+    
+    def _insert_rows(self, rows):
+        """Insert rows in one transaction"""
+        with self._connection() as conn:
+            conn.executemany(self.INSERT_SQL, rows)
+            conn.commit()
+    
+    def _write_loop(self):
+        """Background writer: group queued rows into transactions"""
+        stopping = False
+        
+        while not stopping:
+            first = self._queue.get()
+            if first is self._STOP:
+                self._queue.task_done()
+                break
+            
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    row = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if row is self._STOP:
+                    # Everything queued before the marker is already in hand
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(row)
+            
+            self._write_batch(batch)
+            for _ in batch:
+                self._queue.task_done()
+    
+    def _write_batch(self, batch):
+        """
+        Commit one batch, retrying transient failures such as a locked database
+        A batch that still fails is kept in the spill file and replayed later
+        """
+        for attempt in range(1, self.WRITE_RETRIES + 1):
+            try:
+                self._insert_rows(batch)
+                break
+            except sqlite3.OperationalError:
+                self.write_errors += 1
+                if attempt == self.WRITE_RETRIES:
+                    self._spill(batch)
+                    return
+                time.sleep(0.1 * attempt)
+            except sqlite3.Error:
+                # A row the schema rejects fails every retry; commit the rest one by one
+                self.write_errors += 1
+                self._insert_each(batch)
+                break
+        
+        if self._spill_pending:
+            self._replay_spill()
+    
+    def _insert_each(self, rows):
+        """Insert rows one transaction each, spilling or dropping only the ones that fail"""
+        for row in rows:
+            try:
+                self._insert_rows([row])
+            except sqlite3.OperationalError:
+                self._spill([row])
+            except sqlite3.Error:
+                self.dropped_rows += 1
+    
+    def _spill(self, rows):
+        """Append rows the writer could not commit to the spill file"""
+        if self._append_spill(rows):
+            self.spilled_rows += len(rows)
+    
+    def _append_spill(self, rows):
+        """Append rows to the spill file; False (rows dropped) if it cannot be written"""
+        try:
+            with open(self.spill_path, 'a') as f:
+                f.write(''.join(json.dumps(row) + '\n' for row in rows))
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            self.dropped_rows += len(rows)
+            return False
+        self._spill_pending = True
+        return True
+    
+    def _recover_spill(self):
+        """Replay the spill file, and claims left by processes that died while replaying"""
+        for path in glob.glob(glob.escape(self.spill_path) + '.*'):
+            pid = path.rsplit('.', 1)[1]
+            if pid.isdigit() and (int(pid) == os.getpid() or not _process_alive(int(pid))):
+                self._replay_file(path)
+        self._replay_spill()
+    
+    def _replay_spill(self):
+        """Commit rows left in the spill file; they stay there if the database still fails"""
+        self._spill_pending = False
+        
+        # Claim the file first so another process replaying it cannot insert the rows twice
+        claimed = f'{self.spill_path}.{os.getpid()}'
+        try:
+            os.replace(self.spill_path, claimed)
+        except OSError:
+            return
+        self._replay_file(claimed)
+    
+    def _replay_file(self, path):
+        """Commit the rows of a claimed spill file and remove it"""
+        rows = []
+        try:
+            with open(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        rows.append(tuple(json.loads(line)))
+                    except ValueError:
+                        # A line torn by a crash while it was being appended
+                        self.dropped_rows += 1
+        except OSError:
+            return
         
+        try:
+            if rows:
+                self._insert_rows(rows)
+        except sqlite3.OperationalError:
+            self.write_errors += 1
+            self._append_spill(rows)
+        except sqlite3.Error:
+            # Rows the schema rejects are dropped without holding back the rest
+            self.write_errors += 1
+            self._insert_each(rows)
+        
+        os.remove(path)
+    
+    @staticmethod
+    def _decision_row(decision_data):
+        """
+        Flatten decision_data into an audit_log row
+        Codes and masks go to the integer columns; the JSON text columns are
+        only filled for callers that still pass errors / warnings / flags text
+        """
         # Extract data
         validation = decision_data.get('validation_result', {})
         rule = decision_data.get('rule_result', {})
         ml = decision_data.get('ml_result', {})
         metadata = decision_data.get('metadata', {})
         
-        cursor.execute('''
-            INSERT INTO audit_log (
-                application_id, timestamp, applicant_data,
-                validation_status, validation_errors, validation_warnings,
-                rule_risk_level, rule_risk_score, rule_flags,
-                ml_probability, ml_prediction,
-                final_decision, final_risk_level, decision_reason,
-                processing_time_ms, user_agent, ip_address
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        return (
             decision_data.get('application_id', 'N/A'),
             datetime.utcnow().isoformat(),
             json.dumps(decision_data.get('applicant_data', {})),
             'VALID' if validation.get('is_valid') else 'INVALID',
-            json.dumps(validation.get('errors', [])),
-            json.dumps(validation.get('warnings', [])),
+            json.dumps(validation['errors']) if 'errors' in validation else None,
+            json.dumps(validation['warnings']) if 'warnings' in validation else None,
             rule.get('risk_level'),
             rule.get('risk_score'),
-            json.dumps(rule.get('flags', [])),
+            json.dumps(rule['flags']) if 'flags' in rule else None,
             ml.get('probability'),
             ml.get('prediction'),
             decision_data.get('final_decision'),
@@ -110,84 +623,210 @@ class AuditLogger:
             decision_data.get('decision_reason'),
             decision_data.get('processing_time_ms'),
             metadata.get('user_agent'),
-            metadata.get('ip_address')
-        ))
-        
-        conn.commit()
-        record_id = cursor.lastrowid
-        conn.close()
-        
-        return record_id
+            metadata.get('ip_address'),
+            validation.get('error_bits'),
+            validation.get('warning_bits'),
+            rule.get('flag_mask')
+        )
     
     def get_application_history(self, application_id):
-        """Retrieve audit history for a specific application"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM audit_log 
-            WHERE application_id = ? 
-            ORDER BY timestamp DESC
-        ''', (application_id,))
-        
-        rows = cursor.fetchall()
-        conn.close()
+        """
+        Retrieve audit history for a specific application
+        Rows stored as codes only get their errors, warnings and rule flags
+        text columns rendered from the codes, as the API reported them
+        """
+        with self._connection() as conn:
+            cursor = conn.execute('''
+                SELECT * FROM audit_log 
+                WHERE application_id = ? 
+                ORDER BY timestamp DESC
+            ''', (application_id,))
+            columns = [description[0] for description in cursor.description]
+            rows = cursor.fetchall()
+        return [self._with_messages(row, columns) for row in rows]
+    
+    @staticmethod
+    def _with_messages(row, columns):
+        """row with NULL text columns filled from its code columns"""
+        record = dict(zip(columns, row))
+        codes = [record[column] for column in AuditLogger.CODE_COLUMNS]
+        if record['validation_errors'] is not None or all(code is None for code in codes):
+            return row
         
-        return rows
+        error_bits, warning_bits, flag_mask = codes
+        text = audit_messages(json.loads(record['applicant_data']), error_bits, warning_bits, flag_mask)
+        record['validation_errors'] = json.dumps(text['errors'])
+        record['validation_warnings'] = json.dumps(text['warnings'])
+        if flag_mask is not None:
+            record['rule_flags'] = json.dumps(text['rule_flags'])
+        return tuple(record.values())
     
     def get_recent_decisions(self, limit=100):
         """Get recent decisions"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        page = self.get_decisions_page(limit)
+        return [row[1:] for row in page['decisions']]
+    
+    def get_decisions_page(self, limit=100, cursor=None, decision=None, risk_level=None):
+        """
+        One page of decisions, newest first, using keyset pagination
         
-        cursor.execute('''
-            SELECT application_id, timestamp, final_decision, final_risk_level
-            FROM audit_log 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        ''', (limit,))
+        cursor: next_cursor from the previous page (None for the first page)
+        decision / risk_level: optional equality filters
+        Returns: {'decisions': [(id, application_id, timestamp, decision, risk_level)],
+                  'next_cursor': str or None}
+        """
+        limit = max(1, min(int(limit), self.MAX_PAGE_SIZE))
         
-        rows = cursor.fetchall()
-        conn.close()
+        query = '''
+            SELECT id, application_id, timestamp, final_decision, final_risk_level
+            FROM audit_log
+            WHERE 1 = 1
+        '''
+        params = []
+        if decision is not None:
+            query += ' AND final_decision = ?'
+            params.append(decision)
+        if risk_level is not None:
+            query += ' AND final_risk_level = ?'
+            params.append(risk_level)
+        if cursor:
+            query += ' AND (timestamp, id) < (?, ?)'
+            params.extend(self._decode_cursor(cursor))
+        
+        # One extra row tells us whether another page exists
+        query += ' ORDER BY timestamp DESC, id DESC LIMIT ?'
+        params.append(limit + 1)
+        
+        with self._connection() as conn:
+            rows = conn.execute(query, params).fetchall()
         
-        return rows
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = self._encode_cursor(last[2], last[0])
+        
+        return {'decisions': rows, 'next_cursor': next_cursor}
+    
+    @staticmethod
+    def _encode_cursor(timestamp, record_id):
+        """Opaque page cursor for the (timestamp, id) keyset"""
+        return base64.urlsafe_b64encode(f"{timestamp}|{record_id}".encode()).decode()
+    
+    @staticmethod
+    def _decode_cursor(cursor):
+        """Inverse of _encode_cursor"""
+        try:
+            timestamp, record_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+            return timestamp, int(record_id)
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Invalid cursor")
     
     def get_statistics(self):
         """Get decision statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._connection() as conn:
+            rows = conn.execute('''
+                SELECT final_decision, final_risk_level,
+                       decision_count, processing_time_total, processing_time_count
+                FROM audit_summary
+            ''').fetchall()
         
-        query = '''
-            SELECT 
-                COUNT(*) as total_applications,
-                SUM(CASE WHEN final_decision = 'APPROVED' THEN 1 ELSE 0 END) as approved,
-                SUM(CASE WHEN final_decision = 'REJECTED' THEN 1 ELSE 0 END) as rejected,
-                SUM(CASE WHEN final_decision = 'MANUAL_REVIEW' THEN 1 ELSE 0 END) as manual_review,
-                AVG(processing_time_ms) as avg_processing_time,
-                SUM(CASE WHEN final_risk_level = 'HIGH' THEN 1 ELSE 0 END) as high_risk_count,
-                SUM(CASE WHEN final_risk_level = 'MEDIUM' THEN 1 ELSE 0 END) as medium_risk_count,
-                SUM(CASE WHEN final_risk_level = 'LOW' THEN 1 ELSE 0 END) as low_risk_count
-            FROM audit_log
-        '''
+        decisions = {'APPROVED': 0, 'REJECTED': 0, 'MANUAL_REVIEW': 0}
+        risk_levels = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0}
+        total = time_total = time_count = 0
         
-        cursor.execute(query)
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            return {
-                'total_applications': row[0],
-                'approved': row[1],
-                'rejected': row[2],
-                'manual_review': row[3],
-                'avg_processing_time_ms': row[4],
-                'high_risk': row[5],
-                'medium_risk': row[6],
-                'low_risk': row[7],
-                'approval_rate': f"{(row[1]/row[0]*100) if row[0] > 0 else 0:.1f}%"
+        for decision, risk_level, count, processing_total, processing_count in rows:
+            total += count
+            time_total += processing_total
+            time_count += processing_count
+            if decision in decisions:
+                decisions[decision] += count
+            if risk_level in risk_levels:
+                risk_levels[risk_level] += count
+        
+        return {
+            'total_applications': total,
+            'approved': decisions['APPROVED'],
+            'rejected': decisions['REJECTED'],
+            'manual_review': decisions['MANUAL_REVIEW'],
+            'avg_processing_time_ms': (time_total / time_count) if time_count else None,
+            'high_risk': risk_levels['HIGH'],
+            'medium_risk': risk_levels['MEDIUM'],
+            'low_risk': risk_levels['LOW'],
+            'approval_rate': f"{(decisions['APPROVED']/total*100) if total > 0 else 0:.1f}%"
+        }
+    
+    def get_timeseries(self, bucket='hour', start=None, end=None, limit=1000):
+        """
+        Decision statistics per time bucket, read from the rollup table
+        bucket: 'minute', 'hour' or 'day'
+        start/end: ISO dates or datetimes (UTC), both inclusive (a date-only end
+                   covers that whole day); without start the latest `limit`
+                   buckets up to end are returned
+        """
+        if bucket not in self.ROLLUP_BUCKETS:
+            raise ValueError(f"bucket must be one of: {list(self.ROLLUP_BUCKETS)}")
+        
+        limit = max(1, min(int(limit), self.MAX_TIMESERIES_BUCKETS))
+        
+        query = 'SELECT * FROM audit_rollup WHERE bucket_size = ?'
+        params = [bucket]
+        if start:
+            query += ' AND bucket_start >= ?'
+            params.append(self._bucket_key(bucket, start))
+        if end:
+            query += ' AND bucket_start <= ?'
+            params.append(self._bucket_key(bucket, end, end_of_day=True))
+        
+        # Oldest first from start, otherwise the most recent buckets
+        query += ' ORDER BY bucket_start ' + ('ASC' if start else 'DESC') + ' LIMIT ?'
+        params.append(limit)
+        
+        with self._connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        
+        if not start:
+            rows.reverse()
+        
+        return [
+            {
+                'bucket': row[1],
+                'total_applications': row[2],
+                'approved': row[3],
+                'rejected': row[4],
+                'manual_review': row[5],
+                'high_risk': row[6],
+                'medium_risk': row[7],
+                'low_risk': row[8],
+                'avg_processing_time_ms': (row[9] / row[10]) if row[10] else None,
+                'approval_rate': f"{(row[3]/row[2]*100) if row[2] > 0 else 0:.1f}%"
             }
+            for row in rows
+        ]
+    
+    def _bucket_key(self, bucket, value, end_of_day=False):
+        """
+        Truncate an ISO date/datetime to the rollup key of the given bucket
+        end_of_day: read a date without a time as its last instant, not midnight
+        """
+        value = value.strip()
+        if value.endswith('Z'):
+            value = value[:-1]
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"Invalid ISO date/time: {value}")
         
-        return None
+        if end_of_day and len(value) == 10:
+            parsed = parsed.replace(hour=23, minute=59, second=59, microsecond=999999)
+        
+        # Audit timestamps are naive UTC
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        timestamp = parsed.isoformat()
+        
+        prefix_length, suffix = self.ROLLUP_BUCKETS[bucket]
+        return timestamp[:prefix_length] + suffix
 
 
 def test_audit_logger():
@@ -240,10 +879,239 @@ def test_audit_logger():
     print(f"\n✅ Statistics:")
     print(json.dumps(stats, indent=2))
     
-    # Cleanup
-    os.remove('test_audit.db')
+    # Cleanup (WAL mode keeps -wal/-shm files next to the database)
+    logger.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists('test_audit.db' + suffix):
+            os.remove('test_audit.db' + suffix)
     print("\n✅ Test database cleaned up")
 
 
+def test_async_audit_logger():
+    """Test that async mode commits every queued record by close()"""
+    logger = AuditLogger('test_audit_async.db', async_writes=True, batch_size=50, max_queue_size=100)
+    
+    decision = {
+        'application_id': 'APP-ASYNC',
+        'applicant_data': {'loan_amount': 150},
+        'validation_result': {'is_valid': True, 'errors': [], 'warnings': []},
+        'final_decision': 'APPROVED',
+        'final_risk_level': 'LOW',
+        'processing_time_ms': 3
+    }
+    
+    threads = [
+        threading.Thread(target=lambda: [logger.log_decision(decision) for _ in range(250)])
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    logger.close()
+    
+    reader = AuditLogger('test_audit_async.db')
+    total = reader.get_statistics()['total_applications']
+    reader.close()
+    assert total == 1000, total
+    print(f"✅ Async writer committed {total} queued record(s)")
+    
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists('test_audit_async.db' + suffix):
+            os.remove('test_audit_async.db' + suffix)
+
+
+def test_audit_writer_spill():
+    """Test that batches the writer cannot commit are spilled and replayed, not dropped"""
+    import subprocess
+    import sys
+    
+    logger = AuditLogger('test_audit_spill.db', async_writes=True, batch_size=50)
+    decision = {
+        'application_id': 'APP-SPILL',
+        'applicant_data': {'loan_amount': 150},
+        'validation_result': {'is_valid': True, 'errors': [], 'warnings': []},
+        'final_decision': 'APPROVED',
+        'final_risk_level': 'LOW',
+        'processing_time_ms': 3
+    }
+    
+    def locked(rows):
+        raise sqlite3.OperationalError('database is locked')
+    
+    logger._insert_rows = locked
+    logger.log_decisions([decision] * 10)
+    logger.flush()
+    assert logger.write_errors == AuditLogger.WRITE_RETRIES and logger.spilled_rows == 10
+    assert os.path.exists(logger.spill_path)
+    
+    # The next successful write replays the spilled rows
+    del logger._insert_rows
+    logger.log_decision(decision)
+    logger.flush()
+    assert not os.path.exists(logger.spill_path)
+    assert logger.get_statistics()['total_applications'] == 11 and logger.dropped_rows == 0
+    print(f"✅ Writer spilled {logger.spilled_rows} record(s) after {logger.write_errors} failed attempt(s) and replayed them")
+    
+    # A row the schema rejects is dropped on its own without losing its batch
+    logger.log_decisions([decision, dict(decision, final_risk_level=None), decision])
+    logger.flush()
+    assert logger.dropped_rows == 1 and logger.get_statistics()['total_applications'] == 13
+    print("✅ A rejected row is dropped without its batch")
+    
+    # After close, rows are written synchronously rather than queued behind the stop marker
+    logger.close()
+    assert logger.log_decision(decision) is not None
+    assert logger.pending_writes == 0 and logger.get_statistics()['total_applications'] == 14
+    logger.close()
+    print("✅ Rows logged after close() are committed synchronously")
+    
+    # Replay keeps the good rows of a spill file holding a rejected row, a line
+    # torn by a crash, and a claim file left by a process that died replaying it
+    row = AuditLogger._decision_row(decision)
+    with open(logger.spill_path, 'w') as f:
+        f.write(json.dumps(row) + '\n' + json.dumps((None,) + row[1:]) + '\n' + '[1, 2')
+    finished = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                              capture_output=True, text=True)
+    with open(f'{logger.spill_path}.{int(finished.stdout)}', 'w') as f:
+        f.write(json.dumps(row) + '\n')
+    
+    logger = AuditLogger('test_audit_spill.db', async_writes=True)
+    assert logger.dropped_rows == 2 and logger.get_statistics()['total_applications'] == 16
+    assert not glob.glob(glob.escape(logger.spill_path) + '*')
+    
+    with open(logger.spill_path, 'w') as f:
+        f.write(json.dumps(row) + '\n' + json.dumps((None,) + row[1:]) + '\n')
+    logger._spill_pending = True
+    for _ in range(3):
+        logger.log_decision(decision)
+    logger.flush()
+    assert logger.get_statistics()['total_applications'] == 20 and logger.dropped_rows == 3
+    assert not os.path.exists(logger.spill_path)
+    logger.close()
+    print("✅ Spill replay drops only rejected or torn rows and recovers orphaned claims")
+    
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists('test_audit_spill.db' + suffix):
+            os.remove('test_audit_spill.db' + suffix)
+
+
+def test_audit_timeseries():
+    """Test that a date-only range covers every bucket of its last day"""
+    logger = AuditLogger('test_audit_timeseries.db')
+    decision = {
+        'application_id': 'APP-SERIES',
+        'applicant_data': {},
+        'validation_result': {'is_valid': True},
+        'final_decision': 'APPROVED',
+        'final_risk_level': 'LOW',
+        'processing_time_ms': 3
+    }
+    row = AuditLogger._decision_row(decision)
+    timestamps = ['2026-10-15T23:59:00', '2026-10-16T00:30:00', '2026-10-16T13:15:00',
+                  '2026-10-16T23:59:30', '2026-10-17T00:10:00']
+    logger._insert_rows([row[:1] + (timestamp,) + row[2:] for timestamp in timestamps])
+    
+    def total(series):
+        return sum(point['total_applications'] for point in series)
+    
+    for bucket in AuditLogger.ROLLUP_BUCKETS:
+        assert total(logger.get_timeseries(bucket, '2026-10-16', '2026-10-16')) == 3, bucket
+        assert total(logger.get_timeseries(bucket, end='2026-10-16')) == 4, bucket
+    
+    # A time on the end bound is not widened
+    assert total(logger.get_timeseries('hour', '2026-10-16', '2026-10-16T13:00')) == 2
+    assert total(logger.get_timeseries('minute', '2026-10-16', '2026-10-16T13:14:59')) == 1
+    print("✅ Date-only end includes the whole day for minute, hour and day buckets")
+    
+    logger.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists('test_audit_timeseries.db' + suffix):
+            os.remove('test_audit_timeseries.db' + suffix)
+
+
+def test_audit_logger_codes():
+    """Test coded columns, including on a database created before they existed"""
+    from data_validator import LoanDataValidator
+    from pipeline import rule_record, validation_record
+    from risk_rules import RiskRuleEngine
+    
+    conn = sqlite3.connect('test_audit_codes.db')
+    conn.execute('''
+        CREATE TABLE audit_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            application_id TEXT NOT NULL, timestamp TEXT NOT NULL, applicant_data TEXT NOT NULL,
+            validation_status TEXT, validation_errors TEXT, validation_warnings TEXT,
+            rule_risk_level TEXT, rule_risk_score INTEGER, rule_flags TEXT,
+            ml_probability REAL, ml_prediction TEXT,
+            final_decision TEXT NOT NULL, final_risk_level TEXT NOT NULL, decision_reason TEXT,
+            processing_time_ms INTEGER, user_agent TEXT, ip_address TEXT
+        )
+    ''')
+    conn.execute("INSERT INTO audit_log (application_id, timestamp, applicant_data, validation_errors, "
+                 "final_decision, final_risk_level) VALUES ('APP-OLD', '2026-01-01', '{}', '[]', 'APPROVED', 'LOW')")
+    conn.commit()
+    conn.close()
+    
+    logger = AuditLogger('test_audit_codes.db')
+    logger.log_decision({
+        'application_id': 'APP-CODED',
+        'applicant_data': {'loan_amount': 150},
+        'validation_result': {'is_valid': True, 'error_bits': 0, 'warning_bits': 0b100001},
+        'rule_result': {'risk_level': 'HIGH', 'risk_score': 55, 'flag_mask': 0b101},
+        'final_decision': 'MANUAL_REVIEW',
+        'final_risk_level': 'HIGH'
+    })
+    
+    with logger._connection() as conn:
+        rows = {
+            row[0]: row[1:] for row in conn.execute('''
+                SELECT application_id, validation_errors, validation_error_bits,
+                       validation_warning_bits, rule_flags, rule_flag_mask
+                FROM audit_log
+            ''')
+        }
+    
+    assert rows['APP-OLD'] == ('[]', None, None, None, None), rows['APP-OLD']
+    assert rows['APP-CODED'] == (None, 0, 0b100001, None, 0b101), rows['APP-CODED']
+    print("✅ Coded columns added to an existing database and written as integers")
+    
+    # History renders the text from the codes, as the API reported it
+    application = {'applicant_income': 1500, 'loan_amount': 600, 'loan_amount_term': 360,
+                   'credit_history': 0, 'property_area': 'Urban'}
+    parsed, error_codes, warning_codes, dti_ratio = LoanDataValidator.check(application)
+    rule_result = RiskRuleEngine.evaluate(parsed)
+    logger.log_decision({
+        'application_id': 'APP-TEXT',
+        'applicant_data': application,
+        'validation_result': validation_record(error_codes, warning_codes),
+        'rule_result': rule_record(rule_result),
+        'final_decision': 'REJECTED',
+        'final_risk_level': rule_result['risk_level']
+    })
+    history = logger.get_application_history('APP-TEXT')
+    old = logger.get_application_history('APP-OLD')
+    logger.close()
+    
+    columns = ['id', 'application_id', 'timestamp', 'applicant_data', 'validation_status',
+               'validation_errors', 'validation_warnings', 'rule_risk_level', 'rule_risk_score', 'rule_flags']
+    record = dict(zip(columns, history[0]))
+    expected_warnings = LoanDataValidator.messages(error_codes, warning_codes, dti_ratio)[1]
+    assert expected_warnings and rule_result['flags']
+    assert json.loads(record['validation_errors']) == []
+    assert json.loads(record['validation_warnings']) == expected_warnings
+    assert json.loads(record['rule_flags']) == rule_result['flags']
+    assert dict(zip(columns, old[0]))['validation_errors'] == '[]'
+    print(f"✅ History rendered {len(expected_warnings)} warning(s) and {len(rule_result['flags'])} flag(s) from codes")
+    
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists('test_audit_codes.db' + suffix):
+            os.remove('test_audit_codes.db' + suffix)
+
+
 if __name__ == "__main__":
     test_audit_logger()
+    test_async_audit_logger()
+    test_audit_writer_spill()
+    test_audit_timeseries()
+    test_audit_logger_codes()
@@ -0,0 +1,283 @@
+"""
+Bulk Scoring CLI
+Streams a CSV or Parquet loan book through the assessment pipeline in chunks
+
+Usage:
+    python batch_score.py applications.csv decisions.csv [--chunk-size 5000]
+    python batch_score.py applications.csv decisions.csv --workers 8
+    python batch_score.py book.parquet decisions.parquet --audit-db logs/audit.db
+    python batch_score.py applications.csv decisions.csv --detail full
+
+Input columns use the API field names (applicant_income, loan_amount, ...);
+an application_id column is carried through when present, and blank ids are
+generated. Parquet input or output needs pyarrow.
+"""
+
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from audit_logger import AuditLogger
+from model_store import ModelStore
+from pipeline import DETAIL_LEVELS, BatchScorer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Response detail scored by default: every output column except key_factors,
+# without the per-row explanation and feature contributions of 'full'
+DEFAULT_DETAIL = 'summary'
+
+# Output file columns, in order; key_factors is only filled at detail 'full'
+OUTPUT_COLUMNS = [
+    'application_id', 'success', 'decision', 'risk_level', 'risk_score',
+    'ml_confidence', 'reason', 'rule_flags', 'key_factors', 'warnings', 'errors'
+]
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        sys.exit("❌ Parquet support needs pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def _is_parquet(path):
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def read_chunks(path, chunk_size):
+    """Yield lists of at most chunk_size application dicts"""
+    if _is_parquet(path):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pylist()
+        return
+
+    with open(path, newline='') as f:
+        chunk = []
+        for row in csv.DictReader(f):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+class DecisionWriter:
+    """Appends flattened results to a CSV or Parquet file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet = _is_parquet(path)
+
+        if self._parquet:
+            pa = _require_pyarrow()
+            import pyarrow.parquet as pq
+
+            self._schema = pa.schema([
+                (name, pa.int64() if name == 'risk_score' else pa.bool_() if name == 'success' else pa.string())
+                for name in OUTPUT_COLUMNS
+            ])
+            self._writer = pq.ParquetWriter(path, self._schema)
+        else:
+            self._file = open(path, 'w', newline='')
+            csv.DictWriter(self._file, fieldnames=OUTPUT_COLUMNS).writeheader()
+
+    @staticmethod
+    def render(rows, parquet=False):
+        """
+        Encode flattened rows for write(): CSV text or a column dict
+        Runs in the worker process when scoring in parallel
+        """
+        if parquet:
+            return {name: [row[name] for row in rows] for name in OUTPUT_COLUMNS}
+
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=OUTPUT_COLUMNS).writerows(rows)
+        return buffer.getvalue()
+
+    def write(self, rendered):
+        if self._parquet:
+            import pyarrow as pa
+            self._writer.write_table(pa.Table.from_pydict(rendered, schema=self._schema))
+        else:
+            self._file.write(rendered)
+
+    def close(self):
+        if self._parquet:
+            self._writer.close()
+        else:
+            self._file.close()
+
+
+def flatten_result(result):
+    """One output row per API-shaped result; lists are joined with '; '"""
+    flags = result.get('rule_flags', result.get('flags', []))
+    factors = result.get('explanation', {}).get('key_factors', [])
+
+    return {
+        'application_id': result.get('application_id'),
+        'success': result.get('success', False),
+        'decision': result.get('decision'),
+        'risk_level': result.get('risk_level'),
+        'risk_score': result.get('risk_score'),
+        'ml_confidence': result.get('ml_confidence'),
+        'reason': result.get('reason', result.get('error')),
+        'rule_flags': '; '.join(flag['rule'] for flag in flags),
+        'key_factors': '; '.join(f"{factor['factor']} ({factor['impact']})" for factor in factors),
+        'warnings': '; '.join(result.get('warnings', [])),
+        'errors': '; '.join(result.get('errors', []))
+    }
+
+
+def build_scorer(models_dir=None):
+    """Load the model artifacts and return a BatchScorer"""
+    models = ModelStore(models_dir or os.path.join(BASE_DIR, 'models'))
+    models.load(warm_up=False)
+
+    return BatchScorer(
+        models.forest if models.ml_available else None,
+        models.explainer,
+        models.features
+    )
+
+
+def score_chunk(scorer, chunk, parquet=False, with_audit=False, detail=DEFAULT_DETAIL):
+    """
+    Score one chunk
+    Returns (rendered output, row count, decision counts, audit records or None)
+    """
+    results, audit_records = scorer.score(chunk, detail)
+    rows = [flatten_result(result) for result in results]
+    decisions = Counter(row['decision'] or 'ERROR' for row in rows)
+
+    return DecisionWriter.render(rows, parquet), len(rows), decisions, audit_records if with_audit else None
+
+
+# Scorer of a pool worker process, loaded once by _init_worker
+_worker_scorer = None
+
+
+def _init_worker(models_dir):
+    global _worker_scorer
+    _worker_scorer = build_scorer(models_dir)
+
+
+def _score_in_worker(chunk, parquet, with_audit, detail):
+    return score_chunk(_worker_scorer, chunk, parquet, with_audit, detail)
+
+
+def score_parallel(chunks, workers, models_dir=None, parquet=False, with_audit=False, max_in_flight=None,
+                   detail=DEFAULT_DETAIL):
+    """
+    Score chunks in a pool of worker processes, yielding results in input order
+    Every worker loads the model once and renders its own output, leaving
+    only reading and writing to this process. At most max_in_flight chunks
+    (default 2 per worker) are queued or running, which keeps memory bounded
+    """
+    max_in_flight = max_in_flight or 2 * workers
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(models_dir,)) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(_score_in_worker, chunk, parquet, with_audit, detail))
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.popleft().result()
+
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def score_file(input_path, output_path, chunk_size=5000, models_dir=None, audit_db=None,
+               workers=1, progress_every=10, detail=DEFAULT_DETAIL):
+    """
+    Score every application in input_path and write decisions to output_path
+    Memory is bounded by the chunks in flight, not by the file size
+    detail: response detail level scored; 'full' also fills key_factors
+    Returns a summary dict (rows, elapsed_s, rows_per_s, decisions)
+    """
+    if _is_parquet(input_path) or _is_parquet(output_path):
+        _require_pyarrow()
+
+    start = time.perf_counter()
+    parquet = _is_parquet(output_path)
+    with_audit = bool(audit_db)
+
+    chunks = read_chunks(input_path, chunk_size)
+    if workers > 1:
+        scored = score_parallel(chunks, workers, models_dir, parquet, with_audit, detail=detail)
+    else:
+        scorer = build_scorer(models_dir)
+        scored = (score_chunk(scorer, chunk, parquet, with_audit, detail) for chunk in chunks)
+
+    audit_logger = AuditLogger(audit_db) if audit_db else None
+    writer = DecisionWriter(output_path)
+
+    decisions = Counter()
+    rows = 0
+
+    try:
+        for n_chunk, (rendered, n_rows, chunk_decisions, audit_records) in enumerate(scored, start=1):
+            writer.write(rendered)
+            if audit_logger:
+                audit_logger.log_decisions(audit_records)
+
+            rows += n_rows
+            decisions.update(chunk_decisions)
+
+            if progress_every and n_chunk % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"  {rows:,} rows  {rows / elapsed:,.0f} rows/s", file=sys.stderr)
+    finally:
+        scored.close()
+        writer.close()
+        if audit_logger:
+            audit_logger.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': rows,
+        'elapsed_s': elapsed,
+        'rows_per_s': rows / elapsed if elapsed > 0 else 0.0,
+        'decisions': dict(decisions)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of loan applications")
+    parser.add_argument('input', help='applications (.csv or .parquet)')
+    parser.add_argument('output', help='decisions file (.csv or .parquet)')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='applications scored per chunk')
+    parser.add_argument('--models-dir', default=None, help='model artifacts (default: backend/models)')
+    parser.add_argument('--audit-db', default=None, help='also record every decision in this audit database')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes (1 scores in this process)')
+    parser.add_argument('--detail', choices=DETAIL_LEVELS, default=DEFAULT_DETAIL,
+                        help="response detail scored; 'full' also fills key_factors")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size <= 0:
+        parser.error('--chunk-size must be positive')
+    if args.workers <= 0:
+        parser.error('--workers must be positive')
+
+    summary = score_file(args.input, args.output, args.chunk_size, args.models_dir, args.audit_db, args.workers,
+                         detail=args.detail)
+
+    print(f"✅ Scored {summary['rows']:,} applications in {summary['elapsed_s']:.1f}s "
+          f"({summary['rows_per_s']:,.0f} rows/s) -> {args.output}")
+    for decision, count in sorted(summary['decisions'].items()):
+        print(f"   {decision:<14} {count:,}")
+
+
+if __name__ == "__main__":
+    main()
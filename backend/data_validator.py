@@ -3,17 +3,280 @@ Data Validation Module
 Validates incoming loan application data before processing
 """
 
+import operator
+
+import numpy as np
+
+from loan_application import LoanApplication
+
+
+REQUIRED_FIELDS = [
+    'applicant_income',
+    'loan_amount',
+    'loan_amount_term',
+    'credit_history',
+    'property_area'
+]
+
+VALID_PROPERTY_AREAS = ['Urban', 'Semiurban', 'Rural']
+
+# Accepted raw values of the fields that are checked by membership
+CHOICES = {
+    'credit_history': [0, 1, '0', '1'],
+    'property_area': VALID_PROPERTY_AREAS
+}
+
+# Checks of the required fields, in message order. Each field is either a
+# 'choice' (see CHOICES) or a 'number'; its checks run on the parsed value
+# and the first one that matches wins, like an if/elif chain.
+FIELD_RULES = [
+    # (field, kind, code if unparseable, [(test, threshold, code)])
+    ('credit_history', 'choice', 'INVALID_CREDIT_HISTORY', [
+        ('==', 0, 'NO_CREDIT_HISTORY')
+    ]),
+    ('applicant_income', 'number', 'INVALID_INCOME', [
+        ('<', 0, 'NEGATIVE_INCOME'),
+        ('<', 1000, 'LOW_INCOME'),
+        ('>', 1000000, 'HIGH_INCOME')
+    ]),
+    ('loan_amount', 'number', 'INVALID_LOAN_AMOUNT', [
+        ('<=', 0, 'LOAN_AMOUNT_NOT_POSITIVE'),
+        ('>', 10000, 'HIGH_LOAN_AMOUNT')
+    ]),
+    ('loan_amount_term', 'number', 'INVALID_TERM', [
+        ('<=', 0, 'TERM_NOT_POSITIVE'),
+        ('>', 480, 'LONG_TERM')  # 40 years
+    ]),
+    ('property_area', 'choice', 'INVALID_PROPERTY_AREA', [])
+]
+
+# Monthly payment over monthly income, in percent (validator's own formula)
+DTI_LIMIT = 43
+
+# Optional fields: absent or empty takes the LoanApplication default
+OPTIONAL_FIELDS = [
+    (field, parse, default)
+    for field, parse, default in LoanApplication.FIELDS
+    if field not in REQUIRED_FIELDS
+]
+
+# Codes and messages, in the order messages are reported
+ERRORS = {
+    **{f"MISSING_{field.upper()}": f"Missing required field: {field}" for field in REQUIRED_FIELDS},
+    'INVALID_CREDIT_HISTORY': "Credit history must be 0 or 1",
+    'INVALID_INCOME': "Income must be a valid number",
+    'NEGATIVE_INCOME': "Income cannot be negative",
+    'INVALID_LOAN_AMOUNT': "Loan amount must be a valid number",
+    'LOAN_AMOUNT_NOT_POSITIVE': "Loan amount must be positive",
+    'INVALID_TERM': "Loan term must be a valid number",
+    'TERM_NOT_POSITIVE': "Loan term must be positive",
+    'INVALID_PROPERTY_AREA': f"Property area must be one of: {VALID_PROPERTY_AREAS}",
+    **{f"INVALID_{field.upper()}": f"{field} must be a valid number" for field, _, _ in OPTIONAL_FIELDS}
+}
+
+WARNINGS = {
+    'NO_CREDIT_HISTORY': "No credit history - HIGH RISK indicator",
+    'LOW_INCOME': "Very low income - potential risk",
+    'HIGH_INCOME': "Extremely high income - verify data accuracy",
+    'HIGH_LOAN_AMOUNT': "Very high loan amount - requires review",
+    'LONG_TERM': "Unusually long loan term",
+    'HIGH_DTI': "High debt-to-income ratio: {dti_ratio:.1f}% (>43% threshold)"
+}
+
+# Bit of each code in the masks returned by validate_batch and stored in the
+# audit log. Stored rows depend on them: never renumber or reuse a bit, give a
+# new code the next free one.
+ERROR_BIT_POSITIONS = {
+    'MISSING_APPLICANT_INCOME': 0,
+    'MISSING_LOAN_AMOUNT': 1,
+    'MISSING_LOAN_AMOUNT_TERM': 2,
+    'MISSING_CREDIT_HISTORY': 3,
+    'MISSING_PROPERTY_AREA': 4,
+    'INVALID_CREDIT_HISTORY': 5,
+    'INVALID_INCOME': 6,
+    'NEGATIVE_INCOME': 7,
+    'INVALID_LOAN_AMOUNT': 8,
+    'LOAN_AMOUNT_NOT_POSITIVE': 9,
+    'INVALID_TERM': 10,
+    'TERM_NOT_POSITIVE': 11,
+    'INVALID_PROPERTY_AREA': 12,
+    'INVALID_COAPPLICANT_INCOME': 13,
+    'INVALID_SELF_EMPLOYED': 14,
+    'INVALID_DEPENDENTS': 15
+}
+
+WARNING_BIT_POSITIONS = {
+    'NO_CREDIT_HISTORY': 0,
+    'LOW_INCOME': 1,
+    'HIGH_INCOME': 2,
+    'HIGH_LOAN_AMOUNT': 3,
+    'LONG_TERM': 4,
+    'HIGH_DTI': 5
+}
+
+
+def _bit_table(messages, positions):
+    """{code: bit} in message order; every code needs its own fixed position"""
+    # Raised rather than asserted so the check also runs under python -O
+    missing = set(messages) - set(positions)
+    if missing:
+        raise ValueError(f"No fixed bit for {sorted(missing)}")
+    if len(set(positions.values())) != len(positions):
+        raise ValueError("Bit positions must be unique")
+    return {code: 1 << positions[code] for code in messages}
+
+
+ERROR_BITS = _bit_table(ERRORS, ERROR_BIT_POSITIONS)
+WARNING_BITS = _bit_table(WARNINGS, WARNING_BIT_POSITIONS)
+
+TESTS = {'==': operator.eq, '<': operator.lt, '<=': operator.le, '>': operator.gt}
+
+_MISSING_CODES = [(field, f"MISSING_{field.upper()}") for field in REQUIRED_FIELDS]
+_PARSERS = {field: parse for field, parse, _ in LoanApplication.FIELDS}
+
+
+def _resolve_rules():
+    """
+    FIELD_RULES with parsers and tests looked up, shared by check and validate_batch:
+    (field, choices or None, parse, invalid code, [(test, threshold, code, is_error)])
+    """
+    resolved = []
+    for field, kind, invalid_code, checks in FIELD_RULES:
+        resolved.append((
+            field,
+            CHOICES[field] if kind == 'choice' else None,
+            _PARSERS[field],
+            invalid_code,
+            [(TESTS[test], threshold, code, code in ERRORS) for test, threshold, code in checks]
+        ))
+    return resolved
+
+
+_RULES = _resolve_rules()
+
+
+_PARSE_ERRORS = (TypeError, ValueError, OverflowError)
+_OPTIONAL_RULES = [(field, parse, default, f"INVALID_{field.upper()}") for field, parse, default in OPTIONAL_FIELDS]
+_RECORD_FIELDS = [field for field, _, _ in LoanApplication.FIELDS]
+
+
+def _check(data):
+    """Validate one payload: (application or None, error codes, warning codes, dti_ratio)"""
+    # 1. Missing fields stop validation
+    missing = []
+    for field, code in _MISSING_CODES:
+        raw = data.get(field)
+        if raw is None or raw == '':
+            missing.append(code)
+    if missing:
+        return None, missing, [], None
+    
+    errors = []
+    warnings = []
+    values = {}
+    
+    # 2. Required fields, in FIELD_RULES order; the first matching check wins
+    for field, choices, parse, invalid_code, checks in _RULES:
+        raw = data[field]
+        try:
+            if choices is not None and raw not in choices:
+                raise ValueError(field)
+            value = parse(raw)
+        except _PARSE_ERRORS:
+            values[field] = None
+            errors.append(invalid_code)
+            continue
+        values[field] = value
+        for test, threshold, code, is_error in checks:
+            if test(value, threshold):
+                (errors if is_error else warnings).append(code)
+                break
+    
+    # 3. Debt-to-Income ratio check
+    dti_ratio = None
+    income, loan_amount, term = values['applicant_income'], values['loan_amount'], values['loan_amount_term']
+    if income is not None and loan_amount is not None and term is not None:
+        try:
+            dti_ratio = (loan_amount / term) / (income / 12) * 100
+        except ZeroDivisionError:
+            pass
+        else:
+            if dti_ratio > DTI_LIMIT:
+                warnings.append('HIGH_DTI')
+    
+    # 4. Optional fields (absent or empty means the default)
+    for field, parse, default, invalid_code in _OPTIONAL_RULES:
+        raw = data.get(field)
+        try:
+            values[field] = parse(default if raw is None or raw == '' else raw)
+        except _PARSE_ERRORS:
+            errors.append(invalid_code)
+    
+    if errors:
+        return None, errors, warnings, dti_ratio
+    return LoanApplication(*[values[field] for field in _RECORD_FIELDS]), errors, warnings, dti_ratio
+
+
+def _column(values, n_rows):
+    """Raw values as a NumPy column; numeric arrays stay numeric, anything else is object"""
+    if values is None:
+        return np.full(n_rows, None, dtype=object)
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'biuf':
+        return values
+    column = np.array(values, dtype=object)
+    if column.ndim != 1:  # sequences as values (invalid anyway) nest into 2-D
+        column = np.empty(n_rows, dtype=object)
+        column[:] = list(values)
+    return column
+
+
+def _is_missing(column):
+    if column.dtype != object:
+        return np.zeros(len(column), dtype=bool)
+    return (column == None) | (column == '')  # noqa: E711 - elementwise
+
+
+def _parse_column(column, parse):
+    """
+    Parse a column with float or int semantics without raising
+    Returns (float64 values, invalid mask); NumPy converts whole columns and
+    only a column holding a bad value is parsed value by value
+    """
+    n_rows = len(column)
+    if column.dtype != object:
+        if parse is int and column.dtype.kind == 'f':
+            invalid = ~np.isfinite(column)
+            return np.trunc(np.where(invalid, 0, column)), invalid
+        return column.astype(np.float64), np.zeros(n_rows, dtype=bool)
+
+    try:
+        values = column.astype(np.int64 if parse is int else np.float64)
+        return values.astype(np.float64), np.zeros(n_rows, dtype=bool)
+    except (TypeError, ValueError, OverflowError):
+        pass
+
+    values = np.empty(n_rows, dtype=np.float64)
+    invalid = np.zeros(n_rows, dtype=bool)
+    for i, value in enumerate(column.tolist()):
+        try:
+            values[i] = parse(value)
+        except (TypeError, ValueError, OverflowError):
+            values[i] = np.nan
+            invalid[i] = True
+    return values, invalid
+
+
+def _equals(column, choice):
+    if column.dtype != object and isinstance(choice, str):
+        return np.zeros(len(column), dtype=bool)
+    return np.asarray(column == choice, dtype=bool)
+
+
 class LoanDataValidator:
     
-    REQUIRED_FIELDS = [
-        'applicant_income',
-        'loan_amount',
-        'loan_amount_term',
-        'credit_history',
-        'property_area'
-    ]
+    REQUIRED_FIELDS = REQUIRED_FIELDS
     
-    VALID_PROPERTY_AREAS = ['Urban', 'Semiurban', 'Rural']
+    VALID_PROPERTY_AREAS = VALID_PROPERTY_AREAS
     
     @staticmethod
     def validate(data):
@@ -21,73 +284,150 @@ class LoanDataValidator:
         Validates loan application data
         Returns: (is_valid, errors, warnings)
         """
-        errors = []
-        warnings = []
+        application, errors, warnings = LoanDataValidator.parse(data)
+        return application is not None, errors, warnings
+    
+    @staticmethod
+    def parse(data):
+        """
+        Validates loan application data and parses it into a LoanApplication
+        Returns: (application, errors, warnings) - application is None if invalid
+        """
+        application, error_codes, warning_codes, dti_ratio = LoanDataValidator.check(data)
+        errors, warnings = LoanDataValidator.messages(error_codes, warning_codes, dti_ratio)
+        return application, errors, warnings
+    
+    # Single-record validation: (application, error codes, warning codes, dti_ratio)
+    check = staticmethod(_check)
+    
+    @staticmethod
+    def validate_batch(columns, n_rows=None):
+        """
+        Columnar validation of many applications in one vectorized pass
+        columns: {field: values} - lists or NumPy arrays, raw strings allowed;
+                 an absent field is missing (required) or the default (optional)
+        Returns a dict of arrays with one entry per row:
+            valid, error_bits (see ERROR_BITS), warning_bits (see WARNING_BITS)
+            and dti_ratio (NaN where not computed). Bad values never raise.
+            'values' holds the parsed fields, for applications().
+        """
+        if n_rows is None:
+            n_rows = len(next(iter(columns.values()))) if columns else 0
         
-        # 1. Check missing fields
-        for field in LoanDataValidator.REQUIRED_FIELDS:
-            if field not in data or data[field] is None or data[field] == '':
-                errors.append(f"Missing required field: {field}")
+        error_bits = np.zeros(n_rows, dtype=np.uint32)
+        warning_bits = np.zeros(n_rows, dtype=np.uint32)
         
-        if errors:
-            return False, errors, warnings
+        def flag(bits, mask, bit):
+            bits[mask] |= np.uint32(bit)
         
-        # 2. Validate credit history
-        if data['credit_history'] not in [0, 1, '0', '1']:
-            errors.append("Credit history must be 0 or 1")
-        elif int(data['credit_history']) == 0:
-            warnings.append("No credit history - HIGH RISK indicator")
+        # 1. Missing fields
+        raw = {field: _column(columns.get(field), n_rows) for field in REQUIRED_FIELDS}
+        missing = {field: _is_missing(raw[field]) for field in REQUIRED_FIELDS}
+        missing_bits = np.zeros(n_rows, dtype=np.uint32)
+        for field, code in _MISSING_CODES:
+            flag(missing_bits, missing[field], ERROR_BITS[code])
         
-        # 3. Validate income
-        try:
-            income = float(data['applicant_income'])
-            if income < 0:
-                errors.append("Income cannot be negative")
-            elif income < 1000:
-                warnings.append("Very low income - potential risk")
-            elif income > 1000000:
-                warnings.append("Extremely high income - verify data accuracy")
-        except ValueError:
-            errors.append("Income must be a valid number")
+        # 2. Required fields
+        values = {}
+        parsed = {}
+        for field, choices, parse, invalid_code, checks in _RULES:
+            column = raw[field]
+            if choices is not None:
+                matches = [_equals(column, choice) for choice in choices]
+                ok = np.logical_or.reduce(matches)
+                value = np.select(matches, [parse(choice) for choice in choices], default=0) if checks else column
+            else:
+                value, invalid = _parse_column(np.where(missing[field], 0, column), parse)
+                ok = ~invalid
+            flag(error_bits, ~ok, ERROR_BITS[invalid_code])
+            values[field], parsed[field] = value, ok
+            
+            pending = ok.copy()
+            for test, threshold, code, is_error in checks:
+                with np.errstate(invalid='ignore'):
+                    hit = pending & test(value, threshold)
+                flag(error_bits if is_error else warning_bits, hit, (ERROR_BITS if is_error else WARNING_BITS)[code])
+                pending &= ~hit
         
-        # 4. Validate loan amount
-        try:
-            loan_amount = float(data['loan_amount'])
-            if loan_amount <= 0:
-                errors.append("Loan amount must be positive")
-            elif loan_amount > 10000:
-                warnings.append("Very high loan amount - requires review")
-        except ValueError:
-            errors.append("Loan amount must be a valid number")
+        # 3. Debt-to-Income ratio
+        income, loan_amount, term = values['applicant_income'], values['loan_amount'], values['loan_amount_term']
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            monthly_income = income / 12
+            computed = parsed['applicant_income'] & parsed['loan_amount'] & parsed['loan_amount_term'] \
+                & (term != 0) & (monthly_income != 0)
+            dti_ratio = np.where(computed, (loan_amount / term) / monthly_income * 100, np.nan)
+            flag(warning_bits, computed & (dti_ratio > DTI_LIMIT), WARNING_BITS['HIGH_DTI'])
         
-        # 5. Validate loan term
-        try:
-            term = float(data['loan_amount_term'])
-            if term <= 0:
-                errors.append("Loan term must be positive")
-            elif term > 480:  # 40 years
-                warnings.append("Unusually long loan term")
-        except ValueError:
-            errors.append("Loan term must be a valid number")
+        # 4. Optional fields
+        for field, parse, default in OPTIONAL_FIELDS:
+            if field not in columns:
+                values[field] = np.full(n_rows, default, dtype=np.float64)
+                continue
+            column = _column(columns[field], n_rows)
+            values[field], invalid = _parse_column(np.where(_is_missing(column), default, column), parse)
+            flag(error_bits, invalid, ERROR_BITS[f"INVALID_{field.upper()}"])
         
-        # 6. Validate property area
-        if data['property_area'] not in LoanDataValidator.VALID_PROPERTY_AREAS:
-            errors.append(f"Property area must be one of: {LoanDataValidator.VALID_PROPERTY_AREAS}")
+        # Rows with a missing field report only that
+        any_missing = missing_bits != 0
+        error_bits = np.where(any_missing, missing_bits, error_bits)
+        warning_bits[any_missing] = 0
+        dti_ratio[any_missing] = np.nan
         
-        # 7. Debt-to-Income ratio check
-        try:
-            income = float(data['applicant_income'])
-            loan = float(data['loan_amount'])
-            monthly_payment = loan / float(data['loan_amount_term'])
-            dti_ratio = (monthly_payment / (income / 12)) * 100
-            
-            if dti_ratio > 43:
-                warnings.append(f"High debt-to-income ratio: {dti_ratio:.1f}% (>43% threshold)")
-        except:
-            pass
+        return {
+            'valid': error_bits == 0,
+            'error_bits': error_bits,
+            'warning_bits': warning_bits,
+            'dti_ratio': dti_ratio,
+            'values': values
+        }
+    
+    @staticmethod
+    def applications(batch):
+        """A LoanApplication per valid row of a validate_batch result, None per invalid row"""
+        rows = np.flatnonzero(batch['valid'])
+        fields = []
+        for field, parse, _ in LoanApplication.FIELDS:
+            column = batch['values'][field][rows]
+            if parse is str:
+                fields.append([parse(value) for value in column.tolist()])
+            else:
+                fields.append([parse(value) for value in column.astype(np.float64).tolist()])
+        
+        applications = [None] * len(batch['valid'])
+        for i, values in zip(rows.tolist(), zip(*fields)):
+            applications[i] = LoanApplication(*values)
+        return applications
+    
+    @staticmethod
+    def bits(codes, table):
+        """Bitmask of a list of codes (table: ERROR_BITS or WARNING_BITS)"""
+        mask = 0
+        for code in codes:
+            mask |= table[code]
+        return mask
+    
+    @staticmethod
+    def codes(bits, table):
+        """Codes set in a bitmask, in message order (table: ERROR_BITS or WARNING_BITS)"""
+        bits = int(bits)
+        return [code for code, bit in table.items() if bits & bit]
+    
+    @staticmethod
+    def messages(error_codes, warning_codes, dti_ratio=None):
+        """Render codes (or bitmasks from validate_batch) as (errors, warnings) text"""
+        if not error_codes and not warning_codes:
+            return [], []
+        if not isinstance(error_codes, list):
+            error_codes = LoanDataValidator.codes(error_codes, ERROR_BITS)
+        if not isinstance(warning_codes, list):
+            warning_codes = LoanDataValidator.codes(warning_codes, WARNING_BITS)
         
-        is_valid = len(errors) == 0
-        return is_valid, errors, warnings
+        errors = [ERRORS[code] for code in error_codes]
+        warnings = [
+            WARNINGS[code].format(dti_ratio=dti_ratio) if code == 'HIGH_DTI' else WARNINGS[code]
+            for code in warning_codes
+        ]
+        return errors, warnings
 
 
 def test_validator():
@@ -124,6 +464,76 @@ def test_validator():
     }
     print("\nTest 3 - No credit history:")
     print(LoanDataValidator.validate(risky_data))
+    
+    # Test case 4: Unparseable optional field
+    bad_optional = dict(valid_data, dependents='3+')
+    print("\nTest 4 - Invalid optional field:")
+    print(LoanDataValidator.validate(bad_optional))
+    
+    # Test case 5: Parsed record
+    application, errors, warnings = LoanDataValidator.parse(dict(valid_data, coapplicant_income=''))
+    print("\nTest 5 - Parsed application:")
+    print(application)
+    
+    # Test case 6: Batch validation reports what parse reports, row by row
+    rng = np.random.default_rng(0)
+    pools = {
+        'applicant_income': [5000, 800, 2e6, -5, 0, '4500', 'abc', '', None, 3000.5, [1]],
+        'loan_amount': [150, 0, -1, 20000, '120', 'x', None, 1e-9],
+        'loan_amount_term': [360, 600, 0, -12, '180', '1e3', 'term', ''],
+        'credit_history': [1, 0, '1', '0', 1.0, 2, 'yes', None, True],
+        'property_area': ['Urban', 'Rural', 'Semiurban', 'urban', '', 3],
+        'coapplicant_income': [0, 1500, '2000', 'n/a', '', None],
+        'self_employed': [0, 1, '1', 1.7, 'no', float('nan'), None],
+        'dependents': [0, 2, '3', '3+', '', 2.0]
+    }
+    rows = []
+    for _ in range(3000):
+        row = {}
+        for field, pool in pools.items():
+            if rng.random() > 0.03:  # sometimes absent
+                row[field] = pool[rng.integers(len(pool))]
+        rows.append(row)
+    
+    columns = {field: [row.get(field) for row in rows] for field in pools}
+    batch = LoanDataValidator.validate_batch(columns)
+    batch_applications = LoanDataValidator.applications(batch)
+    for i, row in enumerate(rows):
+        application, errors, warnings = LoanDataValidator.parse(row)
+        dti = None if np.isnan(batch['dti_ratio'][i]) else batch['dti_ratio'][i]
+        assert (errors, warnings) == LoanDataValidator.messages(
+            batch['error_bits'][i], batch['warning_bits'][i], dti
+        ), (row, errors, warnings)
+        assert batch['valid'][i] == (application is not None)
+        if application is not None:
+            assert repr(batch_applications[i]) == repr(application), (row, batch_applications[i], application)
+    print(f"\nTest 6 - validate_batch matches parse on {len(rows)} rows "
+          f"({int(batch['valid'].sum())} valid)")
+    
+    # Bits already in audit databases must keep their meaning
+    stored_error_bits = {
+        'MISSING_APPLICANT_INCOME': 0, 'MISSING_LOAN_AMOUNT': 1, 'MISSING_LOAN_AMOUNT_TERM': 2,
+        'MISSING_CREDIT_HISTORY': 3, 'MISSING_PROPERTY_AREA': 4, 'INVALID_CREDIT_HISTORY': 5,
+        'INVALID_INCOME': 6, 'NEGATIVE_INCOME': 7, 'INVALID_LOAN_AMOUNT': 8,
+        'LOAN_AMOUNT_NOT_POSITIVE': 9, 'INVALID_TERM': 10, 'TERM_NOT_POSITIVE': 11,
+        'INVALID_PROPERTY_AREA': 12, 'INVALID_COAPPLICANT_INCOME': 13,
+        'INVALID_SELF_EMPLOYED': 14, 'INVALID_DEPENDENTS': 15
+    }
+    stored_warning_bits = {
+        'NO_CREDIT_HISTORY': 0, 'LOW_INCOME': 1, 'HIGH_INCOME': 2,
+        'HIGH_LOAN_AMOUNT': 3, 'LONG_TERM': 4, 'HIGH_DTI': 5
+    }
+    for code, position in stored_error_bits.items():
+        assert ERROR_BITS[code] == 1 << position, code
+    for code, position in stored_warning_bits.items():
+        assert WARNING_BITS[code] == 1 << position, code
+    for positions in ({'MISSING_A': 0, 'MISSING_B': 0}, {'MISSING_A': 0}):
+        try:
+            _bit_table({'MISSING_A': '', 'MISSING_B': ''}, positions)
+        except ValueError:
+            continue
+        raise AssertionError(f"_bit_table accepted {positions}")
+    print("Test 7 - stored error and warning bits are unchanged")
 
 
 if __name__ == "__main__":
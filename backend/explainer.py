@@ -3,163 +3,222 @@ Model Explainability Module
 Provides human-readable explanations for ML predictions
 """
 
-import pandas as pd
+import csv
+import operator
+
 import numpy as np
 
+# Explanation bands per feature: (factor label, [(test, threshold, impact, template), ...],
+# (default impact, default template)). Tests run in order and the first match wins.
+FEATURE_BANDS = {
+    'Credit_History': ('Credit History', [
+        ('==', 1, 'POSITIVE', 'Applicant has good credit history (strong positive factor)'),
+    ], ('NEGATIVE', 'No credit history (major risk factor)')),
+    'Total_Income': ('Total Income', [
+        ('>=', 8000, 'POSITIVE', 'High total income (₹{value:,.0f}) supports repayment capacity'),
+        ('>=', 4000, 'NEUTRAL', 'Moderate income (₹{value:,.0f})'),
+    ], ('NEGATIVE', 'Low income (₹{value:,.0f}) may impact repayment')),
+    'Loan_to_Income': ('Loan-to-Income Ratio', [
+        ('>', 0.3, 'NEGATIVE', 'High loan-to-income ratio ({value:.1%}) indicates potential stress'),
+        ('>', 0.2, 'NEUTRAL', 'Moderate loan-to-income ratio ({value:.1%})'),
+    ], ('POSITIVE', 'Low loan-to-income ratio ({value:.1%}) is favorable')),
+    'DTI_Ratio': ('Debt-to-Income Ratio', [
+        ('>', 43, 'NEGATIVE', 'DTI ratio ({value:.1f}%) exceeds standard threshold (43%)'),
+        ('>', 36, 'NEUTRAL', 'DTI ratio ({value:.1f}%) is moderate'),
+    ], ('POSITIVE', 'Low DTI ratio ({value:.1f}%) indicates good debt management')),
+    'LoanAmount': ('Loan Amount', [
+        ('>', 300, 'NEGATIVE', 'High loan amount (₹{value:,.0f}K) requires strong financials'),
+        ('>', 150, 'NEUTRAL', 'Moderate loan amount (₹{value:,.0f}K)'),
+    ], ('POSITIVE', 'Manageable loan amount (₹{value:,.0f}K)')),
+}
+
+# Overall assessment by ML probability, same layout as FEATURE_BANDS
+OVERALL_BANDS = [
+    ('>=', 0.7, "✅ Strong indicators for approval"),
+    ('>=', 0.5, "⚠️ Moderate indicators, requires review"),
+]
+OVERALL_DEFAULT = "❌ Weak indicators for approval"
+
+TESTS = {'==': operator.eq, '>': operator.gt, '>=': operator.ge}
+
+TOP_FEATURES = 5
+
+
 class LoanExplainer:
     
+    MAX_PLANS = 64
+    
     def __init__(self, feature_importance):
         """
         Initialize explainer with feature importance
-        feature_importance: DataFrame with 'feature' and 'importance' columns
+        feature_importance: DataFrame with 'feature' and 'importance' columns,
+                            or a {feature: importance} dict
         """
-        self.feature_importance = feature_importance.set_index('feature')['importance'].to_dict()
+        if isinstance(feature_importance, dict):
+            self.feature_importance = dict(feature_importance)
+        else:
+            self.feature_importance = feature_importance.set_index('feature')['importance'].to_dict()
+        
+        # Fixed until the model is reloaded: ranking and compiled bands
+        self.ranking = sorted(self.feature_importance, key=self.feature_importance.get, reverse=True)
+        self._bands = {
+            feature: self._compile_bands(feature, label, bands, default)
+            for feature, (label, bands, default) in FEATURE_BANDS.items()
+            if feature in self.feature_importance
+        }
+        
+        # Explanation plan per set of input features (callers pass the same few)
+        self._plans = {}
     
-    def explain_prediction(self, input_data, ml_probability, model):
+    def _plan(self, features):
         """
-        Generate human-readable explanation for a prediction
+        Ranked work for inputs with these features:
+        (explained [(feature, tests, renderers)], top [(feature, importance, fallback contribution)])
+        The fallback (importance x 100) is only used without path contributions
         """
-        explanations = []
-        
-        # Calculate feature contributions
-        feature_values = []
-        for feature in input_data.keys():
-            if feature in self.feature_importance:
-                importance = self.feature_importance[feature]
-                value = input_data[feature]
-                feature_values.append({
-                    'feature': feature,
-                    'value': value,
-                    'importance': importance,
-                    'contribution': importance * 100  # Simplified contribution
-                })
-        
-        # Sort by importance
-        feature_values.sort(key=lambda x: x['importance'], reverse=True)
+        key = tuple(features)
+        plan = self._plans.get(key)
+        if plan is None:
+            ranked = [feature for feature in self.ranking if feature in features][:TOP_FEATURES]
+            plan = (
+                [(feature,) + self._bands[feature] for feature in ranked if feature in self._bands],
+                [(feature, self.feature_importance[feature], self.feature_importance[feature] * 100)
+                 for feature in ranked[:3]]
+            )
+            if len(self._plans) < self.MAX_PLANS:
+                self._plans[key] = plan
+        return plan
+    
+    def _compile_bands(self, feature, label, bands, default):
+        """
+        Returns (tests, renderers): tests is [(test, threshold)] in band order,
+        renderers has one value -> key factor dict function per band plus the default
+        """
+        weight = f"{self.feature_importance[feature]:.1%}"
         
-        # Generate explanations for top features
-        top_features = feature_values[:5]
+        def renderer(impact, template):
+            if '{' not in template:
+                factor = {'factor': label, 'impact': impact, 'weight': weight, 'explanation': template}
+                return lambda value: factor.copy()
+            return lambda value: {
+                'factor': label,
+                'impact': impact,
+                'weight': weight,
+                'explanation': template.format(value=value)
+            }
         
-        for fv in top_features:
-            feature = fv['feature']
-            value = fv['value']
-            importance = fv['importance']
-            
-            explanation = self._generate_feature_explanation(feature, value, importance)
-            if explanation:
-                explanations.append(explanation)
+        tests = [(TESTS[test], threshold) for test, threshold, _, _ in bands]
+        renderers = [renderer(impact, template) for _, _, impact, template in bands]
+        renderers.append(renderer(*default))
+        return tests, renderers
+    
+    @classmethod
+    def from_csv(cls, path):
+        """Build from feature_importance.csv without importing pandas"""
+        with open(path, newline='') as f:
+            return cls({row['feature']: float(row['importance']) for row in csv.DictReader(f)})
+    
+    def explain_prediction(self, input_data, ml_probability, model, contributions=None):
+        """
+        Generate human-readable explanation for a prediction
+        contributions: {feature: change in approval probability} for this
+                       applicant (CompiledForest.contributions); reported in
+                       top_features as percentage points
+        """
+        explained, top = self._plan(input_data)
         
-        # Overall assessment
-        if ml_probability >= 0.7:
-            overall = "✅ Strong indicators for approval"
-        elif ml_probability >= 0.5:
-            overall = "⚠️ Moderate indicators, requires review"
-        else:
-            overall = "❌ Weak indicators for approval"
+        explanations = []
+        for feature, tests, renderers in explained:
+            value = input_data[feature]
+            band = len(tests)
+            for i, (test, threshold) in enumerate(tests):
+                if test(value, threshold):
+                    band = i
+                    break
+            explanations.append(renderers[band](value))
         
         return {
-            'overall_assessment': overall,
+            'overall_assessment': self.overall_assessment(ml_probability),
             'ml_confidence': f"{ml_probability:.1%}",
             'key_factors': explanations,
-            'top_features': top_features[:3]
+            'top_features': [
+                {
+                    'feature': feature,
+                    'value': input_data[feature],
+                    'importance': importance,
+                    'contribution': contribution if contributions is None else contributions[feature] * 100
+                }
+                for feature, importance, contribution in top
+            ]
         }
     
-    def _generate_feature_explanation(self, feature, value, importance):
-        """Generate explanation for specific feature"""
-        
-        if feature == 'Credit_History':
-            if value == 1:
-                return {
-                    'factor': 'Credit History',
-                    'impact': 'POSITIVE',
-                    'weight': f"{importance:.1%}",
-                    'explanation': 'Applicant has good credit history (strong positive factor)'
-                }
-            else:
-                return {
-                    'factor': 'Credit History',
-                    'impact': 'NEGATIVE',
-                    'weight': f"{importance:.1%}",
-                    'explanation': 'No credit history (major risk factor)'
-                }
+    @staticmethod
+    def overall_assessment(ml_probability):
+        """One-line verdict for an approval probability"""
+        for test, threshold, text in OVERALL_BANDS:
+            if TESTS[test](ml_probability, threshold):
+                return text
+        return OVERALL_DEFAULT
+    
+    def explain_batch(self, columns, probabilities, contributions=None):
+        """
+        Explain many predictions at once
+        columns: {feature: values} with the features explain_prediction takes
+        contributions: optional {feature: per-row contributions}
+        Returns one explain_prediction-shaped dict per row; impact bands are
+        assigned to whole columns, and only templates with a value are formatted
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        explained, top = self._plan(columns)
         
-        elif feature == 'Total_Income':
-            if value >= 8000:
-                impact = 'POSITIVE'
-                explanation = f'High total income (₹{value:,.0f}) supports repayment capacity'
-            elif value >= 4000:
-                impact = 'NEUTRAL'
-                explanation = f'Moderate income (₹{value:,.0f})'
-            else:
-                impact = 'NEGATIVE'
-                explanation = f'Low income (₹{value:,.0f}) may impact repayment'
-            
-            return {
-                'factor': 'Total Income',
-                'impact': impact,
-                'weight': f"{importance:.1%}",
-                'explanation': explanation
-            }
+        # Per explained feature: (values, renderer chosen for each row)
+        factor_columns = []
+        for feature, tests, renderers in explained:
+            values = np.asarray(columns[feature])
+            bands = np.select(
+                [test(values, threshold) for test, threshold in tests],
+                np.arange(len(tests)),
+                default=len(tests)
+            )
+            factor_columns.append((values.tolist(), [renderers[band] for band in bands.tolist()]))
         
-        elif feature == 'Loan_to_Income':
-            if value > 0.3:
-                impact = 'NEGATIVE'
-                explanation = f'High loan-to-income ratio ({value:.1%}) indicates potential stress'
-            elif value > 0.2:
-                impact = 'NEUTRAL'
-                explanation = f'Moderate loan-to-income ratio ({value:.1%})'
-            else:
-                impact = 'POSITIVE'
-                explanation = f'Low loan-to-income ratio ({value:.1%}) is favorable'
-            
-            return {
-                'factor': 'Loan-to-Income Ratio',
-                'impact': impact,
-                'weight': f"{importance:.1%}",
-                'explanation': explanation
-            }
+        overall_texts = [text for _, _, text in OVERALL_BANDS] + [OVERALL_DEFAULT]
+        overall = np.select(
+            [TESTS[test](probabilities, threshold) for test, threshold, _ in OVERALL_BANDS],
+            np.arange(len(OVERALL_BANDS)),
+            default=len(OVERALL_BANDS)
+        ).tolist()
         
-        elif feature == 'DTI_Ratio':
-            if value > 43:
-                impact = 'NEGATIVE'
-                explanation = f'DTI ratio ({value:.1f}%) exceeds standard threshold (43%)'
-            elif value > 36:
-                impact = 'NEUTRAL'
-                explanation = f'DTI ratio ({value:.1f}%) is moderate'
-            else:
-                impact = 'POSITIVE'
-                explanation = f'Low DTI ratio ({value:.1f}%) indicates good debt management'
-            
-            return {
-                'factor': 'Debt-to-Income Ratio',
-                'impact': impact,
-                'weight': f"{importance:.1%}",
-                'explanation': explanation
-            }
+        n_rows = len(probabilities)
+        top_columns = [
+            (
+                feature,
+                importance,
+                [contribution] * n_rows if contributions is None
+                else (np.asarray(contributions[feature], dtype=np.float64) * 100).tolist(),
+                np.asarray(columns[feature]).tolist()
+            )
+            for feature, importance, contribution in top
+        ]
         
-        elif feature == 'LoanAmount':
-            if value > 300:
-                impact = 'NEGATIVE'
-                explanation = f'High loan amount (₹{value:,.0f}K) requires strong financials'
-            elif value > 150:
-                impact = 'NEUTRAL'
-                explanation = f'Moderate loan amount (₹{value:,.0f}K)'
-            else:
-                impact = 'POSITIVE'
-                explanation = f'Manageable loan amount (₹{value:,.0f}K)'
-            
-            return {
-                'factor': 'Loan Amount',
-                'impact': impact,
-                'weight': f"{importance:.1%}",
-                'explanation': explanation
-            }
+        results = []
+        for i, probability in enumerate(probabilities.tolist()):
+            results.append({
+                'overall_assessment': overall_texts[overall[i]],
+                'ml_confidence': f"{probability:.1%}",
+                'key_factors': [renderers[i](values[i]) for values, renderers in factor_columns],
+                'top_features': [
+                    {'feature': feature, 'value': values[i], 'importance': importance, 'contribution': contribution[i]}
+                    for feature, importance, contribution, values in top_columns
+                ]
+            })
         
-        return None
+        return results
 
 
 def test_explainer():
     """Test explainer"""
+    import pandas as pd
     
     # Mock feature importance
     importance_df = pd.DataFrame({
@@ -188,6 +247,28 @@ def test_explainer():
     for factor in explanation['key_factors']:
         print(f"  [{factor['impact']}] {factor['factor']} (Weight: {factor['weight']})")
         print(f"      {factor['explanation']}")
+    
+    # Batch path matches the single-row path, including band edges
+    rows = [
+        test_input,
+        {'Credit_History': 0, 'Total_Income': 8000, 'Loan_to_Income': 0.3, 'DTI_Ratio': 43, 'LoanAmount': 300},
+        {'Credit_History': 1, 'Total_Income': 3999, 'Loan_to_Income': 0.31, 'DTI_Ratio': 43.5, 'LoanAmount': 301}
+    ]
+    probabilities = [0.75, 0.5, 0.2]
+    columns = {feature: [row[feature] for row in rows] for feature in test_input}
+    batch = explainer.explain_batch(columns, probabilities)
+    assert batch == [explainer.explain_prediction(row, p, None) for row, p in zip(rows, probabilities)]
+    
+    # Path contributions replace the importance-based figure
+    contributions = [{feature: 0.01 * (k + 1) - 0.02 * i for k, feature in enumerate(test_input)} for i in range(len(rows))]
+    contribution_columns = {feature: [row[feature] for row in contributions] for feature in test_input}
+    batch = explainer.explain_batch(columns, probabilities, contribution_columns)
+    assert batch == [
+        explainer.explain_prediction(row, p, None, contribution)
+        for row, p, contribution in zip(rows, probabilities, contributions)
+    ]
+    assert batch[0]['top_features'][0]['contribution'] == contributions[0]['Credit_History'] * 100
+    print("\n✅ explain_batch matches explain_prediction")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+"""
+Loan Application Record
+Parsed application with its derived features, built once per request
+"""
+
+PROPERTY_AREA_MAP = {'Urban': 2, 'Semiurban': 1, 'Rural': 0}
+
+
+class LoanApplication:
+    """
+    Typed application shared by validation, rules, ML features and the explainer
+
+    Raw fields are parsed once; total income, loan-to-income, monthly payment
+    and DTI are computed once in __init__ and read as attributes afterwards.
+    """
+
+    __slots__ = (
+        'applicant_income', 'coapplicant_income', 'loan_amount', 'loan_amount_term',
+        'credit_history', 'property_area', 'self_employed', 'dependents',
+        'total_income', 'loan_to_income', 'monthly_payment', 'monthly_income',
+        'dti_ratio', 'property_area_code'
+    )
+
+    # (field, parser, default) for the raw payload; defaults match RiskRuleEngine
+    FIELDS = [
+        ('applicant_income', float, 0),
+        ('coapplicant_income', float, 0),
+        ('loan_amount', float, 0),
+        ('loan_amount_term', float, 360),
+        ('credit_history', int, 1),
+        ('property_area', str, 'Urban'),
+        ('self_employed', int, 0),
+        ('dependents', int, 0)
+    ]
+
+    def __init__(self, applicant_income, coapplicant_income, loan_amount, loan_amount_term,
+                 credit_history, property_area, self_employed, dependents):
+        self.applicant_income = applicant_income
+        self.coapplicant_income = coapplicant_income
+        self.loan_amount = loan_amount
+        self.loan_amount_term = loan_amount_term
+        self.credit_history = credit_history
+        self.property_area = property_area
+        self.self_employed = self_employed
+        self.dependents = dependents
+
+        # Derived features
+        total_income = applicant_income + coapplicant_income
+        self.total_income = total_income
+        self.loan_to_income = loan_amount / total_income if total_income > 0 else 0
+        self.monthly_payment = (loan_amount * 1000) / loan_amount_term if loan_amount_term > 0 else 0  # Convert to monthly
+        self.monthly_income = total_income / 12
+
+        # None when there is no income to compare against
+        self.dti_ratio = (self.monthly_payment / self.monthly_income) * 100 if self.monthly_income > 0 else None
+
+        self.property_area_code = PROPERTY_AREA_MAP.get(property_area, 2)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Parse a raw payload without validation; absent fields take the defaults"""
+        return cls(*(parse(data.get(field, default)) for field, parse, default in cls.FIELDS))
+
+    @classmethod
+    def coerce(cls, data):
+        """Return data unchanged if it is already a record, else parse it"""
+        return data if isinstance(data, cls) else cls.from_dict(data)
+
+    def __repr__(self):
+        fields = ', '.join(f"{field}={getattr(self, field)!r}" for field, _, _ in self.FIELDS)
+        return f"LoanApplication({fields})"
+
+
+def test_loan_application():
+    """Test loan application record"""
+    application = LoanApplication.from_dict({
+        'applicant_income': '5000',
+        'coapplicant_income': 1000,
+        'loan_amount': 150,
+        'loan_amount_term': 360,
+        'credit_history': '1',
+        'property_area': 'Rural'
+    })
+
+    assert application.total_income == 6000.0
+    assert application.loan_to_income == 150 / 6000
+    assert abs(application.dti_ratio - (150000 / 360) / 500 * 100) < 1e-12
+    assert application.property_area_code == 0
+    assert application.self_employed == 0 and application.dependents == 0
+    assert LoanApplication.coerce(application) is application
+
+    # No income: no DTI
+    assert LoanApplication.from_dict({'loan_amount': 100}).dti_ratio is None
+
+    print("✅ Loan application tests passed")
+    print(application)
+
+
+if __name__ == "__main__":
+    test_loan_application()
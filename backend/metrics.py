@@ -0,0 +1,256 @@
+"""
+Metrics
+Counters, histograms, gauges and per-stage request timers, rendered in the
+Prometheus text exposition format for /metrics
+"""
+
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+
+# Seconds; spans a few microseconds (validation) to a slow request
+DEFAULT_BUCKETS = (
+    0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+
+class Histogram:
+    """Bucketed observations of one label combination"""
+
+    __slots__ = ('bounds', 'counts', 'sum', '_lock')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def snapshot(self):
+        """(cumulative bucket counts, sum)"""
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total
+
+
+class Counter:
+    """Monotonic count of one label combination"""
+
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class MetricFamily:
+    """A named metric with label names; labels(...) returns the child for one combination"""
+
+    def __init__(self, name, help_text, metric_type, labelnames=(), factory=None):
+        self.name = name
+        self.help = help_text
+        self.type = metric_type
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._factory()
+        return child
+
+    def samples(self):
+        """(suffix, label pairs, value) for every child, in creation order"""
+        for values, child in list(self._children.items()):
+            labels = list(zip(self.labelnames, values))
+            if self.type == 'counter':
+                yield '_total', labels, child.value
+            else:
+                cumulative, total = child.snapshot()
+                for bound, count in zip(child.bounds + (float('inf'),), cumulative):
+                    yield '_bucket', labels + [('le', _format_value(bound))], count
+                yield '_sum', labels, total
+                yield '_count', labels, cumulative[-1]
+
+
+class CallbackMetric:
+    """Gauge (or counter) read from a callable at scrape time"""
+
+    def __init__(self, name, help_text, fn, metric_type='gauge'):
+        self.name = name
+        self.help = help_text
+        self.type = metric_type
+        self.fn = fn
+
+    def samples(self):
+        value = self.fn()
+        if value is not None:
+            yield '_total' if self.type == 'counter' else '', [], value
+
+
+class MetricsRegistry:
+    """Metrics of one process, rendered together by render()"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text, labelnames=()):
+        """Counter family; name is given without the _total suffix"""
+        return self._register(MetricFamily(name, help_text, 'counter', labelnames, Counter))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        bounds = tuple(sorted(buckets))
+        return self._register(MetricFamily(name, help_text, 'histogram', labelnames, lambda: Histogram(bounds)))
+
+    def gauge(self, name, help_text, fn):
+        """Gauge whose value is fn() when scraped (None leaves it out)"""
+        return self._register(CallbackMetric(name, help_text, fn))
+
+    def callback_counter(self, name, help_text, fn):
+        """Counter kept elsewhere (e.g. cache hits), read when scraped"""
+        return self._register(CallbackMetric(name, help_text, fn, 'counter'))
+
+    def _register(self, metric):
+        if any(existing.name == metric.name for existing in self._metrics):
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in metric.samples():
+                label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in labels)
+                lines.append(f"{metric.name}{suffix}{{{label_text}}} {_format_value(value)}"
+                             if label_text else f"{metric.name}{suffix} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+class StageTimer:
+    """
+    perf_counter laps of one request
+
+    Each lap(stage) observes the time since the previous lap (or since the
+    timer was created) into histogram{stage=...} and keeps it for the
+    request's Server-Timing header.
+    """
+
+    __slots__ = ('histogram', 'start', 'last', 'laps')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = self.last = perf_counter()
+        self.laps = []
+
+    def lap(self, stage):
+        now = perf_counter()
+        elapsed = now - self.last
+        self.last = now
+        self.histogram.labels(stage).observe(elapsed)
+        self.laps.append((stage, elapsed))
+        return elapsed
+
+    def elapsed(self):
+        """Seconds since the timer was created"""
+        return perf_counter() - self.start
+
+    def server_timing(self):
+        """Server-Timing header value: every lap plus the total, in milliseconds"""
+        entries = [f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in self.laps]
+        entries.append(f"total;dur={self.elapsed() * 1000:.3f}")
+        return ', '.join(entries)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def test_metrics():
+    """Test metrics registry and stage timer"""
+    registry = MetricsRegistry()
+    stages = registry.histogram('stage_seconds', 'Stage latency', ['stage'], buckets=(0.001, 0.01))
+    requests = registry.counter('requests', 'Requests by status', ['status'])
+    registry.gauge('queue_depth', 'Rows waiting', lambda: 3)
+    registry.gauge('disabled', 'Left out when None', lambda: None)
+
+    for value in (0.0005, 0.001, 0.005, 0.5):
+        stages.labels('ml').observe(value)
+    requests.labels('200').inc()
+    requests.labels('200').inc()
+    requests.labels('400').inc()
+
+    text = registry.render()
+    print(text)
+    assert 'stage_seconds_bucket{stage="ml",le="0.001"} 2' in text  # le is inclusive
+    assert 'stage_seconds_bucket{stage="ml",le="0.01"} 3' in text
+    assert 'stage_seconds_bucket{stage="ml",le="+Inf"} 4' in text
+    assert 'stage_seconds_count{stage="ml"} 4' in text
+    assert 'requests_total{status="200"} 2' in text
+    assert '\nqueue_depth 3\n' in text and '\ndisabled ' not in text
+    assert text.count('# TYPE') == 4
+    print("✅ Rendered histogram, counter and gauge samples")
+
+    timer = StageTimer(stages)
+    timer.lap('validate')
+    timer.lap('rules')
+    assert [stage for stage, _ in timer.laps] == ['validate', 'rules']
+    assert timer.server_timing().startswith('validate;dur=') and 'total;dur=' in timer.server_timing()
+    assert stages.labels('validate').snapshot()[0][-1] == 1
+    print(f"✅ Stage timer: {timer.server_timing()}")
+
+    # Concurrent observations are all counted
+    def observe():
+        for _ in range(10000):
+            stages.labels('audit').observe(0.002)
+
+    threads = [threading.Thread(target=observe) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stages.labels('audit').snapshot()[0][-1] == 80000
+    print("✅ 80000 observations from 8 threads counted")
+
+    try:
+        registry.counter('requests', 'Duplicate')
+        raise AssertionError('expected ValueError')
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_metrics()
@@ -0,0 +1,197 @@
+"""
+Micro-Batcher
+Coalesces concurrent single-row model calls into one vectorized call
+"""
+
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Runs predict(X) once for rows submitted by many threads
+
+    A background thread takes the first waiting row, then keeps collecting
+    until max_batch rows are in hand or max_wait_ms has passed since it
+    took the first one, stacks them and makes a single predict call. Each
+    caller gets back its own row of the result.
+    """
+
+    _STOP = object()
+
+    def __init__(self, predict, max_batch=64, max_wait_ms=0.0, name='micro-batcher'):
+        """
+        predict: callable taking an (n, n_features) array and returning n
+                 per-row results (anything indexable by row)
+        max_batch: most rows per predict call
+        max_wait_ms: longest a row waits for company (the default 0 batches
+                     only what is already queued)
+        """
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run_loop, name=name, daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def submit(self, row):
+        """
+        Queue a (1, n_features) row and return a Future for its result
+        The row is read when its batch runs; do not reuse it until then
+        """
+        future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError('MicroBatcher is closed'))
+        else:
+            self._queue.put((row, future))
+        return future
+
+    def __call__(self, row, timeout=None):
+        """Submit a row and block until its result is ready"""
+        return self.submit(row).result(timeout)
+
+    def close(self):
+        """Finish queued rows and stop the background thread"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(self._STOP)
+            self._worker.join()
+
+            # Rows that raced in behind the stop marker
+            leftover = []
+            while True:
+                try:
+                    leftover.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if leftover:
+                self._run_batch(leftover)
+
+    def pending(self):
+        """Rows queued and not yet taken into a batch"""
+        return self._queue.qsize()
+
+    def stats(self):
+        """Batch counters"""
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_size': round(self.rows / self.batches, 2) if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000
+        }
+
+    def _run_loop(self):
+        """Background thread: group queued rows into predict calls"""
+        stopping = False
+
+        while not stopping:
+            first = self._queue.get()
+            if first is self._STOP:
+                break
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    # Everything queued before the marker is already in hand
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        """One predict call; results (or the error) go back to every caller"""
+        try:
+            results = self.predict(np.concatenate([row for row, _ in batch]))
+            # Fanned out here so a malformed result fails the callers, not this thread
+            if len(results) != len(batch):
+                raise ValueError(f"predict returned {len(results)} results for {len(batch)} rows")
+            results = [results[i] for i in range(len(batch))]
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.rows += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+        for i, (_, future) in enumerate(batch):
+            future.set_result(results[i])
+
+
+def test_micro_batcher(n_threads=16, rows_per_thread=200):
+    """Test micro-batcher"""
+    weights = np.arange(1.0, 5.0)
+    batcher = MicroBatcher(lambda X: X @ weights, max_batch=32, max_wait_ms=1.0)
+
+    errors = []
+
+    def client(seed):
+        rng = np.random.default_rng(seed)
+        for _ in range(rows_per_thread):
+            row = rng.random((1, len(weights)))
+            if not np.isclose(batcher(row, timeout=5), row[0] @ weights):
+                errors.append(row)
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = batcher.stats()
+    assert not errors
+    assert stats['rows'] == n_threads * rows_per_thread
+    assert 1 < stats['largest_batch'] <= 32
+    print(f"✅ {stats['rows']} rows from {n_threads} threads in {stats['batches']} batches "
+          f"(mean {stats['mean_batch_size']}, largest {stats['largest_batch']})")
+
+    # A failing predict call fails every caller in the batch, not the batcher
+    failing = MicroBatcher(lambda X: 1 / 0)
+    try:
+        failing(np.zeros((1, 4)), timeout=5)
+        raise AssertionError('expected ZeroDivisionError')
+    except ZeroDivisionError:
+        pass
+    # So does a result that cannot be split into one value per row
+    for malformed, error in ((lambda X: X.sum(axis=1)[:0], ValueError), (lambda X: None, TypeError)):
+        failing.predict = malformed
+        try:
+            failing(np.zeros((1, 4)), timeout=5)
+            raise AssertionError(f'expected {error.__name__}')
+        except error:
+            pass
+    failing.predict = lambda X: X.sum(axis=1)
+    assert failing(np.ones((1, 4)), timeout=5) == 4.0
+    print("✅ predict errors and malformed results reach the waiting callers")
+
+    batcher.close()
+    failing.close()
+    assert batcher.submit(np.zeros((1, 4))).exception() is not None
+    print("✅ Closed batcher rejects new rows")
+
+
+if __name__ == "__main__":
+    test_micro_batcher()
@@ -0,0 +1,198 @@
+"""
+Model Store
+Loads model artifacts quickly, warms up the pipeline and tracks readiness
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from data_validator import LoanDataValidator
+from risk_rules import RiskRuleEngine
+from explainer import LoanExplainer
+from tree_engine import CompiledForest
+from pipeline import FeatureWriter, prepare_feature_dict
+
+
+# Representative application pushed through every stage before reporting ready
+WARMUP_APPLICATION = {
+    'applicant_income': 5000,
+    'coapplicant_income': 1500,
+    'loan_amount': 150,
+    'loan_amount_term': 360,
+    'credit_history': 1,
+    'property_area': 'Urban',
+    'self_employed': 0,
+    'dependents': 1
+}
+
+
+class ModelStore:
+    """
+    Holds the compiled forest and explainer used on the request path
+
+    The forest is mapped read-only from loan_model.forest (no sklearn
+    import). If that bundle is missing or was compiled from a different
+    loan_model.pkl, the pickle is loaded once and the bundle rewritten.
+    """
+
+    PICKLE_FILE = 'loan_model.pkl'
+    COMPILED_FILE = 'loan_model.forest'
+
+    def __init__(self, models_dir, model_format='compiled'):
+        """
+        models_dir: directory with the training artifacts
+        model_format: 'compiled' (default) or 'pickle' to always unpickle
+        """
+        self.models_dir = models_dir
+        self.model_format = model_format
+
+        self.forest = None
+        self.explainer = None
+        self.features = FeatureWriter()
+        self.ml_available = False
+        self.version = 'rules-only'
+        self.source = None
+        self.load_time_ms = None
+        self.warmup_time_ms = None
+        self.error = None
+
+        self._ready = threading.Event()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def wait_until_ready(self, timeout=None):
+        """Block until load() has finished; returns False on timeout"""
+        return self._ready.wait(timeout)
+
+    def load(self, warm_up=True):
+        """Load artifacts, optionally warm up, then mark the store ready"""
+        start = time.perf_counter()
+
+        try:
+            self.forest, self.source = self._load_forest()
+            self.explainer = LoanExplainer.from_csv(self._path('feature_importance.csv'))
+
+            with open(self._path('model_metadata.json')) as f:
+                metadata = json.load(f)
+            # Keyed on the artifact itself, so replacing the model file under
+            # the same metadata still changes the version (and the cache keys)
+            digest = self.forest.source_digest or file_digest(self._path(self.COMPILED_FILE))
+            self.version = f"{metadata.get('training_date', 'unknown')}+{digest[:12]}"
+
+            # Column order is checked here once, not on every request
+            self.features = FeatureWriter(metadata.get('features', self.features.feature_names),
+                                          self.forest.feature_names)
+
+            self.ml_available = True
+            print(f"✅ ML model loaded from {self.source} artifact")
+        except Exception as e:
+            self.error = str(e)
+            print(f"⚠️  ML model not found: {e}")
+            print("⚠️  System will run in rule-based mode only")
+
+        self.load_time_ms = (time.perf_counter() - start) * 1000
+
+        if warm_up:
+            self.warm_up()
+
+        self._ready.set()
+
+    def warm_up(self):
+        """Run one application through validation, rules, ML and explanation"""
+        start = time.perf_counter()
+
+        application, _, _ = LoanDataValidator.parse(WARMUP_APPLICATION)
+        RiskRuleEngine.evaluate(application)
+
+        if self.ml_available:
+            # Also builds the forest's path contribution table
+            proba, _, contributions = self.forest.contributions(self.features.row(application))
+            self.explainer.explain_prediction(
+                prepare_feature_dict(application),
+                proba[0][1],
+                self.forest,
+                dict(zip(self.features.feature_names, contributions[0].tolist()))
+            )
+
+        self.warmup_time_ms = (time.perf_counter() - start) * 1000
+
+    def status(self):
+        """Readiness details for /health"""
+        return {
+            'ready': self.ready,
+            'ml_available': self.ml_available,
+            'model_version': self.version,
+            'model_source': self.source,
+            'load_time_ms': self.load_time_ms,
+            'warmup_time_ms': self.warmup_time_ms
+        }
+
+    def _path(self, name):
+        return os.path.join(self.models_dir, name)
+
+    def _load_forest(self):
+        """Return (forest, source) preferring the compiled bundle"""
+        pickle_path = self._path(self.PICKLE_FILE)
+        compiled_path = self._path(self.COMPILED_FILE)
+
+        digest = file_digest(pickle_path) if os.path.exists(pickle_path) else ''
+
+        if self.model_format == 'compiled' and os.path.exists(compiled_path):
+            forest = CompiledForest.load(compiled_path)
+            if not digest or forest.source_digest == digest:
+                return forest, 'compiled'
+
+        # Deferred: importing joblib/sklearn is most of a cold start
+        import joblib
+
+        forest = CompiledForest.from_sklearn(joblib.load(pickle_path))
+        forest.source_digest = digest
+
+        if self.model_format == 'compiled':
+            try:
+                forest.save(compiled_path)
+            except OSError as e:
+                print(f"⚠️  Could not write {compiled_path}: {e}")
+
+        return forest, 'pickle'
+
+
+def file_digest(path):
+    """sha256 of a file's contents"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_model_store(models_dir='models'):
+    """Test model store"""
+    store = ModelStore(models_dir)
+    store.load()
+
+    assert store.ready and store.ml_available
+    print(json.dumps(store.status(), indent=2))
+
+    # A replaced model file under the same metadata gets a new version
+    import joblib
+    import shutil
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as replaced_dir:
+        for name in os.listdir(models_dir):
+            shutil.copy(os.path.join(models_dir, name), replaced_dir)
+        pickle_path = os.path.join(replaced_dir, ModelStore.PICKLE_FILE)
+        joblib.dump(joblib.load(pickle_path), pickle_path, compress=3)
+
+        replaced = ModelStore(replaced_dir)
+        replaced.load(warm_up=False)
+        assert replaced.source == 'pickle' and replaced.version != store.version
+        assert replaced.version.split('+')[0] == store.version.split('+')[0]
+    print(f"✅ Model version {store.version} follows the artifact, not just its metadata")
+
+
+if __name__ == "__main__":
+    test_model_store()
@@ -0,0 +1,462 @@
+"""
+Assessment Pipeline
+Shared feature preparation, decision logic and batch scoring used by the API
+"""
+
+import operator
+import threading
+from time import perf_counter
+import uuid
+
+import numpy as np
+
+from data_validator import LoanDataValidator, ERROR_BITS, WARNING_BITS
+from loan_application import LoanApplication
+from risk_rules import RiskRuleEngine
+
+
+# Column order the ML model was trained on (see notebooks/train_model.py)
+FEATURE_ORDER = [
+    'ApplicantIncome', 'CoapplicantIncome', 'LoanAmount',
+    'Loan_Amount_Term', 'Credit_History', 'Self_Employed',
+    'Dependents', 'Total_Income', 'Loan_to_Income', 'DTI_Ratio',
+    'Property_Area'
+]
+
+# LoanApplication attributes consumed by RiskRuleEngine.evaluate_batch
+RULE_COLUMNS = [
+    'credit_history', 'applicant_income', 'coapplicant_income', 'loan_amount',
+    'loan_amount_term', 'property_area', 'self_employed', 'dependents'
+]
+
+
+# LoanApplication attribute behind every model feature
+FEATURE_SOURCES = {
+    'ApplicantIncome': 'applicant_income',
+    'CoapplicantIncome': 'coapplicant_income',
+    'LoanAmount': 'loan_amount',
+    'Loan_Amount_Term': 'loan_amount_term',
+    'Credit_History': 'credit_history',
+    'Self_Employed': 'self_employed',
+    'Dependents': 'dependents',
+    'Total_Income': 'total_income',
+    'Loan_to_Income': 'loan_to_income',
+    'DTI_Ratio': 'dti_ratio',
+    'Property_Area': 'property_area_code'
+}
+
+# Response detail levels, least to most work; 'full' is the default
+DETAIL_LEVELS = ['decision', 'summary', 'full']
+
+# Response fields kept below 'full' (validation failures always return everything)
+DETAIL_FIELDS = {
+    'decision': [
+        'success', 'application_id', 'decision', 'risk_level', 'risk_score', 'reason',
+        'processing_time_ms'
+    ],
+    'summary': [
+        'success', 'application_id', 'decision', 'risk_level', 'risk_score', 'reason',
+        'ml_confidence', 'explanation', 'flags', 'rule_flags', 'warnings',
+        'processing_time_ms', 'timestamp'
+    ]
+}
+
+# Explanation fields in a 'summary' response
+SUMMARY_EXPLANATION_FIELDS = ['overall_assessment', 'ml_confidence']
+
+
+class FeatureWriter:
+    """
+    Writes ML features straight into float64 arrays in the model's column order
+    The order is resolved (and checked against the model) once, at construction
+    """
+
+    def __init__(self, feature_names=FEATURE_ORDER, model_feature_names=None):
+        """
+        feature_names: column order, normally model_metadata.json 'features'
+        model_feature_names: the model's feature_names_in_, if it has them
+        """
+        feature_names = list(feature_names)
+        if model_feature_names is not None and list(model_feature_names) != feature_names:
+            raise ValueError(
+                f"Model feature order {list(model_feature_names)} does not match metadata {feature_names}"
+            )
+
+        unknown = [name for name in feature_names if name not in FEATURE_SOURCES]
+        if unknown:
+            raise ValueError(f"No application field for model features: {unknown}")
+
+        self.feature_names = feature_names
+        self._values = operator.attrgetter(*(FEATURE_SOURCES[name] for name in feature_names))
+
+        # DTI is None without income; the model was trained with 0 there
+        self._dti_index = feature_names.index('DTI_Ratio') if 'DTI_Ratio' in feature_names else None
+
+        self._local = threading.local()
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    def row(self, application):
+        """
+        One application as a (1, n_features) array
+        The array is this thread's reusable buffer: use it before the next call
+        """
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = self._local.row = np.empty((1, self.n_features), dtype=np.float64)
+
+        row[0] = self._values(application)
+        if self._dti_index is not None and application.dti_ratio is None:
+            row[0, self._dti_index] = 0.0
+        return row
+
+    def matrix(self, applications):
+        """Many applications as a new (n, n_features) array"""
+        matrix = np.empty((len(applications), self.n_features), dtype=np.float64)
+        for i, application in enumerate(applications):
+            matrix[i] = self._values(application)
+            if self._dti_index is not None and application.dti_ratio is None:
+                matrix[i, self._dti_index] = 0.0
+        return matrix
+
+
+# Writer in FEATURE_ORDER for callers that are not tied to a loaded model
+_default_features = FeatureWriter()
+
+
+def prepare_features_for_ml(application):
+    """Prepare features for ML model as a one-row DataFrame (sklearn and offline use)"""
+    row = _default_features.row(LoanApplication.coerce(application)).copy()
+
+    # Create DataFrame (pandas is imported on first use to keep startup fast)
+    import pandas as pd
+    return pd.DataFrame(row, columns=FEATURE_ORDER)
+
+
+def prepare_features_batch(applications):
+    """
+    Prepare the ML feature matrix for many applications at once
+    Same features as prepare_features_for_ml, one row per application
+    """
+    matrix = _default_features.matrix([LoanApplication.coerce(a) for a in applications])
+
+    import pandas as pd
+    return pd.DataFrame(matrix, columns=FEATURE_ORDER)
+
+
+def prepare_feature_dict(application):
+    """Prepare feature dictionary for explainer"""
+    application = LoanApplication.coerce(application)
+
+    return {
+        'Credit_History': application.credit_history,
+        'Total_Income': application.total_income,
+        'Loan_to_Income': application.loan_to_income,
+        'DTI_Ratio': application.dti_ratio or 0,
+        'LoanAmount': application.loan_amount
+    }
+
+
+def prepare_feature_columns(applications):
+    """Explainer features of many applications, as {feature: list} for explain_batch"""
+    return {
+        'Credit_History': [a.credit_history for a in applications],
+        'Total_Income': [a.total_income for a in applications],
+        'Loan_to_Income': [a.loan_to_income for a in applications],
+        'DTI_Ratio': [a.dti_ratio or 0 for a in applications],
+        'LoanAmount': [a.loan_amount for a in applications]
+    }
+
+
+def select_detail(response, detail):
+    """Keep the fields of a response that the detail level returns"""
+    if detail == 'full':
+        return response
+
+    selected = {field: response[field] for field in DETAIL_FIELDS[detail] if field in response}
+    if 'explanation' in selected:
+        explanation = selected['explanation']
+        selected['explanation'] = {field: explanation[field] for field in SUMMARY_EXPLANATION_FIELDS}
+    return selected
+
+
+def application_id_for(data):
+    """The client's application_id, or a new one when it is missing or empty"""
+    return data.get('application_id') or f"APP-{uuid.uuid4().hex[:8].upper()}"
+
+
+def validation_record(error_codes, warning_codes):
+    """validation_result of an audit record: codes as bitmasks, no text"""
+    return {
+        'is_valid': not error_codes,
+        'error_bits': LoanDataValidator.bits(error_codes, ERROR_BITS),
+        'warning_bits': LoanDataValidator.bits(warning_codes, WARNING_BITS)
+    }
+
+
+def rule_record(rule_result):
+    """rule_result of an audit record: the flag mask instead of flag dicts"""
+    return {
+        'risk_level': rule_result['risk_level'],
+        'risk_score': rule_result['risk_score'],
+        'flag_mask': rule_result['flag_mask']
+    }
+
+
+def audit_messages(applicant_data, error_bits, warning_bits, flag_mask):
+    """
+    Text of an audit row's coded columns, rendered from its stored payload
+    Returns {'errors', 'warnings', 'rule_flags'} as the API reported them
+    """
+    _, _, _, dti_ratio = LoanDataValidator.check(applicant_data)
+    errors, warnings = LoanDataValidator.messages(error_bits or 0, warning_bits or 0, dti_ratio)
+    return {
+        'errors': errors,
+        'warnings': warnings,
+        'rule_flags': RiskRuleEngine.flags_for(applicant_data, flag_mask) if flag_mask else []
+    }
+
+
+def make_final_decision(rule_result, ml_result, warnings):
+    """
+    Make final decision combining rules and ML
+    Priority: Rules > ML (rules can override ML)
+    """
+    rule_recommendation = rule_result['recommendation']
+    ml_prediction = ml_result.get('prediction')
+    ml_probability = ml_result.get('probability')
+
+    # High confidence scenarios
+    if rule_recommendation == 'REJECT':
+        return 'REJECTED', 'HIGH', 'Rule-based rejection due to critical risk factors'
+
+    if rule_recommendation == 'MANUAL_REVIEW':
+        return 'MANUAL_REVIEW', rule_result['risk_level'], 'Medium/High risk requires human review'
+
+    # Proceed to ML (if available)
+    if rule_recommendation == 'PROCEED_TO_ML':
+        if ml_prediction and ml_probability:
+            if ml_prediction == 'APPROVE' and ml_probability >= 0.7:
+                return 'APPROVED', 'LOW', f'Strong approval indicators (ML confidence: {ml_probability:.1%})'
+            elif ml_prediction == 'APPROVE' and ml_probability >= 0.5:
+                return 'MANUAL_REVIEW', 'MEDIUM', f'Moderate approval indicators (ML confidence: {ml_probability:.1%})'
+            else:
+                return 'REJECTED', 'MEDIUM', f'Insufficient approval indicators (ML confidence: {ml_probability:.1%})'
+        else:
+            # No ML available - approve low risk cases
+            return 'APPROVED', 'LOW', 'Low risk based on business rules'
+
+    # Default
+    return 'MANUAL_REVIEW', 'MEDIUM', 'Unable to make automated decision'
+
+
+class BatchScorer:
+    """
+    Scores a list of applications in one pass
+    Validation, rules, the ML model and the explainer each run once over every
+    application that reaches their stage
+    """
+
+    def __init__(self, model=None, explainer=None, features=None):
+        self.model = model
+        self.explainer = explainer
+        self.features = features if features is not None else _default_features
+
+    @property
+    def ml_available(self):
+        return self.model is not None and self.explainer is not None
+
+    def score(self, applications, detail='full'):
+        """
+        Assess applications in input order
+        detail: response detail level (DETAIL_LEVELS); below 'full' the
+        contributions and key factors are not computed
+        Returns: (results, audit_records) - one result per input item,
+        one audit record per application that was assessed
+        """
+        start_time = perf_counter()
+
+        results = [None] * len(applications)
+        audit_slots = [None] * len(applications)
+        validated = []  # (index, data, application_id, (warning codes, dti_ratio), application)
+
+        # Flag and warning text is only rendered for responses that return it
+        render_text = detail != 'decision'
+
+        # STEP 1: Validation of every application as columns
+        objects = []
+        for i, data in enumerate(applications):
+            if isinstance(data, dict):
+                objects.append((i, data))
+            else:
+                results[i] = {
+                    'success': False,
+                    'error': 'Application must be a JSON object'
+                }
+
+        checked = LoanDataValidator.validate_batch(
+            {field: [data.get(field) for _, data in objects] for field, _, _ in LoanApplication.FIELDS},
+            len(objects)
+        )
+        parsed = LoanDataValidator.applications(checked)
+        error_bits = checked['error_bits'].tolist()
+        warning_bits = checked['warning_bits'].tolist()
+        dti_ratios = checked['dti_ratio'].tolist()
+
+        for j, (i, data) in enumerate(objects):
+            application_id = application_id_for(data)
+            application = parsed[j]
+            warning_codes = LoanDataValidator.codes(warning_bits[j], WARNING_BITS) if warning_bits[j] else []
+            dti_ratio = None if dti_ratios[j] != dti_ratios[j] else dti_ratios[j]  # NaN: not computed
+
+            if application is None:
+                error_codes = LoanDataValidator.codes(error_bits[j], ERROR_BITS)
+                errors, warnings = LoanDataValidator.messages(error_codes, warning_codes, dti_ratio)
+                results[i] = {
+                    'success': False,
+                    'application_id': application_id,
+                    'decision': 'REJECTED',
+                    'reason': 'Data validation failed',
+                    'errors': errors,
+                    'warnings': warnings
+                }
+                audit_slots[i] = {
+                    'application_id': application_id,
+                    'applicant_data': data,
+                    'validation_result': validation_record(error_codes, warning_codes),
+                    'final_decision': 'REJECTED',
+                    'final_risk_level': 'HIGH',
+                    'decision_reason': 'Failed data validation'
+                }
+                continue
+
+            validated.append((i, data, application_id, (warning_codes, dti_ratio), application))
+
+        # STEP 2: Rules over all valid applications at once
+        pending = []  # (index, data, application_id, (warning codes, dti_ratio), application, rule_result)
+        if validated:
+            columns = {
+                name: [getattr(v[4], name) for v in validated]
+                for name in RULE_COLUMNS
+            }
+            rules = RiskRuleEngine.evaluate_batch(columns)
+
+            for j, (i, data, application_id, checked, application) in enumerate(validated):
+                rule_result = {
+                    'risk_level': rules['risk_level'][j],
+                    'risk_score': int(rules['risk_score'][j]),
+                    'flag_mask': int(rules['flag_mask'][j]),
+                    'total_flags': int(rules['total_flags'][j]),
+                    'recommendation': rules['recommendation'][j]
+                }
+
+                if rule_result['recommendation'] != 'REJECT':
+                    pending.append((i, data, application_id, checked, application, rule_result))
+                    continue
+
+                warning_codes, dti_ratio = checked
+
+                results[i] = select_detail({
+                    'success': True,
+                    'application_id': application_id,
+                    'decision': 'REJECTED',
+                    'risk_level': rule_result['risk_level'],
+                    'risk_score': rule_result['risk_score'],
+                    'reason': 'High risk based on business rules',
+                    'flags': RiskRuleEngine.flags_for(application, rule_result['flag_mask']) if render_text else None,
+                    'warnings': LoanDataValidator.messages([], warning_codes, dti_ratio)[1] if render_text else None
+                }, detail)
+                audit_slots[i] = {
+                    'application_id': application_id,
+                    'applicant_data': data,
+                    'validation_result': validation_record([], warning_codes),
+                    'rule_result': rule_record(rule_result),
+                    'final_decision': 'REJECTED',
+                    'final_risk_level': rule_result['risk_level'],
+                    'decision_reason': f"Rule-based rejection: {rule_result['risk_score']} risk score"
+                }
+
+        # STEP 3: One ML call and one explainer call for the whole batch
+        probabilities = None
+        if pending and self.ml_available:
+            applications_ml = [p[4] for p in pending]
+            X = self.features.matrix(applications_ml)
+            if detail == 'full':
+                proba, _, contributions = self.model.contributions(X)
+                probabilities = proba[:, 1]
+                explanations = self.explainer.explain_batch(
+                    prepare_feature_columns(applications_ml),
+                    probabilities,
+                    {name: contributions[:, k] for k, name in enumerate(self.features.feature_names)}
+                )
+            else:
+                probabilities = self.model.predict_proba(X)[:, 1]
+                explanations = [
+                    {
+                        'overall_assessment': self.explainer.overall_assessment(probability),
+                        'ml_confidence': f"{probability:.1%}"
+                    }
+                    for probability in probabilities.tolist()
+                ] if detail == 'summary' else [None] * len(pending)
+
+        # STEP 4 & 5: Attach Explanation and make the Final Decision
+        for j, (i, data, application_id, (warning_codes, dti_ratio), application, rule_result) in enumerate(pending):
+            if probabilities is not None:
+                ml_probability = float(probabilities[j])
+                ml_result = {
+                    'probability': ml_probability,
+                    'prediction': 'APPROVE' if ml_probability >= 0.5 else 'REJECT'
+                }
+                explanation = explanations[j]
+            else:
+                ml_result = {'probability': None, 'prediction': None}
+                explanation = {
+                    'overall_assessment': 'Rule-based assessment only (ML not available)',
+                    'ml_confidence': 'N/A',
+                    'key_factors': [],
+                    'top_features': []
+                }
+
+            final_decision, final_risk_level, decision_reason = make_final_decision(
+                rule_result,
+                ml_result,
+                warning_codes
+            )
+
+            results[i] = select_detail({
+                'success': True,
+                'application_id': application_id,
+                'decision': final_decision,
+                'risk_level': final_risk_level,
+                'risk_score': rule_result['risk_score'],
+                'reason': decision_reason,
+                'ml_confidence': f"{ml_result['probability']:.1%}" if ml_result['probability'] else 'N/A',
+                'explanation': explanation,
+                'rule_flags': RiskRuleEngine.flags_for(application, rule_result['flag_mask']) if render_text else None,
+                'warnings': LoanDataValidator.messages([], warning_codes, dti_ratio)[1] if render_text else None
+            }, detail)
+            audit_slots[i] = {
+                'application_id': application_id,
+                'applicant_data': data,
+                'validation_result': validation_record([], warning_codes),
+                'rule_result': rule_record(rule_result),
+                'ml_result': ml_result,
+                'final_decision': final_decision,
+                'final_risk_level': final_risk_level,
+                'decision_reason': decision_reason
+            }
+
+        # Amortized processing time per application
+        elapsed_ms = (perf_counter() - start_time) * 1000
+        per_item_ms = int(elapsed_ms / len(applications)) if applications else 0
+
+        audit_records = []
+        for result, record in zip(results, audit_slots):
+            if record is not None:
+                result['processing_time_ms'] = per_item_ms
+                record['processing_time_ms'] = per_item_ms
+                audit_records.append(record)
+
+        return results, audit_records
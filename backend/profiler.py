@@ -0,0 +1,227 @@
+"""
+Request Profiler
+Opt-in profiling of a sample of requests: a sys.setprofile hook on the
+request's thread records the time spent in every call stack, and the stacks
+of all profiled requests are merged into collapsed (flamegraph.pl /
+speedscope) output for an admin endpoint
+"""
+
+import hmac
+import random
+import sys
+import threading
+import time
+from time import perf_counter
+
+
+class _Node:
+    """One call stack: its callees and the time spent in it, excluding them"""
+
+    __slots__ = ('children', 'self_time')
+
+    def __init__(self):
+        self.children = {}
+        self.self_time = 0.0
+
+
+# Labels per code object, shared by every tracer
+_labels = {}
+
+
+def _label(frame):
+    code = frame.f_code
+    label = _labels.get(code)
+    if label is None:
+        name = getattr(code, 'co_qualname', code.co_name)  # co_qualname is 3.11+
+        label = _labels[code] = f"{frame.f_globals.get('__name__', '?')}:{name}"
+    return label
+
+
+def _c_label(fn):
+    """Label of a built-in (C) function or method, e.g. sqlite3:Connection.execute"""
+    owner = getattr(fn, '__self__', None)
+    module = getattr(fn, '__module__', None)
+    if module is None and owner is not None:
+        module = type(owner).__module__
+    return f"{module or 'builtins'}:{getattr(fn, '__qualname__', fn.__name__)}"
+
+
+class CallTracer:
+    """
+    sys.setprofile callback for one thread
+
+    The stack starts as the frames that installed it, so returns out of them
+    attribute later calls to the right callers. Time spent in the callback
+    itself is left out.
+    """
+
+    def __init__(self, frame):
+        self.root = _Node()
+        path = []
+        while frame is not None:
+            path.append(_label(frame))
+            frame = frame.f_back
+        self.stack = [self.root]
+        for label in reversed(path):
+            self.stack.append(self._child(self.stack[-1], label))
+        self.previous = sys.getprofile()
+        self.last = perf_counter()
+
+    @staticmethod
+    def _child(node, label):
+        child = node.children.get(label)
+        if child is None:
+            child = node.children[label] = _Node()
+        return child
+
+    def __call__(self, frame, event, arg):
+        stack = self.stack
+        stack[-1].self_time += perf_counter() - self.last
+        if event == 'call':
+            stack.append(self._child(stack[-1], _label(frame)))
+        elif event == 'c_call':
+            stack.append(self._child(stack[-1], _c_label(arg)))
+        elif len(stack) > 1:  # return, c_return, c_exception
+            stack.pop()
+        self.last = perf_counter()
+
+    def stacks(self):
+        """(stack labels, seconds) for every stack with time of its own"""
+        pending = [((), self.root)]
+        while pending:
+            path, node = pending.pop()
+            if node.self_time and path:
+                yield path, node.self_time
+            for label, child in node.children.items():
+                pending.append((path + (label,), child))
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and aggregates their stacks
+
+    sample_rate: fraction of requests profiled at random (0 disables sampling)
+    token: a request whose profiling header equals it is always profiled, and
+        reading the profile requires it; without a token the header is ignored
+        and the profile cannot be read
+    """
+
+    def __init__(self, sample_rate=0.0, token=None):
+        self.sample_rate = sample_rate
+        self.token = token or None
+        self.enabled = sample_rate > 0 or self.token is not None
+        self.requests = 0  # since the last reset
+        self.total_requests = 0
+        self._stacks = {}
+        self._lock = threading.Lock()
+
+    def wanted(self, header_value=None):
+        """Whether to profile a request carrying header_value (None when absent)"""
+        if not self.enabled:
+            return False
+        if self.authorized(header_value):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def authorized(self, header_value):
+        """Whether header_value is the configured token (never, without a token)"""
+        if self.token is None or header_value is None:
+            return False
+        return hmac.compare_digest(header_value.encode(), self.token.encode())
+
+    def start(self):
+        """Start tracing the calling thread; pass the result to stop() on the same thread"""
+        tracer = CallTracer(sys._getframe())
+        sys.setprofile(tracer)
+        return tracer
+
+    def stop(self, tracer):
+        """Stop tracing and add the request's stacks to the profile"""
+        sys.setprofile(tracer.previous)
+        with self._lock:
+            self.requests += 1
+            self.total_requests += 1
+            for path, seconds in tracer.stacks():
+                self._stacks[path] = self._stacks.get(path, 0.0) + seconds
+
+    def run(self, fn, *args):
+        """fn(*args), profiled"""
+        tracer = self.start()
+        try:
+            return fn(*args)
+        finally:
+            self.stop(tracer)
+
+    def collapsed(self, reset=False):
+        """
+        (collapsed stacks text, profiled request count)
+        One "caller;...;callee microseconds" line per stack, as flamegraph.pl reads
+        """
+        with self._lock:
+            stacks, requests = self._stacks, self.requests
+            if reset:
+                self._stacks, self.requests = {}, 0
+            else:
+                stacks = dict(stacks)
+
+        lines = [
+            f"{';'.join(path)} {round(seconds * 1e6)}"
+            for path, seconds in sorted(stacks.items())
+            if seconds >= 0.5e-6
+        ]
+        return ''.join(line + '\n' for line in lines), requests
+
+
+def test_profiler():
+    """Test stack aggregation and request selection"""
+
+    def slow_leaf():
+        time.sleep(0.01)
+
+    def fast_leaf():
+        return sum(range(100))
+
+    def handler():
+        slow_leaf()
+        fast_leaf()
+        return 'done'
+
+    profiler = RequestProfiler(sample_rate=1.0)
+    assert profiler.run(handler) == 'done'
+    assert profiler.run(handler) == 'done'
+    assert sys.getprofile() is None
+
+    text, requests = profiler.collapsed()
+    print(text)
+    assert requests == 2
+    stacks = {line.rsplit(' ', 1)[0]: int(line.rsplit(' ', 1)[1]) for line in text.splitlines()}
+
+    slow = [stack for stack in stacks if stack.endswith('test_profiler.<locals>.slow_leaf;time:sleep')]
+    assert len(slow) == 1
+    # Full stack from the outermost frame down, through the profiled call
+    assert ':test_profiler;' in slow[0] and ':RequestProfiler.run;' in slow[0]
+    assert ':test_profiler.<locals>.handler;' in slow[0]
+    assert stacks[slow[0]] >= 20000  # two 10ms sleeps
+    assert any(stack.endswith('fast_leaf;builtins:sum') for stack in stacks)
+    print("✅ Collapsed stacks attribute time to the right callers")
+
+    _, requests = profiler.collapsed(reset=True)
+    assert requests == 2 and profiler.collapsed() == ('', 0)
+
+    # Request selection
+    assert not RequestProfiler().wanted('anything')
+    # Sampling only: any header is ignored, and the profile cannot be read
+    sampling_only = RequestProfiler(sample_rate=0.001)
+    assert sum(sampling_only.wanted('anything') for _ in range(1000)) < 20
+    assert not sampling_only.authorized('anything') and not sampling_only.authorized('')
+    tokened = RequestProfiler(token='s3cret')
+    assert tokened.enabled and tokened.wanted('s3cret') and not tokened.wanted('wrong') and not tokened.wanted()
+    assert tokened.authorized('s3cret') and not tokened.authorized(None)
+    sampled = RequestProfiler(sample_rate=0.25)
+    rate = sum(sampled.wanted() for _ in range(20000)) / 20000
+    assert 0.2 < rate < 0.3
+    print(f"✅ Header opt-in and sampling ({rate:.1%} of requests at sample_rate=0.25)")
+
+
+if __name__ == "__main__":
+    test_profiler()
@@ -0,0 +1,183 @@
+"""
+Result Cache
+Bounded LRU/TTL cache of assessment responses keyed on the canonical application
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from data_validator import LoanDataValidator
+
+
+class ResultCache:
+
+    # Fields that influence the assessment; anything else in the payload is ignored
+    KEY_FIELDS = LoanDataValidator.REQUIRED_FIELDS + [
+        'coapplicant_income',
+        'self_employed',
+        'dependents'
+    ]
+
+    def __init__(self, max_size=10000, ttl_seconds=300, version=''):
+        """
+        max_size: entries kept before the least recently used is evicted (0 disables)
+        ttl_seconds: how long an entry stays valid
+        version: model/rule version; entries from another version never match
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.version = version
+
+        self._entries = OrderedDict()  # key -> (expires_at, response)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key_for(self, data, variant=''):
+        """
+        Canonical hash of an application payload
+        Numbers are compared by value (5000 == 5000.0), strings, booleans and
+        nulls keep their type, and a client-supplied application_id (unless
+        empty) is part of the key so retries with the same id are idempotent
+        variant: response shape (e.g. detail level); shapes never share a key
+        """
+        canonical = {}
+        for field in self.KEY_FIELDS:
+            if field in data:
+                canonical[field] = self._normalize(data[field])
+        if data.get('application_id'):
+            canonical['application_id'] = str(data['application_id'])
+
+        payload = json.dumps([self.version, variant, canonical], sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def _normalize(value):
+        """Tag values so that only interchangeable inputs share a key"""
+        if isinstance(value, bool) or value is None:
+            return ['b', value]
+        if isinstance(value, (int, float)):
+            return ['n', float(value)]
+        return ['s', str(value)]
+
+    def get(self, key):
+        """Return the cached response for key, or None"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, response = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def put(self, key, response):
+        """Store a response, evicting the least recently used entries if full"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_version(self, version):
+        """Switch to a new model/rule version, dropping every cached result"""
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self._entries.clear()
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'version': self.version,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': f"{(self.hits / lookups * 100) if lookups else 0:.1f}%"
+            }
+
+
+def test_result_cache():
+    """Test result cache"""
+    cache = ResultCache(max_size=2, ttl_seconds=60, version='v1')
+
+    application = {
+        'applicant_income': 5000,
+        'loan_amount': 150,
+        'loan_amount_term': 360,
+        'credit_history': 1,
+        'property_area': 'Urban'
+    }
+
+    key = cache.key_for(application)
+    assert cache.get(key) is None
+    cache.put(key, {'decision': 'APPROVED'})
+
+    # Same values, different order / numeric type / extra fields -> same key
+    same = dict(reversed(list(application.items())), applicant_income=5000.0, note='retry')
+    assert cache.key_for(same) == key
+    assert cache.get(cache.key_for(same)) == {'decision': 'APPROVED'}
+
+    # String and number are not interchangeable for every stage
+    assert cache.key_for(dict(application, credit_history='1.0')) != key
+    assert cache.key_for(dict(application, application_id='APP-1')) != key
+    # An empty application_id is no idempotency key
+    assert cache.key_for(dict(application, application_id='')) == key
+    assert cache.key_for(application, 'decision') != key
+
+    # LRU eviction
+    cache.put('a', {})
+    cache.put('b', {})
+    assert cache.get(key) is None and cache.evictions == 1
+
+    # Version change invalidates
+    cache.set_version('v2')
+    assert cache.stats()['size'] == 0
+    assert cache.key_for(application) != key
+
+    print("✅ Result cache tests passed")
+    print(json.dumps(cache.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    test_result_cache()
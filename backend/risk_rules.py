@@ -3,121 +3,106 @@ Rule-Based Risk Engine
 Implements compliance and business rules for loan assessment
 """
 
+import numpy as np
+
+from loan_application import LoanApplication
+
+
+# Bit assigned to each rule outcome in a flag mask (R1-R7, in rule order)
+FLAG_NO_CREDIT_HISTORY = 1 << 0
+FLAG_HIGH_LOAN_TO_INCOME = 1 << 1
+FLAG_MODERATE_LOAN_TO_INCOME = 1 << 2
+FLAG_VERY_HIGH_DTI = 1 << 3
+FLAG_HIGH_DTI = 1 << 4
+FLAG_LOW_INCOME = 1 << 5
+FLAG_RURAL_PROPERTY = 1 << 6
+FLAG_SELF_EMPLOYED = 1 << 7
+FLAG_HIGH_DEPENDENTS = 1 << 8
+
+
 class RiskRuleEngine:
     
+    # Bump whenever a rule or threshold changes; cached results are keyed on it
+    RULES_VERSION = '1.0'
+    
     # Risk thresholds
     HIGH_LOAN_THRESHOLD = 5000
     LOW_INCOME_THRESHOLD = 2500
     HIGH_DTI_THRESHOLD = 43  # Debt-to-income %
     
+    # (bit, rule, severity, impact, description template)
+    FLAG_RULES = [
+        (FLAG_NO_CREDIT_HISTORY, 'R1: No Credit History', 'HIGH', 40,
+         'Applicant has no credit history'),
+        (FLAG_HIGH_LOAN_TO_INCOME, 'R2: High Loan-to-Income Ratio', 'HIGH', 25,
+         'Loan amount ({loan_amount}) exceeds 3x total income ({total_income})'),
+        (FLAG_MODERATE_LOAN_TO_INCOME, 'R2: Moderate Loan-to-Income Ratio', 'MEDIUM', 15,
+         'Loan amount is 2-3x total income'),
+        (FLAG_VERY_HIGH_DTI, 'R3: Very High DTI Ratio', 'HIGH', 20,
+         'DTI ratio is {dti_ratio:.1f}% (>50% critical threshold)'),
+        (FLAG_HIGH_DTI, 'R3: High DTI Ratio', 'MEDIUM', 10,
+         'DTI ratio is {dti_ratio:.1f}% (>43% threshold)'),
+        (FLAG_LOW_INCOME, 'R4: Low Income', 'MEDIUM', 15,
+         'Total income ({total_income}) below threshold ({low_income_threshold})'),
+        (FLAG_RURAL_PROPERTY, 'R5: Rural Property', 'LOW', 5,
+         'Rural properties have slightly higher risk'),
+        (FLAG_SELF_EMPLOYED, 'R6: Self-Employed', 'LOW', 5,
+         'Self-employed applicants require additional verification'),
+        (FLAG_HIGH_DEPENDENTS, 'R7: High Dependents', 'LOW', 5,
+         '{dependents} dependents may impact repayment capacity'),
+    ]
+    
     @staticmethod
-    def evaluate(data):
+    def evaluate(application, include_flags=True):
         """
         Evaluate loan application against business rules
-        Returns: (risk_level, flags, score)
+        application: LoanApplication (a raw payload dict is parsed first)
+        Returns: dict with risk_level, risk_score, flag_mask, total_flags and
+        recommendation; flag dicts are only built when include_flags (see flags_for)
         """
-        flags = []
-        risk_score = 0  # 0-100 scale
+        application = LoanApplication.coerce(application)
+        flag_mask = 0
         
         # Rule 1: Credit History Check (Most Important)
-        if int(data.get('credit_history', 1)) == 0:
-            flags.append({
-                'rule': 'R1: No Credit History',
-                'severity': 'HIGH',
-                'impact': +40,
-                'description': 'Applicant has no credit history'
-            })
-            risk_score += 40
+        if application.credit_history == 0:
+            flag_mask |= FLAG_NO_CREDIT_HISTORY
         
         # Rule 2: Income vs Loan Amount
-        income = float(data.get('applicant_income', 0))
-        coapplicant_income = float(data.get('coapplicant_income', 0))
-        total_income = income + coapplicant_income
-        loan_amount = float(data.get('loan_amount', 0))
+        total_income = application.total_income
+        loan_amount = application.loan_amount
         
         if loan_amount > total_income * 3:
-            flags.append({
-                'rule': 'R2: High Loan-to-Income Ratio',
-                'severity': 'HIGH',
-                'impact': +25,
-                'description': f'Loan amount ({loan_amount}) exceeds 3x total income ({total_income})'
-            })
-            risk_score += 25
+            flag_mask |= FLAG_HIGH_LOAN_TO_INCOME
         elif loan_amount > total_income * 2:
-            flags.append({
-                'rule': 'R2: Moderate Loan-to-Income Ratio',
-                'severity': 'MEDIUM',
-                'impact': +15,
-                'description': f'Loan amount is 2-3x total income'
-            })
-            risk_score += 15
+            flag_mask |= FLAG_MODERATE_LOAN_TO_INCOME
         
         # Rule 3: Debt-to-Income Ratio
-        loan_term = float(data.get('loan_amount_term', 360))
-        monthly_payment = (loan_amount * 1000) / loan_term  # Convert to monthly
-        monthly_income = total_income / 12
+        dti_ratio = application.dti_ratio
         
-        if monthly_income > 0:
-            dti_ratio = (monthly_payment / monthly_income) * 100
-            
+        if dti_ratio is not None:
             if dti_ratio > 50:
-                flags.append({
-                    'rule': 'R3: Very High DTI Ratio',
-                    'severity': 'HIGH',
-                    'impact': +20,
-                    'description': f'DTI ratio is {dti_ratio:.1f}% (>50% critical threshold)'
-                })
-                risk_score += 20
+                flag_mask |= FLAG_VERY_HIGH_DTI
             elif dti_ratio > 43:
-                flags.append({
-                    'rule': 'R3: High DTI Ratio',
-                    'severity': 'MEDIUM',
-                    'impact': +10,
-                    'description': f'DTI ratio is {dti_ratio:.1f}% (>43% threshold)'
-                })
-                risk_score += 10
+                flag_mask |= FLAG_HIGH_DTI
         
         # Rule 4: Low Income Check
         if total_income < RiskRuleEngine.LOW_INCOME_THRESHOLD:
-            flags.append({
-                'rule': 'R4: Low Income',
-                'severity': 'MEDIUM',
-                'impact': +15,
-                'description': f'Total income ({total_income}) below threshold ({RiskRuleEngine.LOW_INCOME_THRESHOLD})'
-            })
-            risk_score += 15
+            flag_mask |= FLAG_LOW_INCOME
         
         # Rule 5: Property Area Risk
-        property_area = data.get('property_area', 'Urban')
-        if property_area == 'Rural':
-            flags.append({
-                'rule': 'R5: Rural Property',
-                'severity': 'LOW',
-                'impact': +5,
-                'description': 'Rural properties have slightly higher risk'
-            })
-            risk_score += 5
+        if application.property_area == 'Rural':
+            flag_mask |= FLAG_RURAL_PROPERTY
         
         # Rule 6: Self-Employed Risk
-        if int(data.get('self_employed', 0)) == 1:
-            flags.append({
-                'rule': 'R6: Self-Employed',
-                'severity': 'LOW',
-                'impact': +5,
-                'description': 'Self-employed applicants require additional verification'
-            })
-            risk_score += 5
+        if application.self_employed == 1:
+            flag_mask |= FLAG_SELF_EMPLOYED
         
         # Rule 7: Dependents Risk
-        dependents = int(data.get('dependents', 0))
+        dependents = application.dependents
         if dependents > 3:
-            flags.append({
-                'rule': 'R7: High Dependents',
-                'severity': 'LOW',
-                'impact': +5,
-                'description': f'{dependents} dependents may impact repayment capacity'
-            })
-            risk_score += 5
+            flag_mask |= FLAG_HIGH_DEPENDENTS
+        
+        risk_score = sum(impact for bit, _, _, impact, _ in RiskRuleEngine.FLAG_RULES if flag_mask & bit)  # 0-100 scale
         
         # Determine overall risk level
         if risk_score >= 50:
@@ -127,13 +112,149 @@ class RiskRuleEngine:
         else:
             risk_level = 'LOW'
         
-        return {
+        result = {
             'risk_level': risk_level,
             'risk_score': min(risk_score, 100),  # Cap at 100
-            'flags': flags,
-            'total_flags': len(flags),
+            'flag_mask': flag_mask,
+            'total_flags': bin(flag_mask).count('1'),
             'recommendation': RiskRuleEngine._get_recommendation(risk_level, risk_score)
         }
+        if include_flags:
+            result['flags'] = RiskRuleEngine.flags_from_mask(
+                flag_mask, loan_amount, total_income, dti_ratio, dependents
+            )
+        return result
+    
+    @staticmethod
+    def flags_for(application, flag_mask):
+        """Flag dicts of a flag mask, with descriptions filled from the application"""
+        if not flag_mask:
+            return []
+        application = LoanApplication.coerce(application)
+        return RiskRuleEngine.flags_from_mask(
+            flag_mask,
+            application.loan_amount,
+            application.total_income,
+            application.dti_ratio,
+            application.dependents
+        )
+    
+    @staticmethod
+    def flags_from_mask(flag_mask, loan_amount, total_income, dti_ratio, dependents):
+        """Expand a flag mask into the flag dicts returned by evaluate"""
+        values = {
+            'loan_amount': loan_amount,
+            'total_income': total_income,
+            'dti_ratio': dti_ratio,
+            'dependents': dependents,
+            'low_income_threshold': RiskRuleEngine.LOW_INCOME_THRESHOLD
+        }
+        
+        flags = []
+        for bit, rule, severity, impact, description in RiskRuleEngine.FLAG_RULES:
+            if flag_mask & bit:
+                flags.append({
+                    'rule': rule,
+                    'severity': severity,
+                    'impact': +impact,
+                    'description': description.format(**values)
+                })
+        
+        return flags
+    
+    @staticmethod
+    def evaluate_batch(columns, include_flags=False):
+        """
+        Evaluate many applications at once against the same rules as evaluate
+        columns: DataFrame or dict of arrays keyed by the API field names
+        Returns a dict of arrays (risk_score, risk_level, recommendation,
+        flag_mask, total_flags); flag dicts are only built when include_flags
+        """
+        n = len(columns['applicant_income'])
+        
+        def column(name, default):
+            if name in columns:
+                return np.asarray(columns[name])
+            return np.full(n, default)
+        
+        # Same conversions as the scalar path: float() for amounts, int() for codes
+        credit_history = column('credit_history', 1).astype(np.float64).astype(np.int64)
+        income = column('applicant_income', 0).astype(np.float64)
+        coapplicant_income = column('coapplicant_income', 0).astype(np.float64)
+        loan_amount = column('loan_amount', 0).astype(np.float64)
+        loan_term = column('loan_amount_term', 360).astype(np.float64)
+        property_area = column('property_area', 'Urban')
+        self_employed = column('self_employed', 0).astype(np.float64).astype(np.int64)
+        dependents = column('dependents', 0).astype(np.float64).astype(np.int64)
+        
+        total_income = income + coapplicant_income
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # A zero (or negative) term has no monthly payment, as in LoanApplication
+            monthly_payment = np.where(loan_term > 0, (loan_amount * 1000) / loan_term, 0.0)
+            monthly_income = total_income / 12
+            dti_ratio = (monthly_payment / monthly_income) * 100
+        has_dti = monthly_income > 0
+        
+        high_lti = loan_amount > total_income * 3
+        moderate_lti = ~high_lti & (loan_amount > total_income * 2)
+        very_high_dti = has_dti & (dti_ratio > 50)
+        high_dti = has_dti & ~very_high_dti & (dti_ratio > 43)
+        
+        # Rule masks R1-R7, in FLAG_RULES order
+        masks = [
+            credit_history == 0,
+            high_lti,
+            moderate_lti,
+            very_high_dti,
+            high_dti,
+            total_income < RiskRuleEngine.LOW_INCOME_THRESHOLD,
+            property_area == 'Rural',
+            self_employed == 1,
+            dependents > 3,
+        ]
+        
+        flag_mask = np.zeros(n, dtype=np.uint16)
+        raw_score = np.zeros(n, dtype=np.int64)
+        total_flags = np.zeros(n, dtype=np.int64)
+        for mask, (bit, _, _, impact, _) in zip(masks, RiskRuleEngine.FLAG_RULES):
+            flag_mask |= np.where(mask, bit, 0).astype(np.uint16)
+            raw_score += mask * impact
+            total_flags += mask
+        
+        # Levels and recommendations use the uncapped score, like evaluate
+        risk_level = np.select(
+            [raw_score >= 50, raw_score >= 25],
+            ['HIGH', 'MEDIUM'],
+            default='LOW'
+        ).astype(object)
+        recommendation = np.select(
+            [(risk_level == 'HIGH') & (raw_score > 65), risk_level == 'HIGH', risk_level == 'MEDIUM'],
+            ['REJECT', 'MANUAL_REVIEW', 'MANUAL_REVIEW'],
+            default='PROCEED_TO_ML'
+        ).astype(object)
+        
+        result = {
+            'risk_level': risk_level,
+            'risk_score': np.minimum(raw_score, 100),  # Cap at 100
+            'flag_mask': flag_mask,
+            'total_flags': total_flags,
+            'recommendation': recommendation
+        }
+        
+        if include_flags:
+            result['flags'] = [
+                RiskRuleEngine.flags_from_mask(
+                    int(flag_mask[i]),
+                    float(loan_amount[i]),
+                    float(total_income[i]),
+                    float(dti_ratio[i]) if has_dti[i] else None,
+                    int(dependents[i])
+                ) if flag_mask[i] else []
+                for i in range(n)
+            ]
+        
+        return result
     
     @staticmethod
     def _get_recommendation(risk_level, risk_score):
@@ -196,5 +317,40 @@ def test_risk_engine():
         print(f"  [{flag['severity']}] {flag['rule']}: {flag['description']}")
 
 
+def test_evaluate_batch_equivalence(n_samples=20000, seed=7):
+    """Randomized check that evaluate_batch matches evaluate row by row"""
+    rng = np.random.default_rng(seed)
+    
+    columns = {
+        'applicant_income': rng.choice([0, 500, 1000, 2499, 2500, 3000, 8000, 15000], n_samples)
+                            + rng.integers(0, 3000, n_samples) * rng.integers(0, 2, n_samples),
+        'coapplicant_income': rng.choice([0, 0, 1500, 2000, 8000], n_samples).astype(float),
+        'loan_amount': rng.uniform(1, 600, n_samples).round(1),
+        'loan_amount_term': rng.choice([0, 12, 60, 180, 240, 360, 480], n_samples),
+        'credit_history': rng.choice([0, 1], n_samples),
+        'property_area': rng.choice(['Urban', 'Semiurban', 'Rural'], n_samples),
+        'self_employed': rng.choice([0, 1], n_samples),
+        'dependents': rng.integers(0, 7, n_samples)
+    }
+    
+    batch = RiskRuleEngine.evaluate_batch(columns, include_flags=True)
+    
+    for i in range(n_samples):
+        row = {name: values[i].item() for name, values in columns.items()}
+        expected = RiskRuleEngine.evaluate(row)
+        
+        assert batch['risk_score'][i] == expected['risk_score'], (row, expected)
+        assert batch['risk_level'][i] == expected['risk_level'], (row, expected)
+        assert batch['recommendation'][i] == expected['recommendation'], (row, expected)
+        assert batch['total_flags'][i] == expected['total_flags'], (row, expected)
+        assert batch['flags'][i] == expected['flags'], (row, expected)
+        assert batch['flag_mask'][i] == expected['flag_mask'], (row, expected)
+        assert RiskRuleEngine.flags_for(row, expected['flag_mask']) == expected['flags'], (row, expected)
+    
+    print(f"✅ evaluate_batch matches evaluate on {n_samples} random applications")
+
+
 if __name__ == "__main__":
     test_risk_engine()
+    print("\n" + "="*50 + "\n")
+    test_evaluate_batch_equivalence()
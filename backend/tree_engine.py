@@ -0,0 +1,378 @@
+"""
+Compiled Tree Ensemble
+Flat-array inference engine for the trained Random Forest
+"""
+
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+
+class CompiledForest:
+    """
+    Random Forest flattened into contiguous NumPy arrays
+
+    Every node of every tree lives in one set of arrays (feature, threshold,
+    left, right, value). Leaves point back to themselves, so all trees are
+    walked together for a fixed number of steps with no per-node branching.
+    """
+
+    # Rows walked together; bounds the (n_trees x rows) scratch arrays
+    CHUNK_SIZE = 4096
+
+    # Rows per chunk for contributions; scratch is (n_trees x rows x n_features)
+    CONTRIBUTION_CHUNK_SIZE = 512
+
+    # .forest file signature; arrays start on page boundaries
+    MAGIC = b'CFOREST1'
+    PAGE_SIZE = 4096
+
+    # Class whose path contribution table is stored in the .forest file (approval)
+    STORED_CONTRIBUTION_CLASS = 1
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth,
+                 feature_names=None, classes=None, source_digest='', contribution_tables=None):
+        """
+        children: interleaved [right, left] per node, so the next node is
+        children[2 * node + went_left]
+        contribution_tables: {class index: table} already built (see _path_contributions)
+
+        Arrays already in the right dtype (e.g. read-only views of a mapped
+        file) are used as-is, without a copy.
+        """
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.children = np.ascontiguousarray(children, dtype=np.intp)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        self.classes = np.asarray(classes) if classes is not None else np.arange(self.value.shape[1])
+        self.source_digest = source_digest  # sha256 of the pickle this was compiled from
+
+        # Per-node path contributions by class index, loaded or built on first use
+        self._contribution_tables = dict(contribution_tables or {})
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def left(self):
+        return self.children[1::2]
+
+    @property
+    def right(self):
+        return self.children[0::2]
+
+    @property
+    def n_features(self):
+        return len(self.feature_names) if self.feature_names is not None else int(self.feature.max()) + 1
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Compile a fitted RandomForestClassifier"""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(n_nodes)
+
+            # Leaves loop back to themselves and test feature 0 against +inf
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+            # Per-node class distribution, normalized like DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            np.concatenate(features),
+            np.concatenate(thresholds),
+            np.column_stack([np.concatenate(rights), np.concatenate(lefts)]).ravel(),
+            np.concatenate(values),
+            np.array(roots),
+            max_depth,
+            feature_names=getattr(model, 'feature_names_in_', None),
+            classes=model.classes_
+        )
+
+    def save(self, path):
+        """
+        Write the forest as a single .forest file
+
+        Layout: magic, header length, JSON header, then every array as raw
+        little-endian bytes starting on its own page. The path contribution
+        table is stored too, so workers map it instead of each building a
+        private copy. The file is written next to the target and renamed into
+        place, so workers that still map the previous version keep a
+        consistent view.
+        """
+        arrays = {
+            'feature': self.feature.astype('<i8'),
+            'threshold': self.threshold.astype('<f8'),
+            'children': self.children.astype('<i8'),
+            'value': self.value.astype('<f8'),
+            'roots': self.roots.astype('<i8')
+        }
+        if self.value.shape[1] > self.STORED_CONTRIBUTION_CLASS:
+            arrays['path_contributions'] = self._path_contributions(self.STORED_CONTRIBUTION_CLASS).astype('<f8')
+
+        header = {
+            'max_depth': self.max_depth,
+            'contribution_class': self.STORED_CONTRIBUTION_CLASS,
+            'feature_names': self.feature_names,
+            'classes': self.classes.tolist(),
+            'source_digest': self.source_digest,
+            'arrays': {}
+        }
+
+        # Offsets depend on the header size; leave room for their digits
+        for name, array in arrays.items():
+            header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': 0}
+        header_size = len(self.MAGIC) + 8 + len(json.dumps(header)) + 64 * len(arrays)
+        offset = _align(header_size)
+        for name, array in arrays.items():
+            header['arrays'][name]['offset'] = offset
+            offset = _align(offset + array.nbytes)
+
+        header_bytes = json.dumps(header).encode()
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(struct.pack('<Q', len(header_bytes)))
+            f.write(header_bytes)
+            for name, array in arrays.items():
+                f.seek(header['arrays'][name]['offset'])
+                f.write(array.tobytes())
+            f.truncate(offset)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """
+        Load a .forest file
+
+        mmap_mode='r' maps the arrays read-only straight from the file, so
+        every process that loads the same file shares one copy of the pages.
+        mmap_mode=None reads them into private memory instead.
+        """
+        with open(path, 'rb') as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"{path} is not a compiled forest file")
+            header = json.loads(f.read(struct.unpack('<Q', f.read(8))[0]))
+
+            if mmap_mode is None:
+                f.seek(0)
+                buffer = bytearray(f.read())
+            elif mmap_mode == 'r':
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                raise ValueError(f"Unsupported mmap_mode: {mmap_mode}")
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape']))
+            arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=spec['offset']).reshape(spec['shape'])
+
+        return cls(
+            arrays['feature'],
+            arrays['threshold'],
+            arrays['children'],
+            arrays['value'],
+            arrays['roots'],
+            header['max_depth'],
+            feature_names=header['feature_names'],
+            classes=header['classes'],
+            source_digest=header['source_digest'],
+            # Files written before the table was stored build it on first use
+            contribution_tables={header['contribution_class']: arrays['path_contributions']}
+            if 'path_contributions' in arrays else None
+        )
+
+    def apply(self, X):
+        """Return the leaf index reached in every tree, shape (n_trees, n_rows)"""
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        offsets = np.arange(n_rows, dtype=np.intp) * n_features
+
+        nodes = np.repeat(self.roots[:, None], n_rows, axis=1)
+        for _ in range(self.max_depth):
+            went_left = np.take(flat, np.take(self.feature, nodes) + offsets) <= np.take(self.threshold, nodes)
+            nodes = np.take(self.children, 2 * nodes + went_left)
+
+        return nodes
+
+    def predict_proba(self, X):
+        """Class probabilities averaged over all trees, same as RandomForestClassifier.predict_proba"""
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        n_rows = X.shape[0]
+        proba = np.empty((n_rows, self.value.shape[1]), dtype=np.float64)
+
+        for start in range(0, n_rows, self.CHUNK_SIZE):
+            stop = min(start + self.CHUNK_SIZE, n_rows)
+            leaves = self.apply(X[start:stop])
+            proba[start:stop] = np.take(self.value, leaves, axis=0).sum(axis=0) / self.n_trees
+
+        return proba
+
+    def predict(self, X):
+        """Most likely class for every row"""
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+    def contributions(self, X, class_index=1):
+        """
+        Per-prediction feature contributions (Saabas decision-path attribution)
+
+        Every split on the way from a tree's root to the reached leaf moves
+        the class value by (child value - parent value); that change is
+        credited to the split's feature and averaged over trees.
+
+        Returns (proba, bias, contributions): proba is exactly predict_proba(X),
+        bias the forest's base value for class_index, and contributions an
+        (n_rows, n_features) array with bias + contributions.sum(axis=1) equal
+        to proba[:, class_index] up to rounding
+        """
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        table = self._path_contributions(class_index)
+        n_rows = X.shape[0]
+        proba = np.empty((n_rows, self.value.shape[1]), dtype=np.float64)
+        contributions = np.empty((n_rows, table.shape[1]), dtype=np.float64)
+
+        for start in range(0, n_rows, self.CONTRIBUTION_CHUNK_SIZE):
+            stop = min(start + self.CONTRIBUTION_CHUNK_SIZE, n_rows)
+            leaves = self.apply(X[start:stop])
+            proba[start:stop] = np.take(self.value, leaves, axis=0).sum(axis=0) / self.n_trees
+            contributions[start:stop] = np.take(table, leaves, axis=0).sum(axis=0) / self.n_trees
+
+        bias = float(np.take(self.value[:, class_index], self.roots).sum() / self.n_trees)
+        return proba, bias, contributions
+
+    def _path_contributions(self, class_index):
+        """
+        (n_nodes, n_features) table: summed value changes, by split feature,
+        along the path from the root to each node. Built top-down, one level
+        of all trees at a time.
+        """
+        table = self._contribution_tables.get(class_index)
+        if table is not None:
+            return table
+
+        value = self.value[:, class_index]
+        left, right = self.left, self.right
+        table = np.zeros((len(self.feature), self.n_features), dtype=np.float64)
+
+        frontier = self.roots
+        while len(frontier):
+            internal = frontier[left[frontier] != frontier]  # leaves loop back to themselves
+            split_feature = self.feature[internal]
+            for children in (left[internal], right[internal]):
+                table[children] = table[internal]
+                table[children, split_feature] += value[children] - value[internal]
+            frontier = np.concatenate([left[internal], right[internal]])
+
+        self._contribution_tables[class_index] = table
+        return table
+
+
+def test_compiled_forest(model_path='models/loan_model.pkl', n_samples=5000):
+    """Check the compiled forest against sklearn on random inputs"""
+    import joblib
+
+    model = joblib.load(model_path)
+    forest = CompiledForest.from_sklearn(model)
+
+    rng = np.random.default_rng(0)
+    applicant_income = rng.integers(0, 20000, n_samples).astype(np.float64)
+    coapplicant_income = rng.integers(0, 8000, n_samples).astype(np.float64)
+    loan_amount = rng.integers(10, 600, n_samples).astype(np.float64)
+    loan_term = rng.choice([180, 240, 360, 480], n_samples).astype(np.float64)
+    total_income = applicant_income + coapplicant_income
+    X = np.column_stack([
+        applicant_income,
+        coapplicant_income,
+        loan_amount,
+        loan_term,
+        rng.choice([0, 1], n_samples),
+        rng.choice([0, 1], n_samples),
+        rng.integers(0, 4, n_samples),
+        total_income,
+        loan_amount / np.maximum(total_income, 1),
+        (loan_amount * 1000 / loan_term) / np.maximum(total_income / 12, 1) * 100,
+        rng.choice([0, 1, 2], n_samples)
+    ]).astype(np.float64)
+
+    expected = model.predict_proba(X if forest.feature_names is None else _as_frame(X, forest.feature_names))
+    actual = forest.predict_proba(X)
+    max_error = np.abs(expected - actual).max()
+
+    assert max_error < 1e-9, max_error
+    assert np.abs(forest.predict_proba(X[0]) - expected[0]).max() < 1e-9
+    print(f"✅ Compiled forest matches sklearn on {n_samples} rows (max abs error {max_error:.2e})")
+
+    # Round trip through the .forest file, mapped and private
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.forest')
+        forest.save(path)
+        for mmap_mode in ('r', None):
+            loaded = CompiledForest.load(path, mmap_mode=mmap_mode)
+            assert np.array_equal(loaded.predict_proba(X), actual)
+            assert loaded.feature_names == forest.feature_names
+            assert loaded.threshold.flags.writeable == (mmap_mode is None)
+            # The contribution table is read from the file, not rebuilt
+            stored = loaded._contribution_tables[CompiledForest.STORED_CONTRIBUTION_CLASS]
+            assert stored.flags.writeable == (mmap_mode is None)
+            assert np.array_equal(loaded.contributions(X)[2], forest.contributions(X)[2])
+            del loaded
+    print("✅ .forest file round trip (mmap and private) matches")
+
+    # Path contributions add up to the predicted probability
+    proba, bias, contributions = forest.contributions(X)
+    assert np.array_equal(proba, actual)
+    additivity_error = np.abs(bias + contributions.sum(axis=1) - proba[:, 1]).max()
+    assert additivity_error < 1e-9, additivity_error
+    print(f"✅ Contributions sum to predict_proba (max abs error {additivity_error:.2e})")
+
+
+def _align(offset):
+    """Round offset up to the next page boundary"""
+    page = CompiledForest.PAGE_SIZE
+    return (offset + page - 1) // page * page
+
+
+def _as_frame(X, columns):
+    """Wrap an array in a DataFrame so sklearn sees the fitted feature names"""
+    import pandas as pd
+    return pd.DataFrame(X, columns=columns)
+
+
+if __name__ == "__main__":
+    test_compiled_forest()
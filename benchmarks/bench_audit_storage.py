@@ -0,0 +1,117 @@
+"""
+Benchmark: Audit Storage per Million Decisions
+Database size with validation and rule outcomes stored as JSON text (the old
+format) against integer codes and bitmasks
+
+Usage: python benchmarks/bench_audit_storage.py [--rows 50000]
+
+Both databases hold the same decisions, scored by BatchScorer; text rows are
+rendered from the codes with pipeline.audit_messages, as the API reports them.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import warnings
+
+from common import MODELS_DIR, synthetic_applications
+
+from audit_logger import AuditLogger
+from model_store import ModelStore
+from pipeline import BatchScorer, audit_messages
+
+CODED_COLUMNS = ['validation_error_bits', 'validation_warning_bits', 'rule_flag_mask']
+TEXT_COLUMNS = ['validation_errors', 'validation_warnings', 'rule_flags']
+
+
+def as_text_record(record):
+    """The same audit record with text in place of codes"""
+    validation = record['validation_result']
+    rule = record.get('rule_result')
+    text = audit_messages(
+        record['applicant_data'],
+        validation['error_bits'],
+        validation['warning_bits'],
+        rule['flag_mask'] if rule else 0
+    )
+
+    legacy = dict(record)
+    legacy['validation_result'] = {
+        'is_valid': validation['is_valid'],
+        'errors': text['errors'],
+        'warnings': text['warnings']
+    }
+    if rule:
+        legacy['rule_result'] = {
+            'risk_level': rule['risk_level'],
+            'risk_score': rule['risk_score'],
+            'flags': text['rule_flags']
+        }
+    return legacy
+
+
+def database_bytes(path, columns):
+    """(file size after a checkpoint, summed stored bytes of columns)"""
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    page_count, = conn.execute('PRAGMA page_count').fetchone()
+    page_size, = conn.execute('PRAGMA page_size').fetchone()
+    stored = sum(
+        conn.execute(f'SELECT COALESCE(SUM(LENGTH({column})), 0) FROM audit_log').fetchone()[0]
+        for column in columns
+    )
+    conn.close()
+    return page_count * page_size, stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    with contextlib.redirect_stdout(io.StringIO()):
+        models = ModelStore(MODELS_DIR)
+        models.load(warm_up=False)
+    scorer = BatchScorer(models.forest, models.explainer, models.features)
+
+    applications = synthetic_applications(args.rows, seed=17)
+    for i, application in enumerate(applications[::25]):
+        application['applicant_income'] = 'n/a' if i % 2 else 400  # some invalid / warned rows
+    _, records = scorer.score(applications, detail='decision')
+    metadata = {'user_agent': 'bench', 'ip_address': '127.0.0.1'}
+    for record in records:
+        record['metadata'] = metadata
+
+    with tempfile.TemporaryDirectory(prefix='audit-storage-') as workdir:
+        results = {}
+        for label, rows, columns in (
+            ('JSON text', [as_text_record(record) for record in records], TEXT_COLUMNS),
+            ('codes + bitmasks', records, CODED_COLUMNS),
+        ):
+            path = os.path.join(workdir, f"{label.split()[0].lower()}.db")
+            logger = AuditLogger(path)
+            for start in range(0, len(rows), 5000):
+                logger.log_decisions(rows[start:start + 5000])
+            logger.close()
+            results[label] = database_bytes(path, columns)
+
+        scale = 1_000_000 / len(records)
+        print(f"{len(records):,} audit rows, extrapolated to 1M rows\n")
+        print(f"{'storage':<18} {'DB per 1M rows':>15} {'outcome columns per 1M':>24} {'bytes/row':>10}")
+        print("-" * 71)
+        for label, (db_bytes, column_bytes) in results.items():
+            print(f"{label:<18} {db_bytes * scale / 1e6:>12,.1f} MB {column_bytes * scale / 1e6:>21,.1f} MB "
+                  f"{db_bytes / len(records):>10,.0f}")
+
+        (text_db, text_columns), (coded_db, coded_columns) = results.values()
+        print(f"\nSaved per 1M rows: {(text_db - coded_db) * scale / 1e6:,.1f} MB "
+              f"({1 - coded_db / text_db:.0%} of the database, "
+              f"{1 - coded_columns / text_columns:.0%} of the outcome columns)")
+
+
+if __name__ == "__main__":
+    main()
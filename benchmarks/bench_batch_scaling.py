@@ -0,0 +1,60 @@
+"""
+Benchmark: Parallel Bulk Scoring
+Rows/s of backend/batch_score.py on a synthetic CSV loan book for 1..N worker processes
+
+Usage: python benchmarks/bench_batch_scaling.py [--rows 200000] [--workers 1 2 4 8]
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import os
+import tempfile
+import warnings
+
+from common import synthetic_applications
+
+from batch_score import score_file
+
+
+def write_book(path, n_rows):
+    """Write n_rows synthetic applications as CSV"""
+    applications = synthetic_applications(n_rows, seed=11)
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['application_id'] + list(applications[0]))
+        writer.writeheader()
+        for i, application in enumerate(applications):
+            writer.writerow(dict(application, application_id=f"LN-{i:08d}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+
+    with tempfile.TemporaryDirectory(prefix='batch-scaling-') as workdir:
+        book = os.path.join(workdir, 'book.csv')
+        write_book(book, args.rows)
+
+        print(f"{args.rows:,} rows, chunks of {args.chunk_size:,}, {os.cpu_count()} CPUs available\n")
+        print(f"{'workers':>7} {'rows/s':>12} {'speedup':>9} {'efficiency':>11}")
+        print("-" * 42)
+
+        baseline = None
+        for workers in args.workers:
+            output = os.path.join(workdir, f"decisions_{workers}.csv")
+            with contextlib.redirect_stdout(io.StringIO()):
+                summary = score_file(book, output, args.chunk_size, workers=workers, progress_every=0)
+
+            baseline = baseline or summary['rows_per_s']
+            speedup = summary['rows_per_s'] / baseline
+            print(f"{workers:>7} {summary['rows_per_s']:>12,.0f} {speedup:>8.2f}x {speedup / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: Per-Prediction Feature Contributions
+Saabas path attribution of CompiledForest.contributions against a per-tree
+sklearn decision_path reference, single-row latency and batch throughput
+
+Usage: python benchmarks/bench_contributions.py [--rows 2000] [--batch 100000]
+"""
+
+import argparse
+import os
+import time
+import warnings
+
+import numpy as np
+
+from common import MODELS_DIR, synthetic_applications, time_calls, latency_summary, print_summary
+
+import joblib
+from pipeline import prepare_features_batch
+from tree_engine import CompiledForest
+
+
+def reference_contributions(model, X, class_index=1):
+    """Textbook Saabas decomposition: walk each tree's decision_path in Python"""
+    contributions = np.zeros((X.shape[0], X.shape[1]))
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :] / tree.value[:, 0, :].sum(axis=1, keepdims=True)
+        paths = estimator.decision_path(X)
+        for i in range(X.shape[0]):
+            nodes = paths.indices[paths.indptr[i]:paths.indptr[i + 1]]
+            for parent, child in zip(nodes[:-1], nodes[1:]):
+                contributions[i, tree.feature[parent]] += value[child, class_index] - value[parent, class_index]
+    return contributions / len(model.estimators_)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000, help='single-row calls to time')
+    parser.add_argument('--batch', type=int, default=100000, help='rows for the throughput run')
+    parser.add_argument('--check', type=int, default=200, help='rows checked against the reference')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    model = joblib.load(os.path.join(MODELS_DIR, 'loan_model.pkl'))
+    forest = CompiledForest.from_sklearn(model)
+
+    matrix = prepare_features_batch(synthetic_applications(args.rows, seed=5)).to_numpy()
+
+    # Correctness before timing anything
+    sample = matrix[:args.check]
+    proba, bias, contributions = forest.contributions(sample)
+    reference = reference_contributions(model, sample)
+    print(f"Max abs difference vs decision_path reference: {np.abs(contributions - reference).max():.2e}")
+    print(f"Max additivity error (bias + sum - proba):     "
+          f"{np.abs(bias + contributions.sum(axis=1) - proba[:, 1]).max():.2e}")
+
+    print("\nSingle-row latency")
+    print("-" * 70)
+    rows = [(matrix[i],) for i in range(args.rows)]
+    proba_summary = latency_summary(time_calls(forest.predict_proba, rows))
+    contribution_summary = latency_summary(time_calls(forest.contributions, rows))
+    reference_summary = latency_summary(time_calls(
+        lambda row: reference_contributions(model, row.reshape(1, -1)), rows[:200], warmup=5
+    ))
+    print_summary('predict_proba only', proba_summary)
+    print_summary('contributions (+ proba)', contribution_summary)
+    print_summary('decision_path reference', reference_summary)
+    print(f"Attribution overhead (p50): {contribution_summary['p50_us'] - proba_summary['p50_us']:.1f}µs")
+
+    print(f"\nBatch throughput ({args.batch:,} rows)")
+    print("-" * 70)
+    batch = prepare_features_batch(synthetic_applications(args.batch, seed=6)).to_numpy()
+    for label, fn in (('predict_proba only', forest.predict_proba), ('contributions (+ proba)', forest.contributions)):
+        start = time.perf_counter()
+        fn(batch)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<28} {args.batch / elapsed:>12,.0f} rows/s   {elapsed / args.batch * 1e6:>6.2f}µs/row")
+
+
+if __name__ == "__main__":
+    main()
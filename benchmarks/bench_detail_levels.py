@@ -0,0 +1,70 @@
+"""
+Benchmark: Response Detail Levels
+/api/assess-loan latency and response size for ?detail=decision, summary and full
+
+Usage: python benchmarks/bench_detail_levels.py [--requests 2000]
+
+Runs the Flask app in-process (test client) with the result cache disabled
+and the audit database in a temp directory, so every request does the work.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+from common import synthetic_applications, latency_summary, print_summary
+
+LEVELS = ['decision', 'summary', 'full']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000, help='requests per detail level')
+    parser.add_argument('--audit-mode', choices=['sync', 'async'], default='async')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+
+    with tempfile.TemporaryDirectory(prefix='detail-levels-') as workdir:
+        os.environ['RESULT_CACHE_SIZE'] = '0'
+        os.environ['AUDIT_DB_PATH'] = os.path.join(workdir, 'audit.db')
+        os.environ['AUDIT_WRITE_MODE'] = args.audit_mode
+
+        import app as service
+        client = service.app.test_client()
+
+        applications = synthetic_applications(args.requests, seed=21)
+        for application in applications[:50]:
+            client.post('/api/assess-loan', json=application)
+
+        print(f"{args.requests:,} requests per level, audit writes {args.audit_mode}\n")
+        results = {}
+        for level in LEVELS:
+            samples = np.empty(len(applications))
+            sizes = np.empty(len(applications))
+            for i, application in enumerate(applications):
+                start = time.perf_counter()
+                response = client.post(f'/api/assess-loan?detail={level}', json=application)
+                samples[i] = (time.perf_counter() - start) * 1e6
+                sizes[i] = len(response.data)
+            results[level] = (latency_summary(samples), sizes.mean())
+
+        print("-" * 70)
+        for level in LEVELS:
+            print_summary(level, results[level][0])
+
+        full_p50 = results['full'][0]['p50_us']
+        print(f"\n{'level':<10} {'mean bytes':>11} {'p50 saved vs full':>19}")
+        for level in LEVELS:
+            summary, size = results[level]
+            print(f"{level:<10} {size:>11,.0f} {full_p50 - summary['p50_us']:>17.1f}µs")
+
+        service.audit_logger.close()
+
+
+if __name__ == "__main__":
+    main()
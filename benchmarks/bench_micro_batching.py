@@ -0,0 +1,110 @@
+"""
+Benchmark: Micro-Batching the ML Stage
+Single-row forest calls from concurrent threads, direct against a MicroBatcher
+at several max waits: throughput, latency and rows per forest call
+
+Usage: python benchmarks/bench_micro_batching.py [--threads 1,8,32] [--max-wait-ms 0,1,2,5]
+                                                 [--calls 300] [--max-batch 64] [--contributions]
+
+Every thread makes --calls back-to-back calls, the way a threaded server
+handles one request per thread. --contributions batches the full-detail
+call (probability plus feature contributions) instead of predict_proba.
+"""
+
+import argparse
+import contextlib
+import io
+import threading
+import time
+import warnings
+
+import numpy as np
+
+from common import MODELS_DIR, synthetic_applications, latency_summary
+
+from data_validator import LoanDataValidator
+from micro_batcher import MicroBatcher
+from model_store import ModelStore
+
+
+def run_clients(call, rows, n_threads, calls):
+    """(rows/s, latency summary) for n_threads each calling call(row) calls times"""
+    samples = np.empty((n_threads, calls))
+    barrier = threading.Barrier(n_threads + 1)
+
+    def client(t):
+        barrier.wait()
+        for i in range(calls):
+            row = rows[(t * calls + i) % len(rows)]
+            start = time.perf_counter()
+            call(row)
+            samples[t, i] = (time.perf_counter() - start) * 1e6
+
+    threads = [threading.Thread(target=client, args=(t,)) for t in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return n_threads * calls / elapsed, latency_summary(samples.ravel())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', default='1,8,32', help='comma-separated client thread counts')
+    parser.add_argument('--max-wait-ms', default='0,1,2,5', help='comma-separated batcher max waits')
+    parser.add_argument('--calls', type=int, default=300, help='calls per thread')
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--contributions', action='store_true', help='batch the full-detail call')
+    args = parser.parse_args()
+
+    thread_counts = [int(n) for n in args.threads.split(',')]
+    max_waits = [float(ms) for ms in args.max_wait_ms.split(',')]
+
+    warnings.filterwarnings('ignore')
+    with contextlib.redirect_stdout(io.StringIO()):
+        models = ModelStore(MODELS_DIR)
+        models.load()
+    forest = models.forest
+
+    applications = [LoanDataValidator.parse(a)[0] for a in synthetic_applications(2000, seed=5)]
+    matrix = models.features.matrix(applications)
+    rows = [matrix[i:i + 1] for i in range(len(matrix))]
+
+    if args.contributions:
+        def predict(X):
+            proba, _, contributions = forest.contributions(X)
+            return list(zip(proba[:, 1], contributions))
+    else:
+        def predict(X):
+            return forest.predict_proba(X)[:, 1]
+
+    def direct(row):
+        return predict(row)[0]
+
+    stage = 'contributions' if args.contributions else 'predict_proba'
+    print(f"{stage}, {args.calls} calls per thread, max batch {args.max_batch}")
+
+    for n_threads in thread_counts:
+        print(f"\n{n_threads} thread(s)")
+        print(f"{'mode':<16} {'rows/s':>9} {'p50':>10} {'p95':>10} {'p99':>10} {'rows/call':>10}")
+        print("-" * 70)
+
+        throughput, summary = run_clients(direct, rows, n_threads, args.calls)
+        print(f"{'direct':<16} {throughput:>9,.0f} {summary['p50_us']:>8.0f}µs "
+              f"{summary['p95_us']:>8.0f}µs {summary['p99_us']:>8.0f}µs {1:>10.1f}")
+
+        for max_wait in max_waits:
+            batcher = MicroBatcher(predict, max_batch=args.max_batch, max_wait_ms=max_wait)
+            throughput, summary = run_clients(batcher, rows, n_threads, args.calls)
+            batcher.close()
+            stats = batcher.stats()
+            print(f"{f'batched {max_wait:g}ms':<16} {throughput:>9,.0f} {summary['p50_us']:>8.0f}µs "
+                  f"{summary['p95_us']:>8.0f}µs {summary['p99_us']:>8.0f}µs {stats['mean_batch_size']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark: Flask vs ASGI Serving Modes
+Load test of POST /api/assess-loan against app.py (Flask's threaded server)
+and asgi_app.py at increasing numbers of concurrent client connections
+
+Usage: python benchmarks/bench_serving_modes.py [--connections 1,16,64,256] [--duration 5]
+                                                [--modes flask,asgi] [--detail summary]
+                                                [--audit-mode sync]
+
+Each server runs as its own process on a free local port, with the result
+cache off and the audit database in a temp directory. Every connection
+sends requests back to back for --duration seconds, reconnecting when the
+server closes it; latency includes any reconnect. Client and server share
+this machine's CPUs.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from common import (
+    free_port,
+    latency_summary,
+    post_request,
+    read_response,
+    start_server,
+    stop_server,
+    synthetic_applications
+)
+
+SERVERS = {
+    'flask': 'app.py',
+    'asgi': 'asgi_app.py'
+}
+
+
+async def client(port, requests, deadline, latencies, counters):
+    """Send requests back to back on one connection until the deadline"""
+    reader = writer = None
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(requests[i % len(requests)])
+            i += 1
+            await writer.drain()
+            status, keep_alive, _, _ = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            counters['failed'] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+            continue
+
+        latencies.append((time.perf_counter() - start) * 1e6)
+        if status != 200:
+            counters['failed'] += 1
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, requests, connections, duration):
+    """(requests/s, latency summary, failed count) for one concurrency level"""
+    latencies = []
+    counters = {'failed': 0}
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(client(port, requests, deadline, latencies, counters) for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, latency_summary(latencies or [0]), counters['failed']
+
+
+def http_requests(detail, n=2000):
+    """Pre-encoded HTTP/1.1 requests with distinct applications"""
+    return [
+        post_request(f'/api/assess-loan?detail={detail}', json.dumps(application).encode())
+        for application in synthetic_applications(n, seed=31)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--connections', default='1,16,64,256', help='comma-separated concurrent connections')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per concurrency level')
+    parser.add_argument('--modes', default='flask,asgi')
+    parser.add_argument('--detail', default='summary', choices=['decision', 'summary', 'full'])
+    parser.add_argument('--audit-mode', choices=['sync', 'async'], default='sync')
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.connections.split(',')]
+    modes = args.modes.split(',')
+    requests = http_requests(args.detail)
+
+    print(f"POST /api/assess-loan?detail={args.detail}, {args.duration:g}s per level, "
+          f"audit writes {args.audit_mode}, {os.cpu_count()} CPU(s)\n")
+    print(f"{'mode':<7} {'conns':>6} {'req/s':>8} {'p50':>10} {'p95':>10} {'p99':>10} {'failed':>7}")
+    print("-" * 64)
+
+    with tempfile.TemporaryDirectory(prefix='serving-modes-') as workdir:
+        for mode in modes:
+            port = free_port()
+            process = start_server(SERVERS[mode], port, {
+                'RESULT_CACHE_SIZE': '0',
+                'AUDIT_DB_PATH': os.path.join(workdir, f'{mode}.db'),
+                'AUDIT_WRITE_MODE': args.audit_mode
+            })
+            try:
+                asyncio.run(load(port, requests, 4, 1.0))  # warm-up
+                for connections in levels:
+                    throughput, summary, failed = asyncio.run(load(port, requests, connections, args.duration))
+                    print(f"{mode:<7} {connections:>6} {throughput:>8,.0f} {summary['p50_us'] / 1000:>8.1f}ms "
+                          f"{summary['p95_us'] / 1000:>8.1f}ms {summary['p99_us'] / 1000:>8.1f}ms {failed:>7,}")
+            finally:
+                stop_server(process)
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: API Cold Start
+Time from interpreter start until the app is importable, until /health
+reports ready, and for the first assessment, per startup mode
+
+Usage: python benchmarks/bench_startup.py [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from common import BACKEND_DIR
+
+# Runs in a fresh interpreter for every measurement
+PROBE = r'''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.models.wait_until_ready()
+ready = time.perf_counter()
+client = app.app.test_client()
+assert client.get('/health').status_code == 200
+before = time.perf_counter()
+client.post('/api/assess-loan', json={
+    'applicant_income': 8000, 'coapplicant_income': 2000, 'loan_amount': 150,
+    'loan_amount_term': 360, 'credit_history': 1, 'property_area': 'Urban',
+    'self_employed': 0, 'dependents': 1})
+first = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'ready_ms': (ready - start) * 1000,
+                  'first_request_ms': (first - before) * 1000}))
+'''
+
+MODES = [
+    ('pickle (sklearn unpickle)', {'MODEL_FORMAT': 'pickle'}),
+    ('compiled bundle', {}),
+    ('compiled, background load', {'MODEL_LOAD': 'background'}),
+]
+
+
+def run_probe(extra_env, db_path):
+    """Start the app in a new interpreter and return its timings"""
+    env = dict(os.environ, AUDIT_DB_PATH=db_path, PYTHONWARNINGS='ignore', **extra_env)
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='startup-bench-') as workdir:
+        db_path = os.path.join(workdir, 'audit.db')
+
+        # Make sure the compiled bundle exists before timing anything
+        run_probe({}, db_path)
+
+        print(f"{'mode':<28} {'app imported':>14} {'ready':>10} {'1st request':>13}   (median of {args.runs})")
+        print("-" * 72)
+        for label, extra_env in MODES:
+            runs = [run_probe(extra_env, db_path) for _ in range(args.runs)]
+            median = {k: float(np.median([r[k] for r in runs])) for k in runs[0]}
+            print(f"{label:<28} {median['import_ms']:>11.0f} ms {median['ready_ms']:>7.0f} ms "
+                  f"{median['first_request_ms']:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
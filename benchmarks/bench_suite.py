@@ -0,0 +1,356 @@
+"""
+Benchmark Suite: End-to-End Latency and Throughput
+Drives the assessment pipeline in-process (per stage) and over HTTP (Flask or
+ASGI) at several concurrency levels, and saves the results as JSON for
+comparison between commits
+
+Usage: python benchmarks/bench_suite.py run [--modes inprocess,flask,asgi] [--concurrency 1,8,32]
+                                            [--requests 2000] [--detail full] [--audit-mode sync]
+                                            [--output results.json]
+       python benchmarks/bench_suite.py compare BASELINE.json CURRENT.json [--threshold 0.15]
+                                                [--min-delta-us 50]
+
+Applications come from common.synthetic_applications (the distributions of
+create_sample_dataset in notebooks/train_model.py). In-process runs call
+app.assess_application, the handler behind /api/assess-loan, and record its
+stage laps: cache, validate, rules, ml, explain, decide, audit, serialize.
+Over HTTP the client measures the total and adds any stages the server
+reports in a Server-Timing header. Results go
+to benchmarks/results/<commit>.json by default; compare exits with status 1
+when any p50/p99 or throughput moved the wrong way by more than --threshold
+(latency increases under --min-delta-us are ignored as noise).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from common import (
+    free_port,
+    latency_summary,
+    post_request,
+    read_response,
+    server_timing,
+    start_server,
+    stop_server,
+    synthetic_applications
+)
+
+from audit_logger import AuditLogger
+from metrics import StageTimer
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+STAGES = ['cache', 'validate', 'rules', 'ml', 'explain', 'decide', 'audit', 'serialize', 'total']
+
+SERVERS = {
+    'flask': 'app.py',
+    'asgi': 'asgi_app.py'
+}
+
+
+class PipelineRun:
+    """
+    One application through app.assess_application, timed by the StageTimer
+    laps /api/assess-loan records, plus a serialize lap for the JSON body
+    """
+
+    METADATA = {'user_agent': 'bench_suite', 'ip_address': None}
+
+    def __init__(self, service, detail):
+        self.service = service
+        self.detail = detail
+
+    def __call__(self, data, samples):
+        """Score data, appending each stage's microseconds to samples[stage]"""
+        timer = StageTimer(self.service.stage_seconds)
+        body, _ = self.service.assess_application(data, self.detail, self.METADATA, timer)
+        json.dumps(body)
+        timer.lap('serialize')
+
+        for stage, seconds in timer.laps:
+            samples[stage].append(seconds * 1e6)
+        samples['total'].append((timer.last - timer.start) * 1e6)
+
+
+def load_service(workdir):
+    """The app module, imported once with the result cache off and its audit DB in workdir"""
+    if 'app' not in sys.modules:
+        os.environ['RESULT_CACHE_SIZE'] = '0'
+        os.environ['AUDIT_DB_PATH'] = os.path.join(workdir, 'inprocess.db')
+        os.environ['AUDIT_WRITE_MODE'] = 'sync'
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app
+    return sys.modules['app']
+
+
+def run_inprocess(applications, concurrency, detail, audit_mode, workdir):
+    """(requests/s, {stage: samples}) with concurrency threads sharing the applications"""
+    service = load_service(workdir)
+    service.audit_logger.close()
+    service.audit_logger = audit_logger = AuditLogger(os.path.join(workdir, f'inprocess-{concurrency}.db'),
+                                                      async_writes=audit_mode == 'async')
+    pipeline = PipelineRun(service, detail)
+
+    for data in applications[:50]:
+        pipeline(data, defaultdict(list))
+
+    per_thread = [defaultdict(list) for _ in range(concurrency)]
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(t):
+        barrier.wait()
+        for data in applications[t::concurrency]:
+            pipeline(data, per_thread[t])
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    audit_logger.flush()
+    elapsed = time.perf_counter() - start
+    audit_logger.close()
+
+    samples = defaultdict(list)
+    for thread_samples in per_thread:
+        for stage, values in thread_samples.items():
+            samples[stage].extend(values)
+    return len(applications) / elapsed, samples
+
+
+async def _http_load(port, requests, concurrency):
+    """(requests/s, {stage: samples}, failed) with concurrency keep-alive connections"""
+    samples = defaultdict(list)
+    failed = 0
+    pending = iter(requests)
+
+    async def connection():
+        nonlocal failed
+        reader = writer = None
+        for request in pending:
+            start = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(request)
+                await writer.drain()
+                status, keep_alive, _, headers = await read_response(reader)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                failed += 1
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+                continue
+
+            total = (time.perf_counter() - start) * 1e6
+            if status != 200:
+                failed += 1
+            else:
+                samples['total'].append(total)
+                for stage, duration in server_timing(headers.get(b'server-timing', b'').decode()).items():
+                    samples[f'server:{stage}'].append(duration)
+            if not keep_alive:
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(connection() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return len(samples['total']) / elapsed, samples, failed
+
+
+def run_http(mode, applications, levels, detail, audit_mode, workdir):
+    """[(concurrency, requests/s, samples, failed)] against one server process"""
+    requests = [post_request(f'/api/assess-loan?detail={detail}', json.dumps(data).encode())
+                for data in applications]
+    port = free_port()
+    process = start_server(SERVERS[mode], port, {
+        'RESULT_CACHE_SIZE': '0',
+        'AUDIT_DB_PATH': os.path.join(workdir, f'{mode}.db'),
+        'AUDIT_WRITE_MODE': audit_mode
+    })
+    try:
+        asyncio.run(_http_load(port, requests[:100], 4))
+        return [(concurrency, *asyncio.run(_http_load(port, requests, concurrency)))
+                for concurrency in levels]
+    finally:
+        stop_server(process)
+
+
+def result_rows(mode, concurrency, throughput, samples, stages, failed=0):
+    """One result row per stage that has samples"""
+    rows = []
+    for stage in stages:
+        if samples.get(stage):
+            summary = latency_summary(samples[stage])
+            rows.append({
+                'mode': mode,
+                'concurrency': concurrency,
+                'stage': stage,
+                'throughput_rps': round(throughput, 1),
+                'failed': failed,
+                **{key: round(value, 1) if isinstance(value, float) else value for key, value in summary.items()}
+            })
+    return rows
+
+
+def print_rows(rows):
+    print(f"{'mode':<10} {'conc':>5} {'stage':<10} {'req/s':>8} {'count':>7} "
+          f"{'p50':>10} {'p95':>10} {'p99':>10}")
+    print("-" * 78)
+    for row in rows:
+        print(f"{row['mode']:<10} {row['concurrency']:>5} {row['stage']:<10} {row['throughput_rps']:>8,.0f} "
+              f"{row['count']:>7,} {row['p50_us']:>8.1f}µs {row['p95_us']:>8.1f}µs {row['p99_us']:>8.1f}µs")
+
+
+def git_commit():
+    """(short commit, dirty) of the working tree, or (None, None) outside git"""
+    try:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=root,
+                                         stderr=subprocess.DEVNULL, text=True).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                             cwd=root, stderr=subprocess.DEVNULL, text=True).strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def run(args):
+    levels = [int(n) for n in args.concurrency.split(',')]
+    modes = args.modes.split(',')
+    applications = synthetic_applications(args.requests, seed=args.seed)
+
+    warnings.filterwarnings('ignore')
+    rows = []
+    with tempfile.TemporaryDirectory(prefix='bench-suite-') as workdir:
+        for mode in modes:
+            if mode == 'inprocess':
+                for concurrency in levels:
+                    throughput, samples = run_inprocess(applications, concurrency, args.detail,
+                                                        args.audit_mode, workdir)
+                    rows += result_rows(mode, concurrency, throughput, samples, STAGES)
+            elif mode in SERVERS:
+                for concurrency, throughput, samples, failed in run_http(
+                        mode, applications, levels, args.detail, args.audit_mode, workdir):
+                    rows += result_rows(mode, concurrency, throughput, samples, list(samples), failed)
+            else:
+                sys.exit(f"❌ Unknown mode '{mode}' (expected inprocess, {', '.join(SERVERS)})")
+
+    print_rows(rows)
+
+    commit, dirty = git_commit()
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'results'}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'meta': {
+                'commit': commit,
+                'dirty': dirty,
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'args': vars(args)
+            },
+            'results': rows
+        }, f, indent=2, default=str)
+    print(f"\n✅ Results saved to {output}")
+
+
+def compare(args):
+    """Print per-row changes; exit 1 if anything regressed past the threshold"""
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    def keyed(results):
+        return {(row['mode'], row['concurrency'], row['stage']): row for row in results['results']}
+
+    base_rows, current_rows = keyed(baseline), keyed(current)
+    print(f"baseline {baseline['meta'].get('commit')}  vs  current {current['meta'].get('commit')}\n")
+    print(f"{'mode':<10} {'conc':>5} {'stage':<10} {'p50':>18} {'p99':>18} {'req/s':>16}")
+    print("-" * 82)
+
+    regressions = []
+    for key in [key for key in base_rows if key in current_rows]:
+        old, new = base_rows[key], current_rows[key]
+        changes = {
+            'p50_us': new['p50_us'] / old['p50_us'] - 1 if old['p50_us'] else 0.0,
+            'p99_us': new['p99_us'] / old['p99_us'] - 1 if old['p99_us'] else 0.0,
+            # Lower throughput is the regression, so flip the sign
+            'throughput_rps': 1 - new['throughput_rps'] / old['throughput_rps'] if old['throughput_rps'] else 0.0
+        }
+        worse = [
+            metric for metric, change in changes.items()
+            if change > args.threshold and (
+                key[2] == 'total' if metric == 'throughput_rps'
+                else new[metric] - old[metric] > args.min_delta_us
+            )
+        ]
+        if worse:
+            regressions.append((key, worse))
+        print(f"{key[0]:<10} {key[1]:>5} {key[2]:<10} "
+              f"{new['p50_us']:>9.1f}µs {changes['p50_us']:>+6.1%} "
+              f"{new['p99_us']:>9.1f}µs {changes['p99_us']:>+6.1%} "
+              f"{new['throughput_rps']:>8,.0f} {-changes['throughput_rps']:>+6.1%}"
+              f"{'  ⚠️' if worse else ''}")
+
+    missing = base_rows.keys() ^ current_rows.keys()
+    if missing:
+        print(f"\n{len(missing)} row(s) only in one of the files were skipped")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} row(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"\n✅ No regressions over {args.threshold:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the suite and save results')
+    run_parser.add_argument('--modes', default='inprocess,flask,asgi', help='inprocess, flask and/or asgi')
+    run_parser.add_argument('--concurrency', default='1,8,32', help='comma-separated threads / connections')
+    run_parser.add_argument('--requests', type=int, default=2000, help='applications per concurrency level')
+    run_parser.add_argument('--detail', default='full', choices=['decision', 'summary', 'full'])
+    run_parser.add_argument('--audit-mode', choices=['sync', 'async'], default='sync')
+    run_parser.add_argument('--seed', type=int, default=2026)
+    run_parser.add_argument('--output', help='JSON path (default benchmarks/results/<commit>.json)')
+
+    compare_parser = commands.add_parser('compare', help='compare two saved result files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.15,
+                                help='relative change counted as a regression')
+    compare_parser.add_argument('--min-delta-us', type=float, default=50.0,
+                                help='smaller latency increases are treated as noise')
+
+    args = parser.parse_args()
+    run(args) if args.command == 'run' else compare(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: Compiled Forest vs sklearn predict_proba
+Single-row latency and batch throughput of backend/tree_engine.py
+
+Usage: python benchmarks/bench_tree_engine.py [--rows 2000]
+"""
+
+import argparse
+import os
+import time
+import warnings
+
+import numpy as np
+
+from common import MODELS_DIR, synthetic_applications, time_calls, latency_summary, print_summary
+
+import joblib
+from pipeline import prepare_features_batch
+from tree_engine import CompiledForest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000, help='single-row calls to time')
+    parser.add_argument('--batch', type=int, default=100000, help='rows for the throughput run')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    model = joblib.load(os.path.join(MODELS_DIR, 'loan_model.pkl'))
+    forest = CompiledForest.from_sklearn(model)
+
+    features = prepare_features_batch(synthetic_applications(args.rows, seed=1))
+    matrix = features.to_numpy()
+    frames = [(features.iloc[[i]],) for i in range(args.rows)]
+    rows = [(matrix[i],) for i in range(args.rows)]
+
+    # Agreement check before timing anything
+    max_error = np.abs(model.predict_proba(features) - forest.predict_proba(matrix)).max()
+    print(f"Max abs probability difference: {max_error:.2e}")
+
+    print("\nSingle-row latency")
+    print("-" * 70)
+    sklearn_summary = latency_summary(time_calls(model.predict_proba, frames))
+    compiled_summary = latency_summary(time_calls(forest.predict_proba, rows))
+    print_summary('sklearn predict_proba', sklearn_summary)
+    print_summary('CompiledForest', compiled_summary)
+    print(f"Speedup (p50): {sklearn_summary['p50_us'] / compiled_summary['p50_us']:.1f}x")
+
+    print(f"\nBatch throughput ({args.batch:,} rows)")
+    print("-" * 70)
+    batch = prepare_features_batch(synthetic_applications(args.batch, seed=2))
+    batch_matrix = batch.to_numpy()
+    for label, fn, X in (
+        ('sklearn predict_proba', model.predict_proba, batch),
+        ('CompiledForest', forest.predict_proba, batch_matrix),
+    ):
+        start = time.perf_counter()
+        fn(X)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<28} {args.batch / elapsed:>12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark: Model Memory per Worker
+Resident (RSS) and proportional (PSS) memory of N forked workers that each
+load the model, as a pre-fork server without --preload does
+
+Usage: python benchmarks/bench_worker_memory.py [--workers 4] [--replicate 20]
+
+PSS splits every shared page between the processes mapping it, so the sum of
+PSS over all workers is the real memory cost. Linux only (/proc/self/smaps_rollup).
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import warnings
+
+import numpy as np
+
+from common import MODELS_DIR, synthetic_applications
+
+from pipeline import prepare_features_batch
+from tree_engine import CompiledForest
+
+MODES = [
+    ('joblib.load (pickle)', 'pickle'),
+    ('.forest, private copy', 'private'),
+    ('.forest, mmap shared', 'mmap'),
+]
+
+
+def memory_kb():
+    """Rss and Pss of this process in kB"""
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if name in ('Rss', 'Pss'):
+                values[name] = int(rest.split()[0])
+    return values
+
+
+def replicate_artifacts(workdir, copies):
+    """Write pickle and .forest files with every tree repeated `copies` times"""
+    # Built in a child so the parent never imports sklearn or holds the model
+    context = multiprocessing.get_context('fork')
+    process = context.Process(target=_write_artifacts, args=(workdir, copies))
+    process.start()
+    process.join()
+    return os.path.join(workdir, 'loan_model.pkl'), os.path.join(workdir, 'loan_model.forest')
+
+
+def _write_artifacts(workdir, copies):
+    import joblib
+    warnings.filterwarnings('ignore')
+
+    model = joblib.load(os.path.join(MODELS_DIR, 'loan_model.pkl'))
+    model.estimators_ = model.estimators_ * copies
+    model.n_estimators = len(model.estimators_)
+
+    joblib.dump(model, os.path.join(workdir, 'loan_model.pkl'))
+    CompiledForest.from_sklearn(model).save(os.path.join(workdir, 'loan_model.forest'))
+
+
+def worker(mode, pickle_path, forest_path, X, barrier, results):
+    """Load the model, score X, then report memory while every worker is alive"""
+    barrier.wait()
+    before = memory_kb()
+    barrier.wait()
+
+    if mode == 'pickle':
+        import joblib
+        warnings.filterwarnings('ignore')
+        model = joblib.load(pickle_path)
+        model.predict_proba(X)
+    else:
+        model = CompiledForest.load(forest_path, mmap_mode='r' if mode == 'mmap' else None)
+        model.predict_proba(X.to_numpy())
+        model.contributions(X.to_numpy())  # as ModelStore.warm_up does
+
+    barrier.wait()
+    after = memory_kb()
+    results.put({
+        'rss_kb': after['Rss'],
+        'pss_kb': after['Pss'],
+        'load_rss_kb': after['Rss'] - before['Rss'],
+        'load_pss_kb': after['Pss'] - before['Pss']
+    })
+    barrier.wait()
+
+
+def measure(mode, workers, pickle_path, forest_path, X):
+    """Run `workers` forked workers in one mode and collect their memory"""
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+
+    processes = [
+        context.Process(target=worker, args=(mode, pickle_path, forest_path, X, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--replicate', type=int, default=20,
+                        help='repeat every tree N times to mimic a production-size forest')
+    parser.add_argument('--rows', type=int, default=200, help='rows scored by every worker')
+    args = parser.parse_args()
+
+    X = prepare_features_batch(synthetic_applications(args.rows, seed=3))
+
+    with tempfile.TemporaryDirectory(prefix='worker-memory-') as workdir:
+        pickle_path, forest_path = replicate_artifacts(workdir, args.replicate)
+        forest_mb = os.path.getsize(forest_path) / 1e6
+        print(f"{args.workers} workers, forest x{args.replicate} "
+              f"({forest_mb:.1f} MB .forest file)\n")
+
+        print(f"{'mode':<24} {'RSS/worker':>11} {'PSS/worker':>11} {'model RSS':>10} {'model PSS':>10} {'total PSS':>10}")
+        print("-" * 82)
+        for label, mode in MODES:
+            samples = measure(mode, args.workers, pickle_path, forest_path, X)
+            mean = {k: np.mean([s[k] for s in samples]) / 1024 for k in samples[0]}
+            total_pss = sum(s['pss_kb'] for s in samples) / 1024
+            print(f"{label:<24} {mean['rss_kb']:>8.1f} MB {mean['pss_kb']:>8.1f} MB "
+                  f"{mean['load_rss_kb']:>7.1f} MB {mean['load_pss_kb']:>7.1f} MB {total_pss:>7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
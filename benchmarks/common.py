@@ -0,0 +1,171 @@
+"""
+Benchmark Helpers
+Shared paths, synthetic applications, latency summaries and local servers for benchmarks/
+"""
+
+import http.client
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+BACKEND_DIR = os.path.normpath(BACKEND_DIR)
+MODELS_DIR = os.path.join(BACKEND_DIR, 'models')
+
+# Make backend modules importable the same way app.py imports them
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def synthetic_applications(n_samples=1000, seed=42):
+    """
+    Generate API-shaped applications with the same distributions as
+    create_sample_dataset in notebooks/train_model.py
+    """
+    rng = np.random.RandomState(seed)
+
+    applicant_income = rng.randint(2000, 15000, n_samples)
+    coapplicant_income = rng.randint(0, 8000, n_samples)
+    loan_amount = rng.randint(50, 500, n_samples)
+    loan_term = rng.choice([180, 240, 360, 480], n_samples)
+    credit_history = rng.choice([0, 1], n_samples, p=[0.15, 0.85])
+    property_area = rng.choice(['Urban', 'Semiurban', 'Rural'], n_samples)
+    self_employed = rng.choice([0, 1], n_samples, p=[0.85, 0.15])
+    dependents = rng.choice([0, 1, 2, 3], n_samples)
+
+    return [
+        {
+            'applicant_income': int(applicant_income[i]),
+            'coapplicant_income': int(coapplicant_income[i]),
+            'loan_amount': int(loan_amount[i]),
+            'loan_amount_term': int(loan_term[i]),
+            'credit_history': int(credit_history[i]),
+            'property_area': str(property_area[i]),
+            'self_employed': int(self_employed[i]),
+            'dependents': int(dependents[i])
+        }
+        for i in range(n_samples)
+    ]
+
+
+def time_calls(fn, args_list, warmup=20):
+    """Call fn(*args) for every entry and return per-call latencies in microseconds"""
+    for args in args_list[:warmup]:
+        fn(*args)
+
+    samples = np.empty(len(args_list))
+    for i, args in enumerate(args_list):
+        start = time.perf_counter()
+        fn(*args)
+        samples[i] = (time.perf_counter() - start) * 1e6
+    return samples
+
+
+def latency_summary(samples_us):
+    """p50/p95/p99/mean of latency samples given in microseconds"""
+    samples_us = np.asarray(samples_us)
+    return {
+        'count': int(len(samples_us)),
+        'mean_us': float(samples_us.mean()),
+        'p50_us': float(np.percentile(samples_us, 50)),
+        'p95_us': float(np.percentile(samples_us, 95)),
+        'p99_us': float(np.percentile(samples_us, 99))
+    }
+
+
+def print_summary(label, summary):
+    """Print one latency summary line"""
+    print(f"{label:<28} p50 {summary['p50_us']:>9.1f}µs   "
+          f"p95 {summary['p95_us']:>9.1f}µs   p99 {summary['p99_us']:>9.1f}µs")
+
+
+def free_port():
+    """An unused local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(script, port, env=None, timeout=60):
+    """Run a backend server script on 127.0.0.1:port and wait until /health answers 200"""
+    process = subprocess.Popen(
+        [sys.executable, script],
+        cwd=BACKEND_DIR,
+        env=dict(os.environ, PORT=str(port), HOST='127.0.0.1', FLASK_ENV='production',
+                 PYTHONWARNINGS='ignore', **(env or {})),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'{script} did not become healthy on port {port}')
+
+
+def stop_server(process):
+    """SIGTERM (flushes queued audit writes), then kill if it hangs"""
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def read_response(reader):
+    """(status, keep_alive, body, headers) of one HTTP/1.x response from an asyncio stream"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    version, status = status_line.split()[:2]
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        headers[name.strip().lower()] = value.strip()
+
+    if b'content-length' in headers:
+        body = await reader.readexactly(int(headers[b'content-length']))
+        connection = headers.get(b'connection', b'').lower()
+        keep_alive = connection != b'close' if version == b'HTTP/1.1' else connection == b'keep-alive'
+    else:
+        body = await reader.read()
+        keep_alive = False
+    return int(status), keep_alive, body, headers
+
+
+def post_request(path, payload):
+    """Encoded HTTP/1.1 POST of a JSON payload (bytes)"""
+    return (
+        f"POST {path} HTTP/1.1\r\n"
+        f"Host: 127.0.0.1\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+    )
+
+
+def server_timing(header):
+    """{name: microseconds} from a Server-Timing header value (durations are in ms)"""
+    stages = {}
+    for entry in header.split(','):
+        name, *params = [part.strip() for part in entry.split(';')]
+        for param in params:
+            key, _, value = param.partition('=')
+            if key == 'dur' and name:
+                stages[name] = float(value) * 1000
+    return stages
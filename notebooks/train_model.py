@@ -12,6 +12,12 @@ from sklearn.metrics import classification_report, confusion_matrix, roc_auc_sco
 import joblib
 import json
 import os
+import sys
+
+# Backend modules, for exporting the compiled inference bundle
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from tree_engine import CompiledForest
+from model_store import file_digest
 
 # For demonstration, we'll create synthetic data
 # In production, use real historical loan data
@@ -138,6 +144,11 @@ def train_model():
     joblib.dump(model, '../backend/models/loan_model.pkl')
     joblib.dump(le, '../backend/models/label_encoder.pkl')
     
+    # Flat-array copy of the forest the API loads without importing sklearn
+    forest = CompiledForest.from_sklearn(model)
+    forest.source_digest = file_digest('../backend/models/loan_model.pkl')
+    forest.save('../backend/models/loan_model.forest')
+    
     # Save feature importance
     feature_importance.to_csv('../backend/models/feature_importance.csv', index=False)
     
@@ -160,6 +171,7 @@ def train_model():
     print("\n✅ Model training complete!")
     print("Saved files:")
     print("  - backend/models/loan_model.pkl")
+    print("  - backend/models/loan_model.forest")
     print("  - backend/models/label_encoder.pkl")
     print("  - backend/models/feature_importance.csv")
     print("  - backend/models/model_metadata.json")